@@ -0,0 +1,139 @@
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from charts import THEME
+
+# --- Mood Trend Analytics ---
+# Everything here works on the pre-aggregated mood_daily rollup (one row per
+# day), so cost scales with the number of days, not the number of entries.
+
+WEEKDAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+GOOD_MOOD = 7
+
+
+def mood_frame(rollup_rows):
+    """
+    Turns rollup rows into a continuous daily DataFrame indexed by date.
+    Days without entries are kept as NaN so rolling windows stay calendar-true.
+    """
+    if not rollup_rows:
+        return pd.DataFrame(columns=["score", "entries", "temp", "humidity", "weather_main"])
+
+    df = pd.DataFrame(rollup_rows)
+    df.index = pd.to_datetime(df['entry_date'])
+    df['score'] = (df['score_sum'] / df['scored']).where(df['scored'] > 0)
+    df['temp'] = (df['temp_sum'] / df['temp_n']).where(df['temp_n'] > 0)
+    df['humidity'] = (df['humidity_sum'] / df['temp_n']).where(df['temp_n'] > 0)
+
+    full_range = pd.date_range(df.index.min(), df.index.max(), freq="D")
+    df = df[["score", "entries", "temp", "humidity", "weather_main"]].reindex(full_range)
+    df['entries'] = df['entries'].fillna(0).astype(int)
+    return df
+
+
+def rolling_averages(df, windows=(7, 30)):
+    out = pd.DataFrame(index=df.index)
+    out['score'] = df['score']
+    for w in windows:
+        out[f'avg_{w}d'] = df['score'].rolling(w, min_periods=1).mean()
+    return out
+
+
+def weekday_profile(df):
+    """
+    Mean mood per weekday (Mon..Sun), NaN where there is no data.
+    """
+    profile = df['score'].groupby(df.index.dayofweek).mean()
+    return profile.reindex(range(7)).set_axis(WEEKDAYS)
+
+
+def weather_correlation(df):
+    """
+    Returns (pearson r between temperature and mood, mean mood per condition).
+    """
+    scored = df.dropna(subset=["score"])
+    temp_r = None
+    if scored['temp'].notna().sum() >= 3:
+        temp_r = scored['score'].corr(scored['temp'])
+    by_condition = scored.groupby('weather_main')['score'].agg(['mean', 'count']).sort_values('mean', ascending=False)
+    return temp_r, by_condition
+
+
+def _runs(mask):
+    """
+    Vectorised run-length of True values: returns (current run, longest run).
+    """
+    values = np.asarray(mask, dtype=bool)
+    if values.size == 0:
+        return 0, 0
+    # Index of the last False before each position; run length = distance to it
+    idx = np.arange(values.size)
+    last_false = np.maximum.accumulate(np.where(values, -1, idx))
+    lengths = np.where(values, idx - last_false, 0)
+    return int(lengths[-1]), int(lengths.max())
+
+
+def streaks(df, today=None):
+    """
+    Journaling streak (consecutive days with an entry) and good-mood streak
+    (consecutive scored days >= GOOD_MOOD). Current streaks count up to today.
+    """
+    if df.empty:
+        return {"journal_current": 0, "journal_best": 0, "good_current": 0, "good_best": 0}
+
+    today = pd.Timestamp(today or pd.Timestamp.now().normalize())
+    days = df.reindex(pd.date_range(df.index.min(), max(today, df.index.max()), freq="D"))
+
+    journal_current, journal_best = _runs(days['entries'].fillna(0) > 0)
+    good_current, good_best = _runs(days['score'].fillna(0) >= GOOD_MOOD)
+    return {
+        "journal_current": journal_current,
+        "journal_best": journal_best,
+        "good_current": good_current,
+        "good_best": good_best,
+    }
+
+
+def mood_trend_figure(df):
+    trend = rolling_averages(df)
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=trend.index, y=trend['score'],
+        mode='markers', name='Daily',
+        marker=dict(color='#888', size=6)
+    ))
+    fig.add_trace(go.Scatter(
+        x=trend.index, y=trend['avg_7d'],
+        mode='lines', name='7-day avg',
+        line=dict(color='#ccff00', width=3, shape='spline')
+    ))
+    fig.add_trace(go.Scatter(
+        x=trend.index, y=trend['avg_30d'],
+        mode='lines', name='30-day avg',
+        line=dict(color='#ff9900', width=2, dash='dot')
+    ))
+    fig.update_layout(
+        template=THEME,
+        yaxis=dict(showgrid=True, range=[0, 10.5]),
+        showlegend=True,
+        legend=dict(orientation='h', y=1.15),
+        margin=dict(t=30),
+        height=250
+    )
+    return fig
+
+
+def weekday_figure(profile):
+    fig = go.Figure()
+    fig.add_trace(go.Bar(
+        x=profile.index, y=profile.values,
+        marker_color='#00bfff'
+    ))
+    fig.update_layout(
+        template=THEME,
+        yaxis=dict(range=[0, 10]),
+        height=150,
+        bargap=0.4
+    )
+    return fig
@@ -0,0 +1,358 @@
+"""
+Headless JSON API for the daily brief (no Streamlit session per request).
+
+Serves the same data and AI logic as the dashboard from core.py, behind the
+shared cache, with ETag / If-None-Match support so polling clients (phone
+shortcuts, internal tools) mostly get cheap 304s.
+
+Token streams (Server-Sent Events) are fanned out: identical concurrent
+requests share one upstream generation (see streaming.py).
+
+Usage:
+    uvicorn api:app --app-dir my_daily_brief --port 8000
+    python api.py
+"""
+import asyncio
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from dotenv import load_dotenv
+from fastapi import FastAPI, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
+
+import core
+import prompts
+from backends import get_router
+from cache import brief_key
+from cachebackends import asingle_flight, get_cache_backend
+from quota import get_quota
+from resilience import breaker_states
+from streaming import StreamHub, sse_event
+from summarizer import SummaryCache, build_news_digest
+
+load_dotenv(override=True)
+
+WEATHER_TTL = 3600
+NEWS_TTL = 3600
+MARKETS_TTL = 300
+BRIEFING_TTL = 6 * 3600
+L1_TTL = 30  # seconds a serialised response is reused without touching SQLite
+L1_MAX_ITEMS = 512
+
+app = FastAPI(title="My Daily Brief API", version="1.0")
+shared_cache = get_cache_backend("shared")
+summary_cache = SummaryCache()
+stream_hub = StreamHub()
+
+
+
+# --- Caching Helpers ---
+class ResponseCache:
+    """
+    In-process LRU of serialised responses with per-entry expiry. Keys come
+    from client input (city names), so it is bounded by max_items and
+    expired entries are evicted as they are found.
+    """
+
+    def __init__(self, max_items=L1_MAX_ITEMS):
+        self.max_items = max_items
+        self._items = OrderedDict()  # key -> (expires_at, body)
+
+    def get(self, key):
+        hit = self._items.get(key)
+        if hit is None:
+            return None
+        if hit[0] <= time.monotonic():
+            del self._items[key]
+            return None
+        self._items.move_to_end(key)
+        return hit[1]
+
+    def set(self, key, body, ttl):
+        now = time.monotonic()
+        self._items[key] = (now + ttl, body)
+        self._items.move_to_end(key)
+        # Oldest first: drop expired entries, then the least recently used
+        while self._items:
+            oldest, (expires_at, _) = next(iter(self._items.items()))
+            if expires_at > now and len(self._items) <= self.max_items:
+                break
+            del self._items[oldest]
+
+    def __len__(self):
+        return len(self._items)
+
+
+_l1 = ResponseCache()
+_key_locks = {}  # key -> [asyncio.Lock, requests holding or waiting for it]
+
+
+async def cached(key, ttl, fn, *args):
+    """
+    Read-through shared cache with per-key single-flight: concurrent misses on
+    the same key wait for one upstream call instead of each making their own,
+    within this worker (asyncio lock) and across workers (backend lock).
+    """
+    value = await run_in_threadpool(shared_cache.get, key)
+    if value is not None:
+        return value
+
+    async def compute():
+        if asyncio.iscoroutinefunction(fn):
+            return await fn(*args)
+        return await run_in_threadpool(fn, *args)
+
+    entry = _key_locks.get(key)
+    if entry is None:
+        entry = _key_locks[key] = [asyncio.Lock(), 0]
+    entry[1] += 1
+    try:
+        async with entry[0]:
+            return await asingle_flight(shared_cache, key, compute, ttl)
+    finally:
+        entry[1] -= 1
+        if not entry[1]:
+            del _key_locks[key]
+
+
+def _etag(body):
+    return '"' + hashlib.sha1(body).hexdigest()[:20] + '"'
+
+
+def json_response(request, body, max_age):
+    """
+    Returns the JSON body with ETag / Cache-Control, or 304 if the client
+    already has this exact representation.
+    """
+    etag = _etag(body)
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={max_age}"}
+    if_none_match = request.headers.get("if-none-match", "")
+    if if_none_match == "*" or etag in [t.strip() for t in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
+
+
+async def respond(request, l1_key, max_age, build):
+    """
+    Serves a response from the in-process L1 (serialised bytes) or builds it.
+    """
+    body = _l1.get(l1_key)
+    if body is not None:
+        return json_response(request, body, max_age)
+    payload = await build()
+    body = json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    _l1.set(l1_key, body, min(L1_TTL, max_age))
+    return json_response(request, body, max_age)
+
+
+def _today():
+    return datetime.now().strftime("%Y-%m-%d")
+
+
+def _city_key(city):
+    return city.strip().lower()
+
+
+# --- Payload Builders ---
+async def weather_payload(city):
+    data = await cached(f"weather:{_city_key(city)}", WEATHER_TTL, core.fetch_weather_data, city)
+    if not data:
+        raise HTTPException(status_code=404, detail=f"No weather for '{city}'")
+    full = data['full']
+    desc = full['weather'][0]['description']
+    return {
+        "city": city,
+        "summary": data['summary'],
+        "temp": full['main']['temp'],
+        "humidity": full['main']['humidity'],
+        "description": desc,
+        "wind_speed": full.get('wind', {}).get('speed'),
+        "outfit": core.get_outfit_recommendation(full['main']['temp'], desc),
+    }
+
+
+async def news_payload(limit=10):
+    data = await cached("news", NEWS_TTL, core.fetch_news_data)
+    if not data:
+        raise HTTPException(status_code=503, detail="News unavailable")
+    return {
+        "headlines": [
+            {"title": a.get('title'), "source": (a.get('source') or {}).get('name'), "url": a.get('url')}
+            for a in data['articles'][:limit]
+        ]
+    }
+
+
+async def markets_payload():
+    metrics = await cached("markets", MARKETS_TTL, core.fetch_market_metrics)
+    return {"markets": [{"name": n, "price": p, "change": c} for n, p, c in metrics or []]}
+
+
+async def _briefing_prompt(city):
+    weather, news = await asyncio.gather(
+        run_in_threadpool(core.fetch_weather_data, city), run_in_threadpool(core.fetch_news_data)
+    )
+    if not weather or not news:
+        return None
+    n_digest = await run_in_threadpool(build_news_digest, news['articles'], prompts.stream, summary_cache)
+    return core.build_briefing_prompt(weather['summary'], n_digest)
+
+
+async def _generate_briefing(city):
+    prompt = await _briefing_prompt(city)
+    if prompt is None:
+        return None
+    return {"briefing": await prompts.acomplete(prompt)}
+
+
+async def briefing_payload(city):
+    # Prefer the scheduler's precomputed morning brief
+    pre = await run_in_threadpool(shared_cache.get, brief_key(city, _today()))
+    if pre:
+        return {"city": city, "briefing": pre['briefing'], "generated_at": pre['generated_at'], "precomputed": True}
+
+    data = await cached(f"briefing:{_city_key(city)}:{_today()}", BRIEFING_TTL, _generate_briefing, city)
+    if not data:
+        raise HTTPException(status_code=503, detail="Briefing unavailable")
+    return {"city": city, "briefing": data['briefing'], "precomputed": False}
+
+
+# --- Routes ---
+@app.get("/health")
+async def health():
+    """
+    Liveness plus the circuit state of every upstream source used so far.
+    """
+    upstreams = breaker_states()
+    degraded = any(b['state'] != "closed" for b in upstreams.values())
+    return {"status": "degraded" if degraded else "ok", "upstreams": upstreams}
+
+
+@app.get("/v1/backends")
+async def backends_status():
+    """
+    Moving latency / error stats of each configured LLM backend.
+    """
+    return get_router().stats()
+
+
+@app.get("/v1/quota")
+async def quota_status():
+    """
+    Upstream API budget per provider: tokens left and today's spend.
+    """
+    return await run_in_threadpool(get_quota().report)
+
+
+@app.get("/v1/prompt-stats")
+async def prompt_stats():
+    """
+    Per-template prompt-eval time and estimated savings from prefix reuse.
+    """
+    return prompts.STATS.report()
+
+
+@app.get("/v1/weather")
+async def get_weather(request: Request, city: str = Query(..., min_length=1)):
+    return await respond(request, f"weather:{_city_key(city)}", WEATHER_TTL, lambda: weather_payload(city))
+
+
+@app.get("/v1/news")
+async def get_news(request: Request, limit: int = Query(10, ge=1, le=20)):
+    return await respond(request, f"news:{limit}", NEWS_TTL, lambda: news_payload(limit))
+
+
+@app.get("/v1/markets")
+async def get_markets(request: Request):
+    return await respond(request, "markets", MARKETS_TTL, markets_payload)
+
+
+@app.get("/v1/briefing")
+async def get_briefing(request: Request, city: str = Query(..., min_length=1)):
+    return await respond(request, f"briefing:{_city_key(city)}", BRIEFING_TTL, lambda: briefing_payload(city))
+
+
+@app.get("/v1/brief")
+async def get_brief(request: Request, city: str = Query(..., min_length=1)):
+    """
+    Everything at once: weather + outfit, markets, headlines and AI briefing.
+    """
+    async def build():
+        weather, markets, news = await asyncio.gather(weather_payload(city), markets_payload(), news_payload(5))
+        try:
+            briefing = (await briefing_payload(city))['briefing']
+        except HTTPException:
+            briefing = None
+        return {"weather": weather, **markets, **news, "briefing": briefing}
+
+    return await respond(request, f"brief:{_city_key(city)}", MARKETS_TTL, build)
+
+
+# --- Streaming (SSE) ---
+class PromptRequest(BaseModel):
+    prompt: str
+
+
+def sse_response(key, token_factory, on_complete=None):
+    async def events():
+        yield sse_event("start", {"key": key})
+        try:
+            async for token in stream_hub.stream(key, token_factory, on_complete):
+                yield sse_event("token", {"text": token})
+        except Exception as e:
+            yield sse_event("error", {"detail": str(e)})
+            return
+        yield sse_event("done", {})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/v1/stream/briefing")
+async def stream_briefing(city: str = Query(..., min_length=1)):
+    """
+    Streams the AI briefing token by token. Concurrent requests for the same
+    city share one generation; a finished briefing is cached for /v1/briefing.
+    """
+    day_key = f"briefing:{_city_key(city)}:{_today()}"
+    pre = (await run_in_threadpool(shared_cache.get, brief_key(city, _today()))
+           or await run_in_threadpool(shared_cache.get, day_key))
+    if pre:
+        return sse_response(f"cached:{day_key}", lambda: iter([pre['briefing']]))
+
+    async def tokens():
+        prompt = await _briefing_prompt(city)
+        if prompt is None:
+            raise RuntimeError("Weather or news unavailable")
+        async for token in prompts.astream(prompt):
+            yield token
+
+    def store(text):
+        # Called on the event loop: write off-thread
+        asyncio.get_running_loop().run_in_executor(
+            None, lambda: shared_cache.set(day_key, {"briefing": text.strip()}, ttl=BRIEFING_TTL))
+
+    return sse_response(day_key, tokens, store)
+
+
+@app.post("/v1/stream/generate")
+async def stream_generate(req: PromptRequest):
+    """
+    Streams a raw prompt. Identical in-flight prompts share one generation.
+    """
+    key = "prompt:" + hashlib.sha1(req.prompt.encode("utf-8")).hexdigest()
+    return sse_response(key, lambda: prompts.astream(req.prompt))
+
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host=os.getenv("API_HOST", "127.0.0.1"), port=int(os.getenv("API_PORT", "8000")))
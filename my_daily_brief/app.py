@@ -1,19 +1,33 @@
 import streamlit as st
 import streamlit.components.v1 as components
 import requests
-import os
 import subprocess
 import time
 from dotenv import load_dotenv
-import ollama
 import pandas as pd
 import plotly.express as px
-import plotly.graph_objects as go
 from datetime import datetime
 import random
-import yfinance as yf
-from gtts import gTTS
 from io import BytesIO
+import core
+import analytics
+import cards
+import charts
+from cache import brief_key
+from cities import get_city_index
+from quota import get_quota
+from resilience import breaker_states, deadline
+import prompts
+from llm import OLLAMA_HOST, LLMError
+from pools import get_content_pools, greeting_pool
+from prefetch import Speculator, prompt_key
+from retrieval import JournalIndex
+from storage import BriefStore
+from cachebackends import get_cache_backend, refresh_shared_cached, shared_cached
+from estimates import TaskEstimator, format_minutes
+from classify import PLAYLISTS, QUICK_INTENTS, EmbeddingClassifier, playlist_context
+from assist import AssistSession
+from summarizer import SummaryCache, build_news_digest
 
 # Load environment variables
 load_dotenv(override=True)
@@ -26,7 +40,10 @@ def ensure_ollama_running():
     """
     try:
         # Check if running
-        requests.get("http://localhost:11434")
+        requests.get(OLLAMA_HOST, timeout=deadline("ollama"))
+    except requests.exceptions.ReadTimeout:
+        # Listening but busy (e.g. loading a model): it is running
+        print("Ollama is slow to answer; assuming it is running.")
     except requests.exceptions.ConnectionError:
         print("Ollama not running. Starting 'ollama serve'...")
         try:
@@ -37,10 +54,10 @@ def ensure_ollama_running():
             attempts = 0
             while attempts < 10:
                 try:
-                    requests.get("http://localhost:11434")
+                    requests.get(OLLAMA_HOST, timeout=deadline("ollama"))
                     print("Ollama started successfully.")
                     return
-                except requests.exceptions.ConnectionError:
+                except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
                     time.sleep(1)
                     attempts += 1
             print("Warning: Timed out waiting for Ollama to start.")
@@ -50,33 +67,75 @@ def ensure_ollama_running():
 ensure_ollama_running()
 
 
-# Configure Ollama
-# No API key needed for local Ollama
+@st.cache_resource
+def get_summary_cache():
+    """
+    Process-wide cache of per-article summaries (survives 'Refresh Data'
+    and, through the app cache backend, restarts and replicas).
+    """
+    return SummaryCache(store=get_cache_backend("app"))
 
-def generate_ollama_content(prompt):
+@st.cache_resource
+def get_shared_cache():
     """
-    Generator that yields chunks of text from Ollama.
+    Cache shared with the headless scheduler (scheduler.py) and the API.
     """
-    model_name = "llama3.2:3b"
-    
-    try:
-        response_stream = ollama.chat(
-            model=model_name, 
-            messages=[{'role': 'user', 'content': prompt}], 
-            stream=True
-        )
-        for chunk in response_stream:
-            content = chunk['message']['content']
-            yield content
-
-    except Exception as e:
-        # If streaming fails immediately (e.g. connection), yield error
-        if "Connection refused" in str(e) or "client error" in str(e).lower():
-             raise Exception(f"Ollama server not reachable. Run 'ollama serve'. Error: {e}")
-        else:
-             raise e
+    return get_cache_backend("shared")
+
+@st.cache_resource
+def get_store():
+    """
+    SQLite store for Focus Zone tasks and journal history.
+    """
+    return BriefStore()
+
+@st.cache_resource
+def get_journal_index():
+    """
+    Embedding index over past journal entries (loaded lazily).
+    """
+    return JournalIndex(get_store())
+
+@st.cache_resource
+def get_estimator():
+    """
+    Per-task time estimates: local model, stored LLM answers, one batched call.
+    """
+    return TaskEstimator(get_store())
+
+@st.cache_resource
+def get_classifiers():
+    """
+    Embedding classifiers for the AI playlist pick and Quick Assist's Auto action.
+    """
+    return {"playlist": EmbeddingClassifier(PLAYLISTS), "quick": EmbeddingClassifier(QUICK_INTENTS)}
+
+@st.cache_resource
+def get_speculator():
+    """
+    Shared background prefetcher for the AI panels (opt-in from the sidebar).
+    """
+    return Speculator()
+
+def speculate(prompt):
+    """
+    Starts low-priority background generation of a panel whose inputs are known.
+    """
+    if st.session_state.get('speculative_ai'):
+        get_speculator().speculate(prompt)
+
+def speculated(prompt):
+    """
+    Returns the prefetched answer for this prompt if it is ready, else None.
+    """
+    if st.session_state.get('speculative_ai'):
+        return get_speculator().take(prompt)
+    return None
 
 # --- Helper Functions ---
+# Greetings, wisdom and fun facts are drawn from the AI content pools, which
+# are replenished in batches in the background; the lists below only cover a
+# pool that is still empty.
 def get_greeting():
     hour = datetime.now().hour
     if 5 <= hour < 12:
@@ -87,6 +146,9 @@ def get_greeting():
         return "Good Evening"
 
 def get_daily_wisdom():
+    pooled = get_content_pools().draw("wisdom")
+    if pooled:
+        return pooled
     quotes = [
         "The best way to predict the future is to create it.",
         "Small progress is still progress.",
@@ -99,6 +161,9 @@ def get_daily_wisdom():
     return random.choice(quotes)
 
 def get_fun_fact():
+    pooled = get_content_pools().draw("fun_fact")
+    if pooled:
+        return pooled
     facts = [
         "Honey never spoils. Archaeologists have found pots of honey in ancient Egyptian tombs that are over 3,000 years old and still perfectly edible.",
         "Octopuses have three hearts. Two pump blood to the gills, and one pumps it to the rest of the body.",
@@ -113,35 +178,15 @@ def get_fun_fact():
     return random.choice(facts)
 
 @st.cache_data(ttl=300)
+@shared_cached(ttl=300)
 def get_market_data(ticker_symbol):
-    try:
-        ticker = yf.Ticker(ticker_symbol)
-        history = ticker.history(period="2d")
-        if len(history) >= 2:
-            current_price = history['Close'].iloc[-1]
-            prev_price = history['Close'].iloc[-2]
-            change = ((current_price - prev_price) / prev_price) * 100
-            return current_price, change
-        elif len(history) == 1: # Market might be open but only 1 data point for "2d" if yfinance is weird, try just current
-             current_price = history['Close'].iloc[-1]
-             return current_price, 0.0
-        return None, None
-    except Exception:
-        return None, None
-
-def get_outfit_recommendation(temp, weather_desc):
-    recommendation = "Dress comfortably."
-    if temp < 10:
-        recommendation = "🧥 Wear a heavy jacket, it's cold!"
-    elif 10 <= temp < 20:
-        recommendation = "🧥 Bring a light jacket or sweater."
-    elif temp >= 20:
-        recommendation = "👕 T-shirt weather! Stay cool."
-    
-    if "rain" in weather_desc.lower() or "drizzle" in weather_desc.lower():
-        recommendation += " ☔ Don't forget an umbrella!"
-    
-    return recommendation
+    return core.get_market_data(ticker_symbol)
+
+@shared_cached(ttl=86400)
+def synthesize_audio(text):
+    return core.synthesize_audio(text)
+
+get_outfit_recommendation = core.get_outfit_recommendation
 
 def load_data_on_click(session_key, btn_text, fetch_func):
     """
@@ -162,101 +207,8 @@ def load_data_on_click(session_key, btn_text, fetch_func):
 # Page Config
 st.set_page_config(page_title="Now Brief", layout="wide", page_icon="▣")
 
-# --- Custom CSS for 'Check Box' Design ---
-st.markdown("""
-<style>
-    @import url('https://fonts.googleapis.com/css2?family=Inter:wght@400;600;700&display=swap');
-
-    /* Main Background */
-    .stApp {
-        background-color: #000000; /* Deep Black */
-        color: #ffffff;
-        font-family: 'Inter', sans-serif;
-    }
-    
-    /* Sidebar */
-    [data-testid="stSidebar"] {
-        background-color: #050505;
-        border-right: 1px solid #1a1a1a;
-    }
-
-    /* Headers */
-    h1, h2, h3 {
-        font-family: 'Inter', sans-serif;
-        font-weight: 700;
-        letter-spacing: -0.5px;
-        color: #ffffff;
-    }
-    
-    h1 {
-        font-size: 2.5rem;
-        margin-bottom: 10px;
-    }
-    
-    /* Cards/Containers */
-    .css-1r6slb0, .stColumn, [data-testid="stVerticalBlock"] > [data-testid="stVerticalBlock"] {
-        background-color: #111111; /* Dark Grey Card */
-        border-radius: 24px;
-        padding: 20px;
-        border: 1px solid #222;
-    }
-    
-    /* Inputs */
-    .stTextInput > div > div > input, .stNumberInput > div > div > input {
-        background-color: #1a1a1a;
-        color: #ffffff;
-        border: none;
-        border-radius: 12px;
-        padding: 10px 15px;
-        font-family: 'Inter', sans-serif;
-    }
-    
-    /* Buttons */
-    .stButton > button {
-        background-color: #ccff00; /* Neon Green */
-        color: #000000;
-        border: none;
-        border-radius: 30px;
-        padding: 10px 25px;
-        font-weight: 600;
-        transition: all 0.3s ease;
-    }
-    
-    .stButton > button:hover {
-        background-color: #b3e600;
-        transform: scale(1.02);
-    }
-    
-    /* Metrics */
-    [data-testid="stMetricValue"] {
-        font-family: 'Inter', sans-serif;
-        font-weight: 700;
-        color: #ffffff;
-    }
-    
-    [data-testid="stMetricLabel"] {
-        color: #888888;
-        font-size: 0.9rem;
-    }
-    
-    /* Divider */
-    hr {
-        border-color: #222;
-    }
-    
-    /* Chat */
-    .stChatMessage {
-        background-color: #111111;
-        border-radius: 16px;
-        border: 1px solid #222;
-    }
-    
-    /* Custom Classes for Accents */
-    .accent-green { color: #ccff00; }
-    .accent-orange { color: #ff9900; }
-    
-</style>
-""", unsafe_allow_html=True)
+# --- Custom CSS for 'Check Box' Design (card classes included, minified once) ---
+st.markdown(cards.STYLE_TAG, unsafe_allow_html=True)
 
 # --- Sidebar Navigation (About Team) ---
 with st.sidebar:
@@ -267,13 +219,44 @@ with st.sidebar:
     selected_city = st.selectbox("Select Location", city_options, label_visibility="collapsed")
     
     if selected_city == "Type your own...":
-        sidebar_city = st.text_input("Enter City Name", placeholder="e.g. Chicago")
+        typed_city = st.text_input("Enter City Name", placeholder="e.g. Chicago")
+        sidebar_city = typed_city
+        # Normalise to a canonical city from the offline index before any network call
+        city_index = get_city_index()
+        if typed_city and city_index is not None:
+            city_matches = city_index.suggest(typed_city)
+            if city_matches:
+                picked = st.selectbox("Matches", city_matches, format_func=lambda c: c['label'],
+                                      label_visibility="collapsed")
+                sidebar_city = picked['label']
+                core.remember_city_id(sidebar_city, picked['id'], get_shared_cache())
+            else:
+                st.warning(f"No city called '{typed_city}' found.")
+                sidebar_city = ""
     else:
         sidebar_city = selected_city
 
     if st.button("🔄 Refresh Data"):
+        # Every layer: quota freshness window, shared app cache, st.cache_data
+        get_quota().invalidate()
+        refresh_shared_cached()
         st.cache_data.clear()
         st.rerun()
+    # Upstream budgets are shared by all sessions; reruns within a provider's
+    # freshness window are served from the quota cache, Refresh Data refetches
+    st.caption("API quota left: " + " · ".join(
+        f"{q['provider']} {q['remaining']}/{q['capacity']}" for q in get_quota().report()))
+    offline = [name for name, b in breaker_states().items() if b['state'] != "closed"]
+    if offline:
+        st.caption(f"⚠️ {', '.join(offline)} unreachable, showing last known data")
+
+    st.toggle("⚡ Speculative AI", key="speculative_ai",
+              help="Pre-generate AI Insight, Analyze Mood and Estimate Time in the background once their data is loaded.")
+    if st.session_state.get('speculative_ai'):
+        spec_rate = get_speculator().hit_rate()
+        spec_m = get_speculator().metrics
+        st.caption(f"Prefetch hit rate: {'–' if spec_rate is None else f'{spec_rate:.0%}'} · "
+                   f"{spec_m['submitted']} started · {spec_m['over_budget']} over budget")
 
     
     st.markdown("### About Our Team")
@@ -287,52 +270,50 @@ with st.sidebar:
 
 # --- Global Data Fetching ---
 # --- Data Fetching Functions (Lazy Loading) ---
+# st.cache_data is the in-process fast path; shared_cached keeps a copy in the
+# app cache backend (warm snapshot, SQLite or Redis) so a restarted server or
+# another replica starts with warm data and only one of them recomputes it.
 @st.cache_data(ttl=3600)
+@shared_cached(ttl=3600)
 def fetch_weather_data(city_name):
-    weather_api_key = os.getenv("WEATHER_API_KEY")
-    if weather_api_key and city_name:
-        try:
-            weather_url = f"http://api.openweathermap.org/data/2.5/weather?q={city_name}&appid={weather_api_key}&units=metric"
-            w_response = requests.get(weather_url)
-            if w_response.status_code == 200:
-                data = w_response.json()
-                # Create simplified summary for top bar
-                temp = data['main']['temp']
-                desc = data['weather'][0]['description']
-                summary = f"{temp:.1f}°C, {desc}"
-                return {"full": data, "summary": summary}
-        except Exception:
-            pass
-    return None
+    return core.fetch_weather_data(city_name)
+
+@st.cache_data(ttl=3600)
+@shared_cached(ttl=3600)
+def fetch_multi_city_weather(city_names):
+    return core.fetch_multi_city_weather(list(city_names), store=get_shared_cache())
 
 @st.cache_data(ttl=3600)
+@shared_cached(ttl=3600)
 def fetch_news_data():
-    news_api_key = os.getenv("NEWS_API_KEY")
-    if news_api_key:
-        try:
-            news_url = f"https://newsapi.org/v2/top-headlines?country=us&apiKey={news_api_key}&pageSize=4"
-            n_response = requests.get(news_url)
-            if n_response.status_code == 200:
-                articles = n_response.json().get('articles', [])
-                headlines = ", ".join([a['title'] for a in articles[:3]])
-                return {"articles": articles, "headlines": headlines}
-        except Exception:
-            pass
-    return None
+    return core.fetch_news_data()
 
 @st.cache_data(ttl=3600)
+@shared_cached(ttl=300)
 def fetch_market_metrics():
-    curr_tickers = {
-        "BTC": "BTC-USD",
-        "S&P 500": "SPY",
-        "NIFTY 50": "^NSEI",
-        "SENSEX": "^BSESN"
-    }
-    results = []
-    for name, symbol in curr_tickers.items():
-        price, change = get_market_data(symbol)
-        results.append((name, price, change))
-    return results
+    return core.fetch_market_metrics(get_quote=get_market_data)
+
+# --- Precomputed Morning Brief ---
+# If the scheduler already built today's brief for this city, seed the session
+# from the shared cache so page open needs no network or LLM calls.
+if sidebar_city and st.session_state.get('precomputed_city') != sidebar_city:
+    st.session_state['precomputed_city'] = sidebar_city
+    p_key = brief_key(sidebar_city, datetime.now().strftime("%Y-%m-%d"))
+    try:
+        p_brief = get_shared_cache().get(p_key)
+        p_audio = get_shared_cache().get(p_key + ":audio")
+    except Exception:
+        p_brief, p_audio = None, None
+
+    if p_brief:
+        st.session_state['weather_data'] = p_brief['weather']
+        st.session_state['current_city'] = sidebar_city
+        st.session_state['news_data'] = p_brief['news']
+        st.session_state['daily_briefing_text'] = p_brief['briefing']
+        st.session_state['dynamic_greeting'] = p_brief['greeting']
+        if p_audio:
+            st.session_state['briefing_audio'] = BytesIO(p_audio)
+            st.session_state['briefing_text_hash'] = hash(p_brief['briefing'])
 
 # --- Top Bar Area ---
 c1, c2, c3 = st.columns([2, 2, 1])
@@ -341,26 +322,18 @@ with c1:
     current_time = datetime.now().strftime("%B %d, %Y | %I:%M %p")
     
     # --- Dynamic Greeting Logic ---
-    greeting_text = get_greeting() # Default
-    
-    # Try to generate dynamic if weather exists and not cached
+    # Drawn from the pool for this time of day and weather: no LLM call here
     w_data_g = st.session_state.get('weather_data')
     if w_data_g and 'dynamic_greeting' not in st.session_state:
         try:
-            temp_g = w_data_g['full']['main']['temp']
-            desc_g = w_data_g['full']['weather'][0]['description']
-            prompt_g = f"Generate a short, stimulating greeting (max 8 words) for a user at {current_time} where the weather is {desc_g}, {temp_g}C. No quotes."
-            
-            # Non-streaming for this small piece
-            full_g = ""
-            for chunk in generate_ollama_content(prompt_g):
-                full_g += chunk
-            st.session_state['dynamic_greeting'] = full_g.strip()
-        except:
-             pass # Fail silently to default
+            main_g = w_data_g['full']['weather'][0]['main']
+            pooled_g = get_content_pools().draw(greeting_pool(datetime.now().hour, main_g))
+            if pooled_g:
+                st.session_state['dynamic_greeting'] = pooled_g
+        except (KeyError, IndexError, TypeError):
+            pass # Fall back to the default
 
-    if 'dynamic_greeting' in st.session_state:
-        greeting_text = st.session_state['dynamic_greeting']
+    greeting_text = st.session_state.get('dynamic_greeting') or get_greeting()
 
     st.markdown(f"<p style='color: #888; margin-top: -10px;'>{greeting_text} &nbsp; <span style='color: #ccff00;'>{current_time}</span></p>", unsafe_allow_html=True)
 
@@ -378,18 +351,8 @@ with c2:
     # Placeholder for the briefing card
     briefing_placeholder = st.empty()
     
-    # Define the HTML template function to avoid repetition
     def render_briefing_card(text, outfit_text):
-        briefing_placeholder.markdown(
-            f"""
-            <div style="background-color: #1a1a1a; padding: 15px; border-radius: 12px; border-left: 4px solid #ccff00; height: 100%;">
-                <div style="font-size: 0.8rem; color: #ccff00; font-weight: 600; margin-bottom: 4px;">DAILY BRIEFING</div>
-                <div style="color: #ddd; font-size: 0.9rem; margin-bottom: 8px;">{text}</div>
-                <div style="font-size: 0.85rem; color: #888; font-style: italic;">{outfit_text}</div>
-            </div>
-            """, 
-            unsafe_allow_html=True
-        )
+        briefing_placeholder.markdown(cards.render("briefing", text=text, outfit=outfit_text), unsafe_allow_html=True)
 
     outfit = "Check outside!"
     if w_data:
@@ -397,22 +360,32 @@ with c2:
 
     # If we have data but NO briefing yet, generate it
     if w_data and n_data and not briefing_text:
-        prompt = f"""
-        Generate a witty, 3-sentence executive summary of the day based on this info:
-        Weather: {w_summary}
-        News: {n_headlines}
-        
-        Keep it professional yet engaging, like a personal assistant.
-        """
         try:
             full_text = ""
             # Render initial loading state
             render_briefing_card("Thinking...", outfit)
+
+            # Summarise all fetched articles (cached per URL), fall back to titles
+            try:
+                n_digest = build_news_digest(n_data['articles'], prompts.stream, get_summary_cache())
+            except Exception:
+                n_digest = n_headlines
+
+            prompt = core.build_briefing_prompt(w_summary, n_digest)
             
-            # Stream response
-            for chunk in generate_ollama_content(prompt):
-                full_text += chunk
+            # Same inputs as a briefing generated before (even before a restart)? Reuse it
+            b_key = f"briefing:{prompt_key(prompt)}"
+            full_text = get_cache_backend("app").get(b_key, "")
+            if full_text:
                 render_briefing_card(full_text, outfit)
+            else:
+                # Stream response (throttled: not one card per token)
+                card = cards.CardStream(briefing_placeholder, "briefing", outfit=outfit)
+                for chunk in prompts.stream(prompt):
+                    full_text += chunk
+                    card.update(text=full_text)
+                card.flush()
+                get_cache_backend("app").set(b_key, full_text, ttl=6 * 3600)
             
             # Save to session
             st.session_state['daily_briefing_text'] = full_text
@@ -435,10 +408,7 @@ with c2:
         # Cache audio to avoid re-generating
         if 'briefing_audio' not in st.session_state or st.session_state.get('briefing_text_hash') != hash(briefing_text):
             try:
-                tts = gTTS(briefing_text, lang='en')
-                audio_buffer = BytesIO()
-                tts.write_to_fp(audio_buffer)
-                st.session_state['briefing_audio'] = audio_buffer
+                st.session_state['briefing_audio'] = BytesIO(synthesize_audio(briefing_text))
                 st.session_state['briefing_text_hash'] = hash(briefing_text)
             except Exception as e:
                 # If offline/error, just skip audio
@@ -449,32 +419,15 @@ with c2:
 
 with c3:
     # --- AI Fun Fact ---
+    # One draw per session from the background-filled pools
     if 'ai_fun_fact' not in st.session_state:
-        # Default placeholder
-        st.session_state['ai_fun_fact'] = "Did you know? Octopuses have three hearts."
-        
-        # Try generate
-        try:
-             prompt_f = "Tell me a random, mind-blowing fun fact. Max 1 sentence. No intro."
-             fact_text = ""
-             for chunk in generate_ollama_content(prompt_f):
-                 fact_text += chunk
-             if fact_text:
-                 st.session_state['ai_fun_fact'] = fact_text.strip().strip('"')
-        except:
-            pass
+        st.session_state['ai_fun_fact'] = get_fun_fact()
+        st.session_state['daily_wisdom'] = get_daily_wisdom()
 
     fact_content = st.session_state['ai_fun_fact']
 
-    st.markdown(
-        f"""
-        <div style="background-color: #1a1a1a; padding: 15px; border-radius: 12px; border-left: 4px solid #00bfff;">
-            <div style="font-size: 0.8rem; color: #00bfff; font-weight: 600; margin-bottom: 4px;">DID YOU KNOW?</div>
-            <div style="font-style: italic; color: #ddd; font-size: 0.9rem;">"{fact_content}"</div>
-        </div>
-        """, 
-        unsafe_allow_html=True
-    )
+    st.markdown(cards.render("fun_fact", fact=fact_content), unsafe_allow_html=True)
+    st.caption(f"💡 {st.session_state['daily_wisdom']}")
 
 st.markdown("---")
 
@@ -515,55 +468,37 @@ with col1:
         current_city = st.session_state.get('current_city', sidebar_city)
         
         try:
-            weather_api_key = os.getenv("WEATHER_API_KEY")
-            forecast_url = f"http://api.openweathermap.org/data/2.5/forecast?q={current_city}&appid={weather_api_key}&units=metric"
-            fore_response = requests.get(forecast_url)
-            fore_data = fore_response.json()
+            forecast_list = core.fetch_forecast(current_city)
             
-            if fore_response.status_code == 200:
-                forecast_list = fore_data['list'][:8]
+            if forecast_list:
+                forecast_list = forecast_list[:8]
                 dates = [datetime.fromtimestamp(item['dt']) for item in forecast_list]
                 temps = [item['main']['temp'] for item in forecast_list]
                 
-                # Plotly Graph
-                fig = go.Figure()
-                fig.add_trace(go.Scatter(
-                    x=dates, y=temps,
-                    mode='lines',
-                    line=dict(color='#ccff00', width=3, shape='spline'),
-                    fill='tozeroy',
-                    fillcolor='rgba(204, 255, 0, 0.1)'
-                ))
-                fig.update_layout(
-                    plot_bgcolor='rgba(0,0,0,0)',
-                    paper_bgcolor='rgba(0,0,0,0)',
-                    font=dict(color='#888', family="Inter"),
-                    xaxis=dict(showgrid=False, showticklabels=False),
-                    yaxis=dict(showgrid=True, gridcolor='#222'),
-                    margin=dict(l=0, r=0, t=10, b=0),
-                    height=150
-                )
-                st.plotly_chart(fig, use_container_width=True)
+                # 150 px sparkline: inline SVG unless full Plotly charts are configured
+                if charts.SPARKLINES:
+                    st.markdown(charts.sparkline_svg(temps), unsafe_allow_html=True)
+                else:
+                    st.plotly_chart(charts.figure(charts.forecast_figure, dates, temps), use_container_width=True)
         except:
              st.info("Forecast unavailable")
 
         # --- AI Weather Analyst ---
         st.markdown("---")
+        desc = full_data['weather'][0]['description']
+        w_speed = full_data['wind']['speed']
+        w_prompt = prompts.render("weather_insight", desc=desc, temp=temp, humidity=humidity, wind=w_speed)
+        speculate(w_prompt)
+
         if st.button("🌤️ AI Insight", use_container_width=True):
              with st.spinner("Analyzing weather patterns..."):
-                 desc = full_data['weather'][0]['description']
-                 w_speed = full_data['wind']['speed']
-                 w_prompt = f"Analyze: Weather '{desc}', Temp {temp}C, Humidity {humidity}%, Wind {w_speed}m/s. Provide 3 short bullet points: 1) Outfit 2) Best Activity 3) Health Note. No intro."
-                 
+                 pre_insight = speculated(w_prompt)
                  w_insight = ""
-                 w_cont = st.empty()
-                 for chunk in generate_ollama_content(w_prompt):
+                 w_card = cards.CardStream(st.empty(), "insight")
+                 for chunk in ([pre_insight] if pre_insight else prompts.stream(w_prompt)):
                      w_insight += chunk
-                     w_cont.markdown(f"""
-                     <div style="background-color:#222; padding:10px; border-radius:8px; font-size:0.85rem; border:1px solid #444;">
-                        {w_insight}
-                     </div>
-                     """, unsafe_allow_html=True)
+                     w_card.update(text=w_insight)
+                 w_card.flush()
     else:
         st.info("Enter city and click 'Get Weather'")
 
@@ -574,19 +509,9 @@ with col2:
     
     if news_result:
         articles = news_result['articles']
-        for i, article in enumerate(articles):
+        for i, article in enumerate(articles[:4]):
             # Alternating Colors for "Pills"
-            bg_color = "#ccff00" if i % 2 == 0 else "#ff9900"
-            
-            st.markdown(
-                f"""
-                <div style="background-color: #1a1a1a; padding: 10px; border-radius: 12px; margin-bottom: 10px; border-left: 5px solid {bg_color};">
-                    <div style="font-size: 0.8rem; color: #888;">{article['source']['name']}</div>
-                    <div style="font-weight: 600; font-size: 0.9rem;"><a href="{article['url']}" style="color: #fff; text-decoration: none;">{article['title'][:60]}...</a></div>
-                </div>
-                """, 
-                unsafe_allow_html=True
-            )
+            st.markdown(cards.news_pill(article, i), unsafe_allow_html=True)
     else:
         st.info("News Unavailable / No Data")
 
@@ -622,17 +547,7 @@ with col3:
         # Helper to display simple metric
         def display_mini_metric(col, label, val, chg):
             if val is not None:
-                color = "#ccff00" if chg >= 0 else "#ff4444"
-                arrow = "▲" if chg >= 0 else "▼"
-                col.markdown(
-                    f"""
-                    <div style="background-color: #1a1a1a; padding: 8px; border-radius: 8px; margin-bottom: 8px; border: 1px solid #333;">
-                        <div style="font-size: 0.75rem; color: #888;">{label}</div>
-                        <div style="font-size: 1rem; font-weight: 700; color: #fff;">{val:,.0f}</div>
-                        <div style="font-size: 0.75rem; color: {color};">{arrow} {abs(chg):.2f}%</div>
-                    </div>
-                    """, unsafe_allow_html=True
-                )
+                col.markdown(cards.market_tile(label, val, chg), unsafe_allow_html=True)
             else:
                 col.info(f"{label} N/A")
 
@@ -643,15 +558,17 @@ with col3:
             display_mini_metric(row2_c2, market_metrics[3][0], market_metrics[3][1], market_metrics[3][2]) # SENSEX
             
             # --- AI Market Mood ---
+            # Format data for AI
+            changes_str = ", ".join([f"{item[0]}: {item[2]:.2f}%" for item in market_metrics if item[2] is not None])
+            prompt_m = prompts.render("market_vibe", changes=changes_str)
+            speculate(prompt_m)
+
             if st.button("🔮 Analyze Mood", use_container_width=True):
-                # Format data for AI
-                changes_str = ", ".join([f"{item[0]}: {item[2]:.2f}%" for item in market_metrics])
-                prompt_m = f"Given these 24h market changes: {changes_str}. Give a witty, 1-sentence 'Market Vibe' summary. No quotes."
-                
                 with st.spinner("Analyzing markets..."):
+                    pre_vibe = speculated(prompt_m)
                     m_container = st.empty()
                     f_text = ""
-                    for chunk in generate_ollama_content(prompt_m):
+                    for chunk in ([pre_vibe] if pre_vibe else prompts.stream(prompt_m)):
                         f_text += chunk
                         m_container.info(f"**Vibe:** {f_text}")
     else:
@@ -672,43 +589,52 @@ with col3:
     # Fetch Exchange Rate
     try:
         # Using open.er-api.com (No API Key required)
-        forex_url = f"https://open.er-api.com/v6/latest/{base_currency}"
-        forex_response = requests.get(forex_url)
-        forex_data = forex_response.json()
+        forex_rates = core.fetch_exchange_rates(base_currency)
         
-        if forex_response.status_code == 200:
-            inr_rate = forex_data['rates']['INR']
+        if forex_rates:
+            inr_rate = forex_rates['INR']
             converted_amount = amount * inr_rate
             
             st.markdown(f"<h1 style='color:#fff'>₹ {converted_amount:,.2f}</h1>", unsafe_allow_html=True)
             st.caption(f"1 {base_currency} = ₹ {inr_rate:,.2f}")
             
-            # Simple Bar Chart
-            fig = go.Figure()
-            fig.add_trace(go.Bar(
-                x=[base_currency, 'INR'],
-                y=[amount, converted_amount], 
-                marker_color=['#ccff00', '#ff9900'],
-                text=[f"{amount:,.0f}", f"₹{converted_amount:,.0f}"],
-                textposition='auto',
-            ))
-            fig.update_layout(
-                plot_bgcolor='rgba(0,0,0,0)',
-                paper_bgcolor='rgba(0,0,0,0)',
-                font=dict(color='#fff', family="Inter"),
-                xaxis=dict(showgrid=False),
-                yaxis=dict(showgrid=False, showticklabels=False),
-                margin=dict(l=0, r=0, t=20, b=0),
-                height=200,
-                bargap=0.4
-            )
-            fig.update_traces(marker_line_width=0, selector=dict(type="bar"))
+            # Simple Bar Chart (built once per currency / amount)
+            fig = charts.figure(charts.forex_figure, base_currency, amount, converted_amount)
             st.plotly_chart(fig, use_container_width=True)
         else:
              st.error("Rate Unavailable")
     except Exception:
         st.error("Connection Error")
 
+# --- City Comparison (all sidebar cities, one batched fetch) ---
+with st.expander("🌍 City Comparison"):
+    grid_cities = tuple(c for c in city_options if c != "Type your own...")
+    grid_result = load_data_on_click("city_grid", "🌍 Compare Cities", lambda: fetch_multi_city_weather(grid_cities))
+
+    if grid_result:
+        grid_rows = [
+            {
+                "City": city,
+                "Temp (°C)": round(res['full']['main']['temp'], 1),
+                "Humidity (%)": res['full']['main']['humidity'],
+                "Wind (m/s)": res['full']['wind']['speed'],
+                "Conditions": res['full']['weather'][0]['description'],
+            }
+            for city, res in grid_result.items() if res
+        ]
+        if grid_rows:
+            grid_df = pd.DataFrame(grid_rows).sort_values("Temp (°C)", ascending=False)
+            g_table, g_chart = st.columns([3, 2])
+            with g_table:
+                st.dataframe(grid_df, hide_index=True, use_container_width=True)
+            with g_chart:
+                fig = charts.figure(charts.city_temps_figure, grid_df['City'].tolist(),
+                                    grid_df['Temp (°C)'].tolist(), sidebar_city)
+                st.plotly_chart(fig, use_container_width=True)
+        missing = [city for city, res in grid_result.items() if not res]
+        if missing:
+            st.caption(f"Unavailable: {', '.join(missing)}")
+
 # --- Focus Zone & Vibe Station ---
 st.markdown("---")
 c_focus, c_vibe = st.columns([2, 1])
@@ -719,8 +645,9 @@ with c_focus:
     c_title.markdown("### ⚡ FOCUS ZONE")
     tough_love = c_mode.toggle("🥊 Tough Love")
     
+    # Tasks are {id, text} dicts; one indexed read restores them on reload
     if 'tasks' not in st.session_state:
-        st.session_state['tasks'] = []
+        st.session_state['tasks'] = get_store().pending_tasks()
     
     # Add Task
     with st.form("focus_form", clear_on_submit=True):
@@ -734,7 +661,7 @@ with c_focus:
         
         if task_input:
             if submitted_add:
-                st.session_state['tasks'].append(task_input)
+                st.session_state['tasks'].extend(get_store().add_tasks([task_input]))
                 st.rerun()
             elif submitted_ai:
                 with st.spinner("Breaking down task..."):
@@ -742,11 +669,11 @@ with c_focus:
                     if tough_love:
                         tone_instruction = "Be strict, demanding, and direct. No fluff. Order the user."
                     
-                    prompt = f"Break down the task '{task_input}' into 3-4 actionable, single-line sub-tasks. {tone_instruction} Output ONLY the lines."
+                    prompt = prompts.render("task_breakdown", tone=tone_instruction, task=task_input)
                     
                     # Consume the generator
                     full_text = ""
-                    for chunk in generate_ollama_content(prompt):
+                    for chunk in prompts.stream(prompt):
                         full_text += chunk
                     
                     # Process lines
@@ -754,30 +681,43 @@ with c_focus:
                     # Filter out bullets if model produces them
                     subtasks = [s.lstrip('-*•1234567890. ') for s in subtasks]
                     
-                    st.session_state['tasks'].extend(subtasks)
+                    st.session_state['tasks'].extend(get_store().add_tasks(subtasks))
                     st.rerun()
 
     # Task List
     if st.session_state['tasks']:
-        # Use list so we can modify it while iterating
-        for i, task in enumerate(st.session_state['tasks']):
+        # Collect ticked tasks first, then complete them in one batched write
+        done_ids = []
+        for task in st.session_state['tasks']:
             # Use the task name AS the label so it aligns perfectly
-            if st.checkbox(task, key=f"fz_task_{i}"):
-                st.session_state['tasks'].pop(i)
-                st.rerun()
+            if st.checkbox(task['text'], key=f"fz_task_{task['id']}"):
+                done_ids.append(task['id'])
+
+        if done_ids:
+            get_store().complete_tasks(done_ids)
+            st.session_state['tasks'] = [t for t in st.session_state['tasks'] if t['id'] not in done_ids]
+            st.rerun()
         
+        # Only tasks without a local or stored estimate need the (batched) LLM call
+        task_texts = [t['text'] for t in st.session_state['tasks']]
+        p_est = get_estimator().batch_prompt(task_texts)
+        if p_est:
+            speculate(p_est)
+
         if st.button("⏱️ Estimate Time"):
             with st.spinner("Calculating..."):
-                tasks_str = ", ".join(st.session_state['tasks'])
-                tone_est = "Return a short estimate like '2 hours'."
+                est = get_estimator().estimate(task_texts, answer=speculated(p_est) if p_est else None)
+                total_est = format_minutes(est['total'])
                 if tough_love:
-                    tone_est = "Be a tough coach. Call out procrastination. Give a strict estimate."
-                
-                p_est = f"Estimate the total time for these tasks: {tasks_str}. {tone_est}"
-                est_text = ""
-                for chunk in generate_ollama_content(p_est):
-                    est_text += chunk
+                    longest = max(est['tasks'], key=lambda t: t[1])[0] if est['tasks'] else None
+                    est_text = f"{total_est}. No excuses." + (f" Start with '{longest}' now." if longest else "")
+                else:
+                    est_text = f"about {total_est}"
                 st.caption(f"**Estimate:** {est_text}")
+                src = est['sources']
+                st.caption(" · ".join(f"{t} ~{format_minutes(m)}" for t, m, _ in est['tasks']) +
+                           f"  \n{src['model']} learned from your pace, {src['cached']} remembered, "
+                           f"{src['llm']} new" + (f", {est['missing']} not estimated" if est['missing'] else ""))
 
     else:
         st.info("No active tasks. Time to relax or plan ahead! 🚀")
@@ -785,34 +725,69 @@ with c_focus:
     # --- AI Quick Assist ---
     st.markdown("---")
     with st.expander("⚡ AI Quick Assist"):
-        st.caption("Ask me anything or use quick actions.")
+        st.caption("Ask me anything or use quick actions. Follow-ups remember the conversation.")
+        # One conversation per browser session; older turns are compacted into a digest
+        if 'qa_session' not in st.session_state:
+            st.session_state['qa_session'] = AssistSession()
+        qa_session = st.session_state['qa_session']
+        for qa_label, qa_answer in qa_session.transcript:
+            with st.chat_message("user"):
+                st.markdown(qa_label)
+            with st.chat_message("assistant"):
+                st.markdown(qa_answer)
         quick_input = st.text_area("Request", height=70, label_visibility="collapsed", placeholder="Draft an email, explain a concept...")
         
-        c_qa1, c_qa2, c_qa3 = st.columns(3)
+        c_qa1, c_qa2, c_qa3, c_qa4 = st.columns(4)
         do_draft = c_qa1.button("✉️ Draft")
         do_brain = c_qa2.button("💡 Ideas")
         do_xplain = c_qa3.button("🎓 Explain")
+        do_auto = c_qa4.button("🪄 Auto")
         
-        qa_prompt = ""
-        if do_draft and quick_input:
-            qa_prompt = f"Draft a professional email/message about: {quick_input}"
+        qa_prompt = None
+        if do_auto and quick_input:
+            # Pick the action by embedding similarity instead of asking the model
+            try:
+                qa_intent = get_classifiers()["quick"].classify(quick_input)
+            except LLMError:
+                qa_intent = "explain"  # No embedding model available
+            qa_prompt = prompts.render(f"quick_{qa_intent}", text=quick_input)
+        elif do_draft and quick_input:
+            qa_prompt = prompts.render("quick_draft", text=quick_input)
         elif do_brain and quick_input:
-            qa_prompt = f"Brainstorm creative ideas for: {quick_input}"
+            qa_prompt = prompts.render("quick_ideas", text=quick_input)
         elif do_xplain and quick_input:
-            qa_prompt = f"Explain this concept simply: {quick_input}"
+            qa_prompt = prompts.render("quick_explain", text=quick_input)
         
         if qa_prompt:
-            qa_container = st.empty()
-            full_qa = ""
-            for chunk in generate_ollama_content(qa_prompt):
-                full_qa += chunk
-                qa_container.markdown(full_qa)
+            qa_label = f"**{qa_prompt.template.split('_')[1].capitalize()}:** {quick_input}"
+            with st.chat_message("user"):
+                st.markdown(qa_label)
+            with st.chat_message("assistant"):
+                qa_container = st.empty()
+                full_qa = ""
+                for chunk in qa_session.stream(qa_prompt, label=qa_label):
+                    full_qa += chunk
+                    qa_container.markdown(full_qa)
+
+        if qa_session.report:
+            qa_last = qa_session.report[-1]
+            qa_tot = qa_session.totals()
+            if qa_last['evaluated'] is not None:
+                st.caption(f"Turn {qa_last['turn']}: {qa_last['evaluated']} prompt tokens evaluated · "
+                           f"estimated: ~{qa_last['prompt_tokens_est']} in the prompt, "
+                           f"~{qa_last['reused_est']} reused from cache, "
+                           f"~{qa_last['naive_tokens_est']} with the full history · "
+                           f"session: ~{qa_tot['reused_est']} of ~{qa_tot['prompt_tokens_est']} reused")
+            if st.button("🧹 New conversation"):
+                qa_session.wait()
+                del st.session_state['qa_session']
+                st.rerun()
 
 # --- Vibe Station (Right) ---
 with c_vibe:
     st.markdown("### 🎧 VIBE STATION")
     
-    mood_options = {
+    mood_options = {  # names match classify.PLAYLISTS
         "Morning Chill": "https://open.spotify.com/embed/playlist/37i9dQZF1DX2sUQwD7tbmL",
         "Focus Flow": "https://open.spotify.com/embed/playlist/37i9dQZF1DWWQRwui0ExPn",
         "Upbeat Energy": "https://open.spotify.com/embed/playlist/37i9dQZF1DX6VdMW310YC7", 
@@ -827,29 +802,30 @@ with c_vibe:
         elif h >= 18: default_mood = "Upbeat Energy"
         st.session_state['selected_mood'] = default_mood
 
-    # Contextual DJ Logic
+    # Contextual DJ Logic: nearest playlist description to the current context
     if st.button("✨ AI Pick"):
          with st.spinner("Listening to the vibe..."):
-             # Gather Context
-             ctx_weather = "Unknown"
+             ctx_weather = None
              if st.session_state.get('weather_data'):
-                 ctx_weather = st.session_state['weather_data']['summary']
-             
+                 ctx_weather = st.session_state['weather_data']['full']['weather'][0]['main']
              ctx_tasks = len(st.session_state.get('tasks', []))
-             
-             p_dj = f"Select the best playlist from {list(mood_options.keys())} for a user where Weather={ctx_weather}, Time={h}:00, PendingTasks={ctx_tasks}. Return ONLY the exact playlist name."
-             
-             ai_pick = ""
-             for chunk in generate_ollama_content(p_dj):
-                 ai_pick += chunk
-             ai_pick = ai_pick.strip()
-             
-             # fuzzy match or exact match
-             for m in mood_options.keys():
-                 if m in ai_pick:
-                     st.session_state['selected_mood'] = m
-                     st.rerun()
-                     break
+
+             try:
+                 ai_pick = get_classifiers()["playlist"].classify(playlist_context(ctx_weather, h, ctx_tasks))
+             except LLMError:
+                 # No embedding model available: let the chat model pick, then match the name
+                 try:
+                     p_dj = prompts.render("playlist_pick", options=list(mood_options.keys()),
+                                           weather=ctx_weather or "Unknown", hour=h, tasks=ctx_tasks)
+                     answer = prompts.complete(p_dj)
+                     ai_pick = next((m for m in mood_options if m in answer), None)
+                 except LLMError:
+                     ai_pick = None
+                     st.warning("AI Pick needs Ollama running. Keeping the current playlist.")
+             if ai_pick in mood_options and ai_pick != st.session_state['selected_mood']:
+                 st.session_state['selected_mood'] = ai_pick
+                 st.session_state['mood_selector'] = ai_pick # the keyed selectbox ignores index once set
+                 st.rerun()
                      
     # Display Selectbox bound to session state
     # We use a callback to sync manual changes back to state (or just rely on key)
@@ -880,7 +856,15 @@ st.markdown("---")
 st.markdown("### 🧠 Mindful Journal")
 
 if 'journal_result' not in st.session_state:
+    # Restore the most recent reflection from history
+    last_entry = get_store().latest_journal_entry()
     st.session_state['journal_result'] = None
+    if last_entry:
+        st.session_state['journal_result'] = {
+            "score": last_entry['score'] if last_entry['score'] is not None else "?",
+            "advice": last_entry['advice'],
+            "full_text": last_entry['full_text'],
+        }
 
 # Input Area
 journal_entry = st.text_area("What's on your mind?", height=100, placeholder="Pour your thoughts here...")
@@ -891,20 +875,20 @@ if st.button("Reflect & Analyze", type="primary"):
             # Container for streaming
             stream_container = st.empty()
             full_text = ""
+
+            # Long-term memory: top-k relevant past snippets under a fixed token budget
+            past_context, entry_vector = "", None
+            try:
+                past_context, entry_vector = get_journal_index().build_context(journal_entry)
+            except Exception:
+                pass # No embedding model available, reflect on this entry alone
+            past_block = f"Relevant moments from their past entries (for context only):\n{past_context}\n\n" if past_context else ""
             
             # Conversational Prompt
-            prompt = f"""
-            You are a mindful therapeutic AI. 
-            User's Journal Entry: "{journal_entry}"
-            
-            1. First, estimate a Mood Score (1-10) based on the text. Format it EXACTLY like this: "Mood Score: 7/10".
-            2. Then, provide a warm, empathetic, and insightful reflection on their entry. Offer 1-2 actionable tips for their day.
-            
-            Start directly with the Mood Score.
-            """
+            prompt = prompts.render("journal_reflection", past=past_block, entry=journal_entry)
             
             # Stream response
-            for chunk in generate_ollama_content(prompt):
+            for chunk in prompts.stream(prompt):
                 full_text += chunk
                 # Live update the advice box
                 stream_container.success(f"**Insight:** \n\n{full_text}")
@@ -920,6 +904,12 @@ if st.button("Reflect & Analyze", type="primary"):
             
             result = {"score": score_val, "advice": advice_clean, "full_text": full_text}
             st.session_state['journal_result'] = result
+            entry_id = get_store().add_journal_entry(
+                journal_entry, int(score_val) if score_val.isdigit() else None, advice_clean, full_text,
+                weather=st.session_state.get('weather_data')
+            )
+            if entry_vector is not None:
+                get_journal_index().add(entry_id, entry_vector)
             
             # Rerun to update the Metric display properly if separate
             st.rerun()
@@ -938,3 +928,27 @@ if st.session_state.get('journal_result'):
     # If we just streamed it, it's already there, but on rerun we need to show it.
     st.success(f"**Insight:** \n\n{res.get('full_text', res.get('advice'))}")
 
+# --- Mood Trends (from the daily rollup) ---
+mood_df = analytics.mood_frame(get_store().mood_rollup())
+if mood_df['score'].notna().any():
+    with st.expander("📈 Mood Trends"):
+        mood_streaks = analytics.streaks(mood_df)
+        s1, s2, s3 = st.columns(3)
+        s1.metric("Journal Streak", f"{mood_streaks['journal_current']} days", f"best {mood_streaks['journal_best']}", delta_color="off")
+        s2.metric("Good-Mood Streak", f"{mood_streaks['good_current']} days", f"best {mood_streaks['good_best']}", delta_color="off")
+        avg_7d = analytics.rolling_averages(mood_df)['avg_7d'].iloc[-1]
+        s3.metric("7-Day Avg", f"{avg_7d:.1f}/10" if pd.notna(avg_7d) else "—") # NaN: no scores in the last 7 days
+
+        st.plotly_chart(analytics.mood_trend_figure(mood_df), use_container_width=True)
+
+        t_week, t_weather = st.columns(2)
+        with t_week:
+            st.caption("Mood by weekday")
+            st.plotly_chart(analytics.weekday_figure(analytics.weekday_profile(mood_df)), use_container_width=True)
+        with t_weather:
+            temp_r, by_condition = analytics.weather_correlation(mood_df)
+            st.caption("Mood vs. weather")
+            if temp_r is not None and pd.notna(temp_r):
+                st.markdown(f"Temperature correlation: **{temp_r:+.2f}**")
+            if not by_condition.empty:
+                st.dataframe(by_condition.round(1).rename(columns={"mean": "Avg Mood", "count": "Days"}), use_container_width=True)
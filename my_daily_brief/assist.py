@@ -0,0 +1,134 @@
+import os
+import threading
+
+import prompts
+from retrieval import estimate_tokens
+
+# --- Quick Assist Conversations ---
+# Quick Assist keeps a conversation so follow-ups work. Sending the whole
+# history every turn would make prompt eval grow without bound, so:
+#   - turns are sent verbatim as chat messages until they pass
+#     HISTORY_BUDGET tokens; then all but the last KEEP_TURNS are folded into
+#     a rolling digest (one "assist_digest" call, run in the background
+#     after the answer has streamed)
+#   - the digest sits in the system message and turns are only ever
+#     appended, so between compactions each request extends the previous
+#     one and Ollama reuses its KV cache for everything already evaluated
+#   - every turn records the tokens Ollama actually evaluated
+#     (prompt_eval_count) next to estimates (chars / 4, see retrieval.py) of
+#     its full prompt and of the naive full history. Ollama does not report
+#     the full prompt size, so "reused_est" (estimate minus evaluated) is an
+#     estimate too and can come out slightly negative
+
+HISTORY_BUDGET = int(os.getenv("ASSIST_HISTORY_TOKENS", "1200"))
+KEEP_TURNS = 2  # most recent turns always sent verbatim
+
+
+class AssistSession:
+    """
+    One Quick Assist conversation: verbatim recent turns, a digest of the
+    older ones and per-turn prompt-eval accounting.
+    """
+
+    def __init__(self, budget=HISTORY_BUDGET, keep=KEEP_TURNS, summarize=prompts.complete):
+        self.budget = budget
+        self.keep = keep
+        self.summarize = summarize
+        self.digest = ""
+        self.turns = []  # (user message, answer) pairs still sent verbatim
+        self.transcript = []  # every (request, answer), for display
+        self.report = []  # one accounting row per turn
+        self._all_tokens = 0  # every turn so far, as the naive full history would send it
+        self._lock = threading.Lock()
+        self._compactor = None
+
+    def system(self):
+        if not self.digest:
+            return prompts.SHARED_SYSTEM
+        return f"{prompts.SHARED_SYSTEM}\n\nSummary of the earlier conversation:\n{self.digest}"
+
+    def history_tokens(self):
+        return sum(estimate_tokens(q) + estimate_tokens(a) for q, a in self.turns)
+
+    def prompt(self, request):
+        """
+        The conversation Prompt for a rendered quick_* request.
+        """
+        self.wait()
+        with self._lock:
+            messages = []
+            for question, answer in self.turns:
+                messages += [{"role": "user", "content": question}, {"role": "assistant", "content": answer}]
+            messages.append({"role": "user", "content": request.user})
+            return prompts.Prompt("assist_turn", self.system(), messages)
+
+    def stream(self, request, label=None):
+        """
+        Streams the answer to `request` (a rendered quick_* Prompt) as the
+        next turn, then records it and compacts the history if needed.
+        """
+        conversation = self.prompt(request)
+        stats = {}
+        answer = ""
+        for chunk in prompts.stream(conversation, on_stats=stats.update):
+            answer += chunk
+            yield chunk
+        self._record(request, label, answer.strip(), conversation, stats)
+
+    def _record(self, request, label, answer, conversation, stats):
+        with self._lock:
+            self.turns.append((request.user, answer))
+            self.transcript.append((label or request.template, answer))
+            full = estimate_tokens(str(conversation))
+            naive = estimate_tokens(prompts.SHARED_SYSTEM) + self._all_tokens + estimate_tokens(request.user)
+            self._all_tokens += estimate_tokens(request.user) + estimate_tokens(answer)
+            evaluated = stats.get("prompt_eval_count")
+            self.report.append({
+                "turn": len(self.transcript),
+                "prompt_tokens_est": full,
+                "evaluated": evaluated,
+                "reused_est": full - evaluated if evaluated is not None else None,
+                "naive_tokens_est": naive,
+                "verbatim_turns": len(self.turns) - 1,
+                "digest": bool(self.digest),
+            })
+            over = self.history_tokens() > self.budget and len(self.turns) > self.keep
+        if over:
+            self._compactor = threading.Thread(target=self._compact, name="assist-digest", daemon=True)
+            self._compactor.start()
+
+    def _compact(self):
+        with self._lock:
+            fold = self.turns[:-self.keep]
+            digest = self.digest
+        turns = "\n".join(f"User: {q}\nAssistant: {a}" for q, a in fold)
+        try:
+            digest = self.summarize(prompts.render("assist_digest", digest=digest or "(none)", turns=turns))
+        except Exception:
+            return  # keep the turns verbatim and try again after the next one
+        with self._lock:
+            self.digest = digest.strip()
+            self.turns = self.turns[len(fold):]
+
+    def wait(self, timeout=60):
+        """
+        Waits for a running compaction, so the next turn sees its digest.
+        """
+        compactor = self._compactor
+        if compactor is not None:
+            compactor.join(timeout)
+            self._compactor = None
+
+    def totals(self):
+        """
+        Summed accounting over the turns Ollama reported counts for; the
+        *_est fields are estimates.
+        """
+        rows = [r for r in self.report if r["evaluated"] is not None]
+        return {
+            "turns": len(self.report),
+            "prompt_tokens_est": sum(r["prompt_tokens_est"] for r in rows),
+            "evaluated": sum(r["evaluated"] for r in rows),
+            "reused_est": sum(r["reused_est"] for r in rows),
+            "naive_tokens_est": sum(r["naive_tokens_est"] for r in self.report),
+        }
@@ -0,0 +1,336 @@
+import abc
+import json
+import os
+import threading
+import time
+
+import httpx
+
+import llm
+from llm import LLMError, LLMResponseError, LLMTimeout, LLMUnavailable
+
+# --- Multi-Backend Generation ---
+# Call sites use generate_content() / agenerate_content() and never name a
+# provider. The router keeps moving latency and error stats per backend,
+# sends each request to the fastest healthy one and fails over to the next
+# when a backend errors before producing output.
+#
+# Configure with LLM_BACKENDS (comma-separated, tried fastest-first):
+#   LLM_BACKENDS=ollama:http://localhost:11434,ollama:http://gpu-box:11434,openai:http://localhost:8080/v1#llama-3.2-3b
+# "openai" covers llama.cpp's server and any other OpenAI-compatible server.
+
+EWMA_ALPHA = 0.3
+FAILURE_THRESHOLD = 3  # consecutive failures before a backend is benched
+COOLDOWN = 30.0  # seconds a benched backend waits before being probed again
+
+
+class BackendStats:
+    """
+    Moving latency / error statistics for one backend.
+    """
+
+    def __init__(self):
+        self.ttft = None  # EWMA time to first token (s)
+        self.total = None  # EWMA full generation time (s)
+        self.requests = 0
+        self.errors = 0
+        self.consecutive_failures = 0
+        self.benched_until = 0.0
+
+    @staticmethod
+    def _ewma(old, new):
+        return new if old is None else EWMA_ALPHA * new + (1 - EWMA_ALPHA) * old
+
+    def record_success(self, ttft, total):
+        self.requests += 1
+        self.consecutive_failures = 0
+        self.benched_until = 0.0
+        if ttft is not None:
+            self.ttft = self._ewma(self.ttft, ttft)
+        self.total = self._ewma(self.total, total)
+
+    def record_failure(self):
+        self.requests += 1
+        self.errors += 1
+        self.consecutive_failures += 1
+        if self.consecutive_failures >= FAILURE_THRESHOLD:
+            self.benched_until = time.monotonic() + COOLDOWN
+
+    @property
+    def healthy(self):
+        return time.monotonic() >= self.benched_until
+
+    def as_dict(self):
+        return {
+            "ttft_ms": round(self.ttft * 1000, 1) if self.ttft is not None else None,
+            "total_ms": round(self.total * 1000, 1) if self.total is not None else None,
+            "requests": self.requests,
+            "errors": self.errors,
+            "healthy": self.healthy,
+        }
+
+
+class Backend(abc.ABC):
+    """
+    One text-generation server. Subclasses yield text chunks.
+    """
+    kind = "base"
+
+    def __init__(self, url, model):
+        self.url = url.rstrip("/")
+        self.model = model
+        self.stats = BackendStats()
+
+    @property
+    def name(self):
+        return f"{self.kind}:{self.url}"
+
+    @abc.abstractmethod
+    def stream(self, prompt, timeout=None, system=None, on_stats=None):
+        """Yields text chunks for `prompt`."""
+
+    @abc.abstractmethod
+    def astream(self, prompt, timeout=None, system=None, on_stats=None):
+        """Async generator of text chunks for `prompt`."""
+
+
+class OllamaBackend(Backend):
+    kind = "ollama"
+
+    def __init__(self, url=None, model=None):
+        super().__init__(url or llm.OLLAMA_HOST, model or llm.MODEL_NAME)
+
+    def stream(self, prompt, timeout=None, system=None, on_stats=None):
+        return llm.generate_ollama_content(prompt, host=self.url, timeout=timeout, system=system, on_stats=on_stats)
+
+    async def astream(self, prompt, timeout=None, system=None, on_stats=None):
+        async for chunk in llm.agenerate(prompt, host=self.url, timeout=timeout, system=system, on_stats=on_stats):
+            yield chunk
+
+
+class OpenAICompatBackend(Backend):
+    """
+    OpenAI-style /chat/completions with SSE streaming (llama.cpp server,
+    vLLM, LM Studio, ...). `url` is the API base, e.g. http://host:8080/v1.
+    """
+    kind = "openai"
+
+    def __init__(self, url, model=None):
+        super().__init__(url, model or llm.MODEL_NAME)
+        self._client = httpx.Client(timeout=llm.LLM_TIMEOUT)
+
+    def _payload(self, prompt, system):
+        return {"model": self.model, "stream": True, "messages": llm.build_messages(prompt, system)}
+
+    @staticmethod
+    def _parse(line):
+        if not line.startswith("data:"):
+            return None
+        data = line[5:].strip()
+        if not data or data == "[DONE]":
+            return None
+        delta = json.loads(data)["choices"][0].get("delta") or {}
+        return delta.get("content")
+
+    def _raise_for(self, e):
+        if isinstance(e, LLMError):
+            raise e
+        if isinstance(e, httpx.ConnectError):
+            raise LLMUnavailable(f"{self.name} not reachable: {e}") from e
+        if isinstance(e, httpx.TimeoutException):
+            raise LLMTimeout(f"{self.name} timed out") from e
+        if isinstance(e, httpx.HTTPStatusError):
+            raise LLMResponseError(f"{self.name} error ({e.response.status_code})") from e
+        raise LLMError(str(e)) from e
+
+    def stream(self, prompt, timeout=None, system=None, on_stats=None):
+        # OpenAI-style streams carry no prompt-eval timings, so on_stats is unused
+        try:
+            with self._client.stream("POST", f"{self.url}/chat/completions", json=self._payload(prompt, system),
+                                     timeout=timeout or llm.LLM_TIMEOUT) as r:
+                r.raise_for_status()
+                for line in r.iter_lines():
+                    content = self._parse(line)
+                    if content:
+                        yield content
+        except Exception as e:
+            self._raise_for(e)
+
+    async def astream(self, prompt, timeout=None, system=None, on_stats=None):
+        try:
+            async with httpx.AsyncClient(timeout=timeout or llm.LLM_TIMEOUT) as client:
+                async with client.stream("POST", f"{self.url}/chat/completions", json=self._payload(prompt, system)) as r:
+                    r.raise_for_status()
+                    async for line in r.aiter_lines():
+                        content = self._parse(line)
+                        if content:
+                            yield content
+        except Exception as e:
+            self._raise_for(e)
+
+
+BACKEND_TYPES = {"ollama": OllamaBackend, "openai": OpenAICompatBackend, "llamacpp": OpenAICompatBackend}
+
+
+def parse_backends(spec):
+    """
+    Parses 'kind:url[#model],...' into Backend instances.
+    """
+    backends = []
+    for item in (s.strip() for s in spec.split(",")):
+        if not item:
+            continue
+        kind, _, rest = item.partition(":")
+        url, _, model = rest.partition("#")
+        if kind not in BACKEND_TYPES:
+            raise ValueError(f"Unknown LLM backend type '{kind}' in LLM_BACKENDS")
+        backends.append(BACKEND_TYPES[kind](url, model or None))
+    return backends
+
+
+class Router:
+    """
+    Picks the fastest healthy backend per request and fails over on errors.
+    """
+
+    def __init__(self, backends):
+        if not backends:
+            raise ValueError("Router needs at least one backend")
+        self.backends = list(backends)
+        self.inflight = 0  # generations currently running through this router
+        self._lock = threading.Lock()
+
+    def ranked(self):
+        """
+        Healthy backends fastest-first; backends with no data yet go first so
+        they get measured. Benched backends come last as a last resort.
+        """
+        with self._lock:
+            def score(b):
+                s = b.stats
+                latency = s.ttft if s.ttft is not None else -1.0
+                return (not s.healthy, latency)
+            return sorted(self.backends, key=score)
+
+    def _record(self, backend, ok, ttft=None, total=None):
+        with self._lock:
+            if ok:
+                backend.stats.record_success(ttft, total)
+            else:
+                backend.stats.record_failure()
+
+    def _track(self, delta):
+        with self._lock:
+            self.inflight += delta
+
+    @staticmethod
+    def _report(on_stats, backend, reported, ok, ttft, started):
+        # One record per attempt: the backend's own counters (Ollama's final
+        # chunk, empty for OpenAI-style servers) plus what the router measured
+        if on_stats:
+            on_stats({
+                **reported,
+                "backend": backend.name,
+                "model": backend.model,
+                "ok": ok,
+                "ttft_ms": ttft * 1000 if ttft is not None else None,
+                "wall_ms": (time.perf_counter() - started) * 1000,
+            })
+
+    def stream(self, prompt, timeout=None, system=None, on_stats=None):
+        """
+        Yields chunks from the best backend. Errors before the first chunk
+        fail over to the next backend; errors after it are raised (the
+        backend is still penalised, so the next request goes elsewhere).
+        """
+        self._track(1)
+        try:
+            yield from self._stream(prompt, timeout, system, on_stats)
+        finally:
+            self._track(-1)
+
+    async def astream(self, prompt, timeout=None, system=None, on_stats=None):
+        self._track(1)
+        try:
+            async for chunk in self._astream(prompt, timeout, system, on_stats):
+                yield chunk
+        finally:
+            self._track(-1)
+
+    def _stream(self, prompt, timeout, system, on_stats):
+        last_error = None
+        for backend in self.ranked():
+            started = time.perf_counter()
+            ttft = None
+            reported = {}
+            try:
+                for chunk in backend.stream(prompt, timeout=timeout, system=system, on_stats=reported.update):
+                    if ttft is None:
+                        ttft = time.perf_counter() - started
+                    yield chunk
+            except LLMError as e:
+                self._record(backend, False)
+                self._report(on_stats, backend, reported, False, ttft, started)
+                if ttft is not None:
+                    raise
+                last_error = e
+                continue
+            self._record(backend, True, ttft, time.perf_counter() - started)
+            self._report(on_stats, backend, reported, True, ttft, started)
+            return
+        raise last_error or LLMUnavailable("No LLM backend available")
+
+    async def _astream(self, prompt, timeout, system, on_stats):
+        last_error = None
+        for backend in self.ranked():
+            started = time.perf_counter()
+            ttft = None
+            reported = {}
+            try:
+                async for chunk in backend.astream(prompt, timeout=timeout, system=system, on_stats=reported.update):
+                    if ttft is None:
+                        ttft = time.perf_counter() - started
+                    yield chunk
+            except LLMError as e:
+                self._record(backend, False)
+                self._report(on_stats, backend, reported, False, ttft, started)
+                if ttft is not None:
+                    raise
+                last_error = e
+                continue
+            self._record(backend, True, ttft, time.perf_counter() - started)
+            self._report(on_stats, backend, reported, True, ttft, started)
+            return
+        raise last_error or LLMUnavailable("No LLM backend available")
+
+    def stats(self):
+        return {b.name: b.stats.as_dict() for b in self.backends}
+
+
+_router = None
+_router_lock = threading.Lock()
+
+
+def get_router():
+    """
+    Process-wide router built from LLM_BACKENDS (defaults to the local Ollama).
+    """
+    global _router
+    with _router_lock:
+        if _router is None:
+            spec = os.getenv("LLM_BACKENDS", "")
+            _router = Router(parse_backends(spec) if spec.strip() else [OllamaBackend()])
+        return _router
+
+
+# --- Provider-agnostic entry points ---
+def generate_content(prompt, timeout=None, system=None, on_stats=None):
+    """
+    Generator that yields chunks of text from the best available backend.
+    """
+    yield from get_router().stream(prompt, timeout=timeout, system=system, on_stats=on_stats)
+
+
+async def agenerate_content(prompt, timeout=None, system=None, on_stats=None):
+    async for chunk in get_router().astream(prompt, timeout=timeout, system=system, on_stats=on_stats):
+        yield chunk
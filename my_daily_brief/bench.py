@@ -0,0 +1,843 @@
+"""
+Micro-benchmarks against the local stubs (stubs.py). Nothing here talks to
+real APIs or a real model.
+
+Usage:
+    python bench.py api [--seconds 10] [--concurrency 50]
+    python bench.py sse [--clients 50]
+    python bench.py ollama [--prompts 10]
+    python bench.py router [--requests 30]
+    python bench.py weather [--latency 0.2]
+    python bench.py quota [--sessions 50]
+    python bench.py faults
+    python bench.py cache [--processes 8]
+    python bench.py charts [--reruns 200]
+    python bench.py cards [--reruns 500]
+    python bench.py pools [--sessions 200]
+    python bench.py estimates [--days 14]
+    python bench.py classify [--picks 40]
+    python bench.py assist [--turns 12] [--budget 600] [--interleave 1]
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import socket
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+from stubs import StubOllama, StubRedis, StubUpstream, stub_env
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_stubs(**ollama_kwargs):
+    """
+    Starts stub upstream + stub Ollama and points the environment at them.
+    Must run before importing core / api, which read base URLs at import.
+    """
+    upstream = StubUpstream().start()
+    ollama = StubOllama(**ollama_kwargs).start()
+    os.environ.update(stub_env(upstream, ollama))
+    os.environ.setdefault("BRIEF_DATA_DIR", tempfile.mkdtemp(prefix="brief_bench_"))
+    return upstream, ollama
+
+
+def report(name, latencies, elapsed):
+    latencies = sorted(latencies)
+    if not latencies:
+        print(f"{name:<28} no successful requests")
+        return
+    p = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000
+    print(f"{name:<28} {len(latencies) / elapsed:>9.1f} req/s   "
+          f"p50 {p(0.50):7.2f} ms   p95 {p(0.95):7.2f} ms   n={len(latencies)}")
+
+
+# --- API vs Streamlit ---
+async def _hammer(url, seconds, concurrency, etag=False):
+    import httpx
+
+    latencies = []
+    deadline = time.perf_counter() + seconds
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=30) as client:
+        first = await client.get(url)
+        headers = {"If-None-Match": first.headers.get("etag", "")} if etag else {}
+
+        async def worker():
+            while time.perf_counter() < deadline:
+                t0 = time.perf_counter()
+                r = await client.get(url, headers=headers)
+                if r.status_code in (200, 304):
+                    latencies.append(time.perf_counter() - t0)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return latencies, time.perf_counter() - start
+
+
+def bench_api(args):
+    start_stubs(token_delay=0.0, prompt_delay=0.0)
+    import uvicorn
+    import api
+    import core
+
+    # yfinance cannot be stubbed over HTTP; seed the shared market cache instead
+    api.shared_cache.set("markets", [[n, 100.0, 0.5] for n in core.MARKET_TICKERS], ttl=3600)
+
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(api.app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+
+    url = f"http://127.0.0.1:{port}/v1/brief?city=London"
+    print(f"API: {args.concurrency} concurrent clients for {args.seconds}s")
+    report("api /v1/brief (200)", *asyncio.run(_hammer(url, args.seconds, args.concurrency)))
+    report("api /v1/brief (304 ETag)", *asyncio.run(_hammer(url, args.seconds, args.concurrency, etag=True)))
+    server.should_exit = True
+
+    # Streamlit path: every request is a full script run of app.py
+    from streamlit.testing.v1 import AppTest
+
+    app_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+    latencies = []
+    start = time.perf_counter()
+    while time.perf_counter() - start < args.seconds:
+        t0 = time.perf_counter()
+        AppTest.from_file(app_path, default_timeout=60).run()
+        latencies.append(time.perf_counter() - t0)
+    report("streamlit full script run", latencies, time.perf_counter() - start)
+
+
+# --- SSE fan-out ---
+def _serve_api():
+    import uvicorn
+    import api
+
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(api.app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, f"http://127.0.0.1:{port}"
+
+
+async def _sse_client(client, url):
+    """
+    Reads one SSE stream; returns (full text, time to first token).
+    """
+    text, first, t0 = [], None, time.perf_counter()
+    async with client.stream("GET", url) as r:
+        event = None
+        async for line in r.aiter_lines():
+            if line.startswith("event: "):
+                event = line[7:]
+            elif line.startswith("data: ") and event == "token":
+                if first is None:
+                    first = time.perf_counter() - t0
+                text.append(json.loads(line[6:])["text"])
+            elif line.startswith("data: ") and event == "error":
+                raise RuntimeError(line[6:])
+    return "".join(text), first
+
+
+def bench_sse(args):
+    _, stub_ollama = start_stubs(token_delay=0.02, prompt_delay=0.1)
+    import httpx
+
+    server, base = _serve_api()
+    import api
+
+    async def run():
+        limits = httpx.Limits(max_connections=args.clients)
+        async with httpx.AsyncClient(timeout=60, limits=limits) as client:
+            url = f"{base}/v1/stream/briefing?city=London"
+            chats_before = stub_ollama.requests
+            t0 = time.perf_counter()
+            results = await asyncio.gather(*(_sse_client(client, url) for _ in range(args.clients)))
+            return results, time.perf_counter() - t0, stub_ollama.requests - chats_before
+
+    results, elapsed, upstream_calls = asyncio.run(run())
+    texts = {t for t, _ in results}
+    ttft = [f for _, f in results if f is not None]
+    print(f"SSE: {args.clients} concurrent clients on the same city in {elapsed:.2f}s")
+    print(f"  identical streams:     {len(texts) == 1}")
+    print(f"  upstream generations:  {api.stream_hub.upstream_started}")
+    print(f"  stub Ollama requests:  {upstream_calls} (news digest chunks + 1 briefing)")
+    if ttft:
+        print(f"  time to first token:   p50 {statistics.median(ttft) * 1000:.0f} ms, max {max(ttft) * 1000:.0f} ms")
+    server.should_exit = True
+
+
+# --- Sync vs async Ollama ---
+def bench_ollama(args):
+    from concurrent.futures import ThreadPoolExecutor
+
+    _, stub = start_stubs(token_delay=0.01, prompt_delay=0.2)
+    import llm
+
+    prompts = [f"Prompt number {i}: say something." for i in range(args.prompts)]
+    print(f"Ollama: {args.prompts} prompts against the stub (200 ms prompt eval, 10 ms/token)")
+
+    def timed(p):
+        t = time.perf_counter()
+        llm.generate_text(p)
+        return time.perf_counter() - t
+
+    t0 = time.perf_counter()
+    latencies = [timed(p) for p in prompts]
+    report("sync, sequential (app today)", latencies, time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(prompts)) as pool:
+        latencies = list(pool.map(timed, prompts))
+    report("sync, thread pool", latencies, time.perf_counter() - t0)
+
+    async def run_async():
+        latencies = []
+
+        async def one(p):
+            t = time.perf_counter()
+            await llm.agenerate_text(p)
+            latencies.append(time.perf_counter() - t)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(p) for p in prompts))
+        return latencies, time.perf_counter() - start
+
+    report("async, pooled AsyncClient", *asyncio.run(run_async()))
+
+
+# --- Multi-backend routing ---
+def bench_router(args):
+    from stubs import StubOpenAI
+
+    start_stubs()
+    from backends import OllamaBackend, OpenAICompatBackend, Router
+    from llm import LLMError
+
+    fast = StubOllama(token_delay=0.002, prompt_delay=0.02).start()
+    slow = StubOllama(token_delay=0.01, prompt_delay=0.15).start()
+    openai = StubOpenAI(token_delay=0.005, prompt_delay=0.08).start()
+    router = Router([OllamaBackend(slow.url), OpenAICompatBackend(openai.url + "/v1"), OllamaBackend(fast.url)])
+
+    def burst(label):
+        errors = 0
+        for i in range(args.requests):
+            try:
+                "".join(router.stream(f"request {i}"))
+            except LLMError:
+                errors += 1
+        print(f"{label} (errors: {errors})")
+        for name, s in router.stats().items():
+            print(f"  {name:<40} requests {s['requests']:>3}  errors {s['errors']:>2}  "
+                  f"ttft {s['ttft_ms']} ms  healthy {s['healthy']}")
+
+    burst(f"{args.requests} requests, all backends up")
+    fast.fail = True
+    burst(f"{args.requests} requests, fastest backend failing")
+    fast.fail = False
+
+
+# --- Multi-city weather ---
+def bench_weather(args):
+    from cache import SharedCache
+    from stubs import CITIES
+
+    upstream, _ = start_stubs()
+    upstream.latency = args.latency
+    import core
+    import quota
+
+    cities = [c.title() for c in CITIES]
+    store = SharedCache(os.path.join(os.environ["BRIEF_DATA_DIR"], "bench_cache.db"))
+
+    def timed(label, fn):
+        quota.get_quota().invalidate("weather")  # measure the fetch, not the quota manager's cache
+        before = upstream.requests
+        t0 = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - t0
+        print(f"{label:<34} {elapsed * 1000:8.1f} ms   upstream requests {upstream.requests - before:>3}")
+        return result
+
+    print(f"{len(cities)} cities, {args.latency * 1000:.0f} ms upstream latency")
+    timed("single city", lambda: core.fetch_weather_data(cities[0]))
+    timed("sequential, one by one", lambda: [core.fetch_weather_data(c) for c in cities])
+    timed("grid, cold (resolves IDs)", lambda: core.fetch_multi_city_weather(cities, store=store))
+    timed("grid, warm (one /group call)", lambda: core.fetch_multi_city_weather(cities, store=store))
+    core._city_ids.clear()
+    grid = timed("grid, new process (IDs from store)", lambda: core.fetch_multi_city_weather(cities, store=store))
+    print(f"  all cities answered: {all(grid.values())}")
+
+
+# --- Upstream quota ---
+def bench_quota(args):
+    from concurrent.futures import ThreadPoolExecutor
+
+    upstream, _ = start_stubs()
+    upstream.latency = 0.1
+    import core
+    import quota
+
+    manager = quota._manager = quota.QuotaManager(limits={"weather": (args.budget, 3600), "news": (100, 86400),
+                                                          "forex": (60, 3600)})
+
+    def step(label, fn):
+        before, throttled = upstream.requests, upstream.throttled
+        results = fn()
+        print(f"{label:<46} upstream {upstream.requests - before:>3}  429s {upstream.throttled - throttled:>2}  "
+              f"answered {sum(r is not None for r in results)}/{len(results)}")
+
+    def burst():
+        with ThreadPoolExecutor(args.sessions) as pool:
+            return list(pool.map(lambda _: core.fetch_weather_data("London"), range(args.sessions)))
+
+    print(f"{args.sessions} concurrent sessions, weather budget {args.budget}/hour")
+    step("cold: identical requests coalesce", burst)
+    step("warm: served fresh from the shared cache", burst)
+
+    quota.FRESH_FOR["weather"] = 0  # every call now wants a refetch
+    step("expired, budget left: refetch once", burst)
+    for i in range(args.budget):
+        core.fetch_weather_data(f"city-{i}")  # spend the rest of the budget
+    step("expired, budget tight: stale, no upstream", burst)
+
+    manager.limits["weather"] = (1000, 3600)
+    manager._conn().execute("DELETE FROM buckets")  # start from a full, bigger bucket
+    upstream.rate_limit, upstream._window = 0, []
+    step("upstream 429: serve stale, back off", burst)
+    step("during Retry-After: no upstream at all", burst)
+
+    print()
+    for row in manager.report():
+        print("  " + "  ".join(f"{k} {v}" for k, v in row.items()))
+
+
+# --- Fault injection ---
+def bench_faults(args):
+    upstream, _ = start_stubs()
+    import core
+    import quota
+    import resilience
+
+    resilience.DEADLINES["weather"] = args.deadline
+    resilience.BREAKER_COOLDOWN = args.cooldown
+    quota.FRESH_FOR["weather"] = 0  # every call wants a refetch
+    breaker = resilience.get_breaker("weather")
+
+    def call(label):
+        before = upstream.requests
+        t0 = time.perf_counter()
+        result = core.fetch_weather_data("London")
+        elapsed = (time.perf_counter() - t0) * 1000
+        print(f"{label:<34} {elapsed:8.1f} ms  upstream {upstream.requests - before}  "
+              f"data {'yes' if result else 'no ':<3}  circuit {breaker.state}")
+
+    print(f"deadline {args.deadline}s, breaker opens after {resilience.BREAKER_FAILURES} failures, "
+          f"cooldown {args.cooldown}s")
+    call("healthy")
+    for fault in ("hang", "reset", "error"):
+        upstream.fault = fault
+        upstream.hang_for = args.deadline * 4
+        for i in range(resilience.BREAKER_FAILURES + 1):
+            call(f"{fault} #{i + 1}")
+        upstream.fault = None
+        time.sleep(args.cooldown)
+        call("recovered: half-open probe")
+        call("closed again")
+
+
+# --- Cache backends across processes ---
+def _cache_worker(barrier, results):
+    import core
+    from cachebackends import get_cache_backend
+
+    get_cache_backend("shared").get("warmup")  # connect / open before the race
+    barrier.wait()
+    results.put(core.fetch_weather_data("London") is not None)
+
+
+def bench_cache(args):
+    import multiprocessing
+
+    upstream, _ = start_stubs()
+    upstream.latency = args.latency
+    os.environ["QUOTA_WEATHER"] = "1000/60"
+    ctx = multiprocessing.get_context("spawn")
+
+    print(f"{args.processes} processes fetch the same expired key at once (upstream latency {args.latency}s)")
+    with StubRedis() as redis:
+        for spec in ("memory", "sqlite", redis.url):
+            os.environ["CACHE_BACKEND_SHARED"] = spec
+            os.environ["BRIEF_DATA_DIR"] = tempfile.mkdtemp(prefix="brief_bench_")  # cold caches
+            barrier, results = ctx.Barrier(args.processes), ctx.Queue()
+            workers = [ctx.Process(target=_cache_worker, args=(barrier, results)) for _ in range(args.processes)]
+            before = upstream.requests
+            t0 = time.perf_counter()
+            for w in workers:
+                w.start()
+            answered = sum(results.get(timeout=60) for _ in workers)
+            for w in workers:
+                w.join()
+            elapsed = time.perf_counter() - t0
+            print(f"  {spec.split(':')[0]:<8} upstream {upstream.requests - before:>3}  "
+                  f"answered {answered}/{args.processes}  {elapsed * 1000:8.1f} ms (incl. process start)")
+        print(f"  redis stub commands: {redis.commands}")
+
+
+# --- Chart rendering ---
+def _legacy_forecast(dates, temps):
+    # The forecast chart as app.py built it before charts.py (fresh figure, default template)
+    import plotly.graph_objects as go
+
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(x=dates, y=temps, mode='lines', line=dict(color='#ccff00', width=3, shape='spline'),
+                             fill='tozeroy', fillcolor='rgba(204, 255, 0, 0.1)'))
+    fig.update_layout(plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)',
+                      font=dict(color='#888', family="Inter"), xaxis=dict(showgrid=False, showticklabels=False),
+                      yaxis=dict(showgrid=True, gridcolor='#222'), margin=dict(l=0, r=0, t=10, b=0), height=150)
+    return fig
+
+
+def _legacy_forex(base, amount, converted):
+    import plotly.graph_objects as go
+
+    fig = go.Figure()
+    fig.add_trace(go.Bar(x=[base, 'INR'], y=[amount, converted], marker_color=['#ccff00', '#ff9900'],
+                         text=[f"{amount:,.0f}", f"₹{converted:,.0f}"], textposition='auto'))
+    fig.update_layout(plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)',
+                      font=dict(color='#fff', family="Inter"), xaxis=dict(showgrid=False),
+                      yaxis=dict(showgrid=False, showticklabels=False), margin=dict(l=0, r=0, t=20, b=0),
+                      height=200, bargap=0.4)
+    fig.update_traces(marker_line_width=0, selector=dict(type="bar"))
+    return fig
+
+
+def bench_charts(args):
+    from datetime import datetime
+
+    import plotly.io
+    import plotly.tools
+
+    import charts
+
+    def plotly_element(fig):
+        # What st.plotly_chart does with a figure on every rerun
+        spec = plotly.tools.return_figure_from_figure_or_data(fig, validate_figure=True)
+        return plotly.io.to_json(spec, validate=False)
+
+    dates = [datetime.fromtimestamp(1_700_000_000 + i * 10800) for i in range(8)]
+    temps = [21.4, 20.1, 19.8, 22.6, 25.3, 26.0, 24.2, 22.9]
+    cases = [
+        ("forecast, fresh figure", lambda: plotly_element(_legacy_forecast(dates, temps))),
+        ("forecast, cached figure", lambda: plotly_element(charts.figure(charts.forecast_figure, dates, temps))),
+        ("forecast, SVG sparkline", lambda: charts.sparkline_svg(temps)),
+        ("forex bars, fresh figure", lambda: plotly_element(_legacy_forex("USD", 1.0, 83.2))),
+        ("forex bars, cached figure", lambda: plotly_element(charts.figure(charts.forex_figure, "USD", 1.0, 83.2))),
+    ]
+    print(f"{args.reruns} reruns per chart, unchanged data")
+    for label, render in cases:
+        payload = render()  # warm up (and fill the figure cache)
+        t0 = time.perf_counter()
+        for _ in range(args.reruns):
+            render()
+        per_run = (time.perf_counter() - t0) / args.reruns * 1000
+        print(f"{label:<28} {per_run:8.3f} ms/render   {len(payload.encode('utf-8')):>6} bytes")
+    print(f"figure cache: {charts.FIGURES.hits} hits, {charts.FIGURES.misses} misses")
+
+
+# --- HTML cards ---
+def _legacy_cards(briefing, outfit, fact, articles, metrics, insight):
+    # The cards as app.py built them before cards.py: inline styles, no escaping
+    out = [f"""
+            <div style="background-color: #1a1a1a; padding: 15px; border-radius: 12px; border-left: 4px solid #ccff00; height: 100%;">
+                <div style="font-size: 0.8rem; color: #ccff00; font-weight: 600; margin-bottom: 4px;">DAILY BRIEFING</div>
+                <div style="color: #ddd; font-size: 0.9rem; margin-bottom: 8px;">{briefing}</div>
+                <div style="font-size: 0.85rem; color: #888; font-style: italic;">{outfit}</div>
+            </div>
+            """, f"""
+        <div style="background-color: #1a1a1a; padding: 15px; border-radius: 12px; border-left: 4px solid #00bfff;">
+            <div style="font-size: 0.8rem; color: #00bfff; font-weight: 600; margin-bottom: 4px;">DID YOU KNOW?</div>
+            <div style="font-style: italic; color: #ddd; font-size: 0.9rem;">"{fact}"</div>
+        </div>
+        """]
+    for i, article in enumerate(articles):
+        bg_color = "#ccff00" if i % 2 == 0 else "#ff9900"
+        out.append(f"""
+                <div style="background-color: #1a1a1a; padding: 10px; border-radius: 12px; margin-bottom: 10px; border-left: 5px solid {bg_color};">
+                    <div style="font-size: 0.8rem; color: #888;">{article['source']['name']}</div>
+                    <div style="font-weight: 600; font-size: 0.9rem;"><a href="{article['url']}" style="color: #fff; text-decoration: none;">{article['title'][:60]}...</a></div>
+                </div>
+                """)
+    for label, val, chg in metrics:
+        color = "#ccff00" if chg >= 0 else "#ff4444"
+        arrow = "▲" if chg >= 0 else "▼"
+        out.append(f"""
+                    <div style="background-color: #1a1a1a; padding: 8px; border-radius: 8px; margin-bottom: 8px; border: 1px solid #333;">
+                        <div style="font-size: 0.75rem; color: #888;">{label}</div>
+                        <div style="font-size: 1rem; font-weight: 700; color: #fff;">{val:,.0f}</div>
+                        <div style="font-size: 0.75rem; color: {color};">{arrow} {abs(chg):.2f}%</div>
+                    </div>
+                    """)
+    out.append(f"""
+                     <div style="background-color:#222; padding:10px; border-radius:8px; font-size:0.85rem; border:1px solid #444;">
+                        {insight}
+                     </div>
+                     """)
+    return out
+
+
+def _cards(briefing, outfit, fact, articles, metrics, insight):
+    import cards
+
+    return ([cards.render("briefing", text=briefing, outfit=outfit), cards.render("fun_fact", fact=fact)]
+            + [cards.news_pill(a, i) for i, a in enumerate(articles)]
+            + [cards.market_tile(*m) for m in metrics] + [cards.render("insight", text=insight)])
+
+
+class _Placeholder:
+    def __init__(self):
+        self.updates, self.bytes = 0, 0
+
+    def markdown(self, body, unsafe_allow_html=False):
+        self.updates += 1
+        self.bytes += len(body.encode("utf-8"))
+
+
+def bench_cards(args):
+    import cards
+
+    stub = StubUpstream(articles=4)
+    data = ("Mild and cloudy in London today; markets steady and rail strikes continue. " * 3,
+            "🧥 Bring a light jacket or sweater.", "Octopuses have three hearts.", stub.articles,
+            [("BTC", 64210.5, 1.2), ("SPY", 512.3, -0.4), ("NIFTY", 22450.0, 0.3), ("SENSEX", 73900.1, 0.2)],
+            "Cool breeze, low UV: a good day for a walk at lunch.")
+    legacy_css = "<style>" + cards.STYLESHEET.split("/* Brief cards */")[0] + "</style>"
+
+    print(f"one rerun: stylesheet + briefing, fun fact, 4 news pills, 4 market tiles, insight ({args.reruns} reruns)")
+    for label, css, render in (("inline styles, f-strings", legacy_css, _legacy_cards),
+                               ("classes, compiled templates", cards.STYLE_TAG, _cards)):
+        payload = [css] + render(*data)
+        t0 = time.perf_counter()
+        for _ in range(args.reruns):
+            render(*data)
+        per_run = (time.perf_counter() - t0) / args.reruns * 1e6
+        print(f"  {label:<30} {sum(len(p.encode('utf-8')) for p in payload):>6} bytes/rerun   "
+              f"{per_run:8.1f} us/rerun")
+
+    tokens = data[0].split(" ")
+    print(f"streaming a {len(tokens)}-token briefing, one token per 10 ms:")
+    legacy, throttled = _Placeholder(), _Placeholder()
+    stream = cards.CardStream(throttled, "briefing", outfit=data[1])
+    text = ""
+    for token in tokens:
+        text += token + " "
+        legacy.markdown(_legacy_cards(text, data[1], *data[2:])[0])
+        stream.update(text=text)
+        time.sleep(0.01)
+    stream.flush()
+    for label, p in (("every token", legacy), ("CardStream", throttled)):
+        print(f"  {label:<30} {p.updates:>4} updates  {p.bytes:>7} bytes")
+
+
+# --- Content pools ---
+_WORDS = ("octopuses honey towers bananas wombats flamingos saturn sharks glaciers sloths coffee lightning "
+          "owls venus koalas hearts tombs summer berries cubes wars minutes seeds unicorns sleep travel glow "
+          "ancient frozen tiny giant quietly always never every").split()
+
+
+def _batch_reply(counter):
+    # Numbered items; every third one is the previous one with its last word changed (near-duplicate)
+    import random
+
+    def reply(prompt):
+        lines = []
+        for i in range(1, 11):
+            if i % 3 == 0:
+                lines.append(f"{i}. {lines[-1].split('. ', 1)[1].rsplit(' ', 1)[0]} again.")
+                continue
+            words = random.Random(next(counter)).sample(_WORDS, 8)
+            lines.append(f"{i}. {' '.join(words).capitalize()}.")
+        return "\n".join(lines)
+    return reply
+
+
+def bench_pools(args):
+    import itertools
+
+    _, ollama = start_stubs(reply=_batch_reply(itertools.count()), token_delay=0.001, prompt_delay=0.2)
+    import pools
+
+    path = os.path.join(os.environ["BRIEF_DATA_DIR"], "bench_pool.db")
+    content = pools.ContentPools(path=path, start=False)
+    greeting = pools.greeting_pool(8, "Rain")
+    content.want(greeting)
+
+    t0 = time.perf_counter()
+    while any(content.needs_batch(p) for p in content.sizes()):
+        content.replenish_once()
+    m = content.metrics
+    print(f"fill: {m['batches']} batch prompts in {time.perf_counter() - t0:.1f}s -> {m['added']} items, "
+          f"{m['duplicates']} near-duplicates dropped   {content.sizes()}")
+
+    before = ollama.requests
+    t0 = time.perf_counter()
+    for _ in range(args.sessions):
+        content.draw("fun_fact"), content.draw("wisdom"), content.draw(greeting)
+    per_draw = (time.perf_counter() - t0) / (3 * args.sessions) * 1e6
+    print(f"{args.sessions} sessions (greeting, fun fact, wisdom each): "
+          f"{ollama.requests - before} LLM calls, {per_draw:.1f} us/draw")
+    print(f"  per-session generation would have made {2 * args.sessions} LLM calls (greeting + fun fact)")
+
+    reopened = pools.ContentPools(path=path, start=False)
+    print(f"after restart: {reopened.sizes()} loaded from disk, "
+          f"{sum(reopened.needs_batch(p) for p in reopened.sizes())} pools need a batch")
+
+
+# --- Task estimates ---
+_ROUTINE = {"Reply to emails": 20, "Write the weekly report": 90, "Go to the gym": 60, "Buy groceries": 40,
+            "Call mom": 20, "Review pull requests": 45, "Plan tomorrow": 15, "Clean the kitchen": 30,
+            "Prepare slides for standup": 35, "Read a chapter": 30, "Pay the bills": 15, "Walk the dog": 25}
+
+
+def _legacy_estimate_prompt(texts):
+    import prompts
+
+    return prompts.Prompt("time_estimate", prompts.SHARED_SYSTEM,
+                          "Estimate the total time needed for the tasks below, in the given tone.\n\n"
+                          "Tone: Return a short estimate like '2 hours'.\nTasks: " + ", ".join(texts))
+
+
+def _estimates_reply(prompt):
+    count = int(re.search(r"Tasks: (\d+)", prompt).group(1))
+    return json.dumps({str(i): 30 for i in range(1, count + 1)})
+
+
+def bench_estimates(args):
+    import random
+    from datetime import datetime, timedelta
+
+    start_stubs(reply=_estimates_reply, token_delay=0.0005, prompt_delay=0.05)
+    import estimates
+    import prompts
+    from storage import BriefStore
+
+    store = BriefStore(path=os.path.join(os.environ["BRIEF_DATA_DIR"], "bench_tasks.db"))
+    sent = []  # prompt sizes of the LLM calls actually made
+
+    def generate(prompt):
+        sent.append(len(str(prompt)))
+        return prompts.complete(prompt)
+
+    estimator = estimates.TaskEstimator(store, generate=generate)
+    rng = random.Random(7)
+    clock = datetime(2026, 1, 1, 9)
+    legacy_calls, legacy_chars, clicks, per_day = 0, 0, 0, []
+    for day in range(args.days):
+        clock = clock.replace(hour=9, minute=0) + timedelta(days=1)
+        tasks = rng.sample(sorted(_ROUTINE), 6)
+        calls_before = len(sent)
+        while tasks:
+            # Estimate, then work through the next task at the user's real pace
+            texts = [rng.choice([t, t.lower(), t + "!"]) for t in tasks]
+            estimator.estimate(texts)
+            legacy_calls += 1
+            legacy_chars += len(str(_legacy_estimate_prompt(texts)))
+            clicks += 1
+            task = tasks.pop(0)
+            created = clock
+            clock += timedelta(minutes=_ROUTINE[task] * rng.uniform(0.8, 1.25))
+            with store._conn() as conn:
+                conn.execute("INSERT INTO tasks (text, status, created_at, completed_at) VALUES (?, 'done', ?, ?)",
+                             (task, created.isoformat(timespec="seconds"), clock.isoformat(timespec="seconds")))
+        per_day.append(len(sent) - calls_before)
+
+    m = estimator.metrics
+    answered = m["model"] + m["cached"] + m["llm"]
+    print(f"{args.days} days, 6 tasks a day, Estimate Time before each task ({clicks} clicks)")
+    print(f"  whole list per click:   {legacy_calls:>4} LLM calls   {legacy_chars:>7} prompt chars")
+    print(f"  per-task, batched:      {len(sent):>4} LLM calls   {sum(sent):>7} prompt chars")
+    print(f"  task estimates: {m['model'] / answered:.0%} local model, {m['cached'] / answered:.0%} stored, "
+          f"{m['llm'] / answered:.0%} LLM   LLM calls per day: {per_day}")
+
+    truth = [(t, _ROUTINE[t]) for t in _ROUTINE]
+    err = [abs(estimator.model.predict(estimates.task_key(t)) - minutes) / minutes for t, minutes in truth
+           if estimator.model.predict(estimates.task_key(t)) is not None]
+    if err:
+        print(f"  local model: trained on {estimator.model.samples} completions, "
+              f"mean abs error {100 * sum(err) / len(err):.0f}% on {len(err)} routine tasks")
+
+
+# --- Playlist pick: generation vs embeddings ---
+def bench_classify(args):
+    import random
+
+    _, ollama = start_stubs(reply=lambda p: "I'd go with Focus Flow for this one!", prompt_delay=args.prompt_delay,
+                            token_delay=args.token_delay, embed_delay=args.embed_delay)
+    import prompts
+    from classify import PLAYLISTS, EmbeddingClassifier, playlist_context
+
+    rng = random.Random(3)
+    contexts = [(rng.choice(["Clear", "Clouds", "Rain", "Snow", None]), rng.randrange(24), rng.randrange(8))
+                for _ in range(args.picks)]
+    print(f"{args.picks} AI picks against the stub (prompt eval {args.prompt_delay * 1000:.0f} ms, "
+          f"{args.token_delay * 1000:.0f} ms/token, embedding {args.embed_delay * 1000:.0f} ms)")
+
+    def generative(weather, hour, tasks):
+        answer = prompts.complete(prompts.render("playlist_pick", options=list(PLAYLISTS), weather=weather or "Unknown",
+                                                 hour=hour, tasks=tasks))
+        return next((m for m in PLAYLISTS if m in answer), None)
+
+    classifier = EmbeddingClassifier(PLAYLISTS)
+    t0 = time.perf_counter()
+    classifier.scores("warm-up")  # label embeddings are computed once per process
+    setup = time.perf_counter() - t0
+
+    for label, pick in (("generative pick (today)", generative),
+                        ("embedding classifier", lambda *c: classifier.classify(playlist_context(*c)))):
+        before = ollama.requests
+        latencies, t0 = [], time.perf_counter()
+        for ctx in contexts:
+            t = time.perf_counter()
+            pick(*ctx)
+            latencies.append(time.perf_counter() - t)
+        report(label, latencies, time.perf_counter() - t0)
+        print(f"{'':<28} {ollama.requests - before} model requests")
+    print(f"label embeddings (once): {setup * 1000:.1f} ms; "
+          f"distinct playlist queries: {len({playlist_context(*c) for c in contexts})} of {len(contexts)}")
+    picks = [classifier.classify(playlist_context(*ctx)) for ctx in contexts]
+    print("embedding picks: " + ", ".join(f"{name} {picks.count(name)}" for name in PLAYLISTS))
+
+
+# --- Quick Assist conversations ---
+_FOLLOW_UPS = ["Draft an email to my landlord about the leaking kitchen sink", "Make it more polite",
+               "Explain what usually causes a sink to leak", "Ideas for a temporary fix until they reply",
+               "Add a line asking for a plumber this week", "Explain what a p-trap is",
+               "Ideas for a subject line", "Shorten the email to three sentences"]
+
+
+def bench_assist(args):
+    answer = ("Sure. Here is a clear, friendly answer that covers the main points, adds one practical tip "
+              "and ends with a short suggestion for the next step. ") * 3
+    _, ollama = start_stubs(reply=lambda p: answer, token_delay=0.0005, prompt_delay=0.01)
+    import pools
+    import prompts
+    from assist import AssistSession
+
+    requests = [prompts.render(f"quick_{'draft' if i % 3 == 0 else 'ideas' if i % 3 == 1 else 'explain'}",
+                               text=_FOLLOW_UPS[i % len(_FOLLOW_UPS)]) for i in range(args.turns)]
+    other = prompts.render("content_batch", count=10, what=pools.KINDS["fun_fact"][1], avoid="- (nothing yet)")
+    print(f"{args.turns}-turn Quick Assist conversation against the stub (prefix cache of one slot, like Ollama)")
+    for interleave in sorted({0, args.interleave}):
+        # Other panels' (or users') generations between turns evict the cached prefix
+        print(f"with {interleave} other generation(s) between turns:")
+        results = {}
+        for label, budget in (("full history", 10**9), (f"digest over {args.budget} tokens", args.budget)):
+            session = AssistSession(budget=budget)
+            before = ollama.requests
+            for request in requests:
+                for _ in session.stream(request):
+                    pass
+                session.wait()
+                for _ in range(interleave):
+                    prompts.complete(other)
+            results[label] = session
+            t = session.totals()
+            digests = ollama.requests - before - args.turns * (1 + interleave)
+            print(f"  {label:<26} last prompt {'~' + str(session.report[-1]['prompt_tokens_est']):>6} tokens   "
+                  f"evaluated {t['evaluated']:>6} of {'~' + str(t['prompt_tokens_est']):>7} (~{t['reused_est']} reused, est.)   "
+                  f"{digests} digest calls")
+    print(f"  {'turn':>4} " + " ".join(f"{label[:24]:>34}" for label in results))
+    for i in range(args.turns):
+        cells = []
+        for session in results.values():
+            r = session.report[i]
+            cells.append(f"{'~' + str(r['prompt_tokens_est']):>6} prompt {r['evaluated']:>5} evaluated{' D' if r['digest'] else '  '}")
+        print(f"  {i + 1:>4} " + " ".join(f"{c:>34}" for c in cells))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    p_api = sub.add_parser("api", help="Load-test the JSON API against the Streamlit path")
+    p_api.add_argument("--seconds", type=float, default=10)
+    p_api.add_argument("--concurrency", type=int, default=50)
+    p_api.set_defaults(func=bench_api)
+
+    p_sse = sub.add_parser("sse", help="Check SSE fan-out: N clients, one upstream generation")
+    p_sse.add_argument("--clients", type=int, default=50)
+    p_sse.set_defaults(func=bench_sse)
+
+    p_oll = sub.add_parser("ollama", help="Compare sync vs async generation throughput")
+    p_oll.add_argument("--prompts", type=int, default=10)
+    p_oll.set_defaults(func=bench_ollama)
+
+    p_rt = sub.add_parser("router", help="Latency routing and failover across stub backends")
+    p_rt.add_argument("--requests", type=int, default=30)
+    p_rt.set_defaults(func=bench_router)
+
+    p_wx = sub.add_parser("weather", help="Multi-city weather grid vs per-city fetches")
+    p_wx.add_argument("--latency", type=float, default=0.2, help="Stub upstream latency in seconds")
+    p_wx.set_defaults(func=bench_weather)
+
+    p_q = sub.add_parser("quota", help="Quota manager against a stub that returns 429s")
+    p_q.add_argument("--sessions", type=int, default=50)
+    p_q.add_argument("--budget", type=int, default=5, help="Weather requests per hour")
+    p_q.set_defaults(func=bench_quota)
+
+    p_f = sub.add_parser("faults", help="Deadlines, circuit breaker and last-known-good against a faulty stub")
+    p_f.add_argument("--deadline", type=float, default=0.5)
+    p_f.add_argument("--cooldown", type=float, default=1.0)
+    p_f.set_defaults(func=bench_faults)
+
+    p_c = sub.add_parser("cache", help="Cross-process single-flight on the memory / sqlite / redis backends")
+    p_c.add_argument("--processes", type=int, default=8)
+    p_c.add_argument("--latency", type=float, default=0.3, help="Stub upstream latency in seconds")
+    p_c.set_defaults(func=bench_cache)
+
+    p_ch = sub.add_parser("charts", help="Chart render time and bytes: fresh vs cached figures vs SVG")
+    p_ch.add_argument("--reruns", type=int, default=200)
+    p_ch.set_defaults(func=bench_charts)
+
+    p_cd = sub.add_parser("cards", help="HTML card bytes and render time per rerun, streaming updates")
+    p_cd.add_argument("--reruns", type=int, default=500)
+    p_cd.set_defaults(func=bench_cards)
+
+    p_pl = sub.add_parser("pools", help="Batched content-pool fill, dedup and per-session draws")
+    p_pl.add_argument("--sessions", type=int, default=200)
+    p_pl.set_defaults(func=bench_pools)
+
+    p_es = sub.add_parser("estimates", help="Per-task time estimates: local model, stored and batched LLM answers")
+    p_es.add_argument("--days", type=int, default=14)
+    p_es.set_defaults(func=bench_estimates)
+
+    p_cl = sub.add_parser("classify", help="AI playlist pick: generative call vs embedding classifier")
+    p_cl.add_argument("--picks", type=int, default=40)
+    p_cl.add_argument("--prompt-delay", type=float, default=0.25, help="Stub prompt eval seconds")
+    p_cl.add_argument("--token-delay", type=float, default=0.02, help="Stub seconds per generated token")
+    p_cl.add_argument("--embed-delay", type=float, default=0.02, help="Stub seconds per embedding request")
+    p_cl.set_defaults(func=bench_classify)
+
+    p_as = sub.add_parser("assist", help="Quick Assist conversation: full history vs rolling digest, prefix reuse")
+    p_as.add_argument("--turns", type=int, default=12)
+    p_as.add_argument("--budget", type=int, default=600, help="Verbatim history budget in tokens")
+    p_as.add_argument("--interleave", type=int, default=1, help="Other generations between turns")
+    p_as.set_defaults(func=bench_assist)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
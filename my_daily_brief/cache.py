@@ -0,0 +1,104 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+# --- Shared Cache ---
+# A small SQLite key/value store with per-entry expiry. It is shared between
+# the headless scheduler (writer) and every Streamlit session (readers), so
+# it lives on disk rather than in st.cache_data. It also serves as the
+# "sqlite" cache backend (see cachebackends.py), with advisory locks for
+# cross-process single-flight.
+
+DATA_DIR = os.getenv("BRIEF_DATA_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data"))
+CACHE_PATH = os.getenv("BRIEF_CACHE_PATH", os.path.join(DATA_DIR, "shared_cache.db"))
+
+
+class SharedCache:
+    """
+    Process- and thread-safe key/value cache. Values are JSON-serialisable
+    objects or raw bytes (e.g. MP3 audio).
+    """
+
+    def __init__(self, path=CACHE_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                " key TEXT PRIMARY KEY, kind TEXT NOT NULL, value BLOB NOT NULL,"
+                " expires_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS locks ("
+                " key TEXT PRIMARY KEY, token TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+
+    def _conn(self):
+        # One connection per thread; sqlite3 connections are not thread-safe
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key, default=None):
+        row = self._conn().execute(
+            "SELECT kind, value, expires_at FROM cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None or row[2] < time.time():
+            return default
+        kind, value, _ = row
+        if kind == "bytes":
+            return bytes(value)
+        return json.loads(value)
+
+    def set(self, key, value, ttl=86400):
+        if isinstance(value, (bytes, bytearray)):
+            kind, blob = "bytes", bytes(value)
+        else:
+            kind, blob = "json", json.dumps(value)
+        with self._conn() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (key, kind, value, expires_at) VALUES (?, ?, ?, ?)",
+                (key, kind, blob, time.time() + ttl),
+            )
+
+    def delete(self, key):
+        with self._conn() as conn:
+            conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def purge_expired(self):
+        with self._conn() as conn:
+            conn.execute("DELETE FROM cache WHERE expires_at < ?", (time.time(),))
+
+    # --- Locks ---
+    def acquire(self, key, ttl):
+        """
+        Takes the named lock for `ttl` seconds unless another holder has it.
+        Returns a release token, or None if it is held elsewhere.
+        """
+        token, now = uuid.uuid4().hex, time.time()
+        with self._conn() as conn:
+            cur = conn.execute(
+                "INSERT INTO locks (key, token, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET token = excluded.token, expires_at = excluded.expires_at "
+                "WHERE locks.expires_at < ?",
+                (key, token, now + ttl, now),
+            )
+        return token if cur.rowcount == 1 else None
+
+    def release(self, key, token):
+        with self._conn() as conn:
+            conn.execute("DELETE FROM locks WHERE key = ? AND token = ?", (key, token))
+
+
+def brief_key(city, date_str):
+    """
+    Cache key of the precomputed morning brief for a city on a given day.
+    """
+    return f"brief:{city.strip().lower()}:{date_str}"
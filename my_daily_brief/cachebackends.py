@@ -0,0 +1,261 @@
+import asyncio
+import functools
+import hashlib
+import os
+import socket
+import threading
+import time
+from urllib.parse import urlparse
+
+from cache import CACHE_PATH, SharedCache
+from warmcache import get_warm_cache, pack, unpack
+
+# --- Pluggable Cache Backends ---
+# Every cache (upstream data, LLM output, TTS audio, precomputed briefs) talks
+# to a backend with one small interface:
+#   get(key, default=None) / set(key, value, ttl) / delete(key)
+#   acquire(lock, ttl) -> token or None / release(lock, token)
+# Backends:
+#   memory          WarmCache: in-process, snapshotted to disk (one replica)
+#   sqlite[:path]   SharedCache: one file, shared by processes on one host
+#   redis://h:p/db  any Redis-protocol server, shared by replicas on many hosts
+# With sqlite and redis the lock calls give cross-process single-flight: when
+# a key expires, only the replica holding its lock recomputes it; the others
+# wait for the result. memory locks are in-process only, so each process
+# computes its own copy (see tests/test_single_flight.py).
+#
+# Caches have a role, each with its own default backend:
+#   shared - upstream responses, city IDs, scheduler briefs, API caches (sqlite)
+#   app    - the dashboard's data, LLM and audio caches (memory)
+# CACHE_BACKEND sets the backend of every role; CACHE_BACKEND_<ROLE> one role.
+
+DEFAULT_BACKENDS = {"shared": "sqlite", "app": "memory"}
+LOCK_TTL = 30.0  # seconds a refresh lock is held before others may take over
+LOCK_WAIT = 15.0  # max seconds a waiting replica polls before computing itself
+POLL_INTERVAL = 0.05
+
+
+class RedisError(Exception):
+    pass
+
+
+class RedisCache:
+    """
+    Cache backend over the Redis protocol (RESP2), with no client library:
+    only GET / SET (NX, PX) / DEL / SELECT / AUTH are used, so Redis,
+    Valkey, KeyDB, Dragonfly or the stub in stubs.py all work.
+    Values are msgpack-packed.
+    """
+
+    def __init__(self, url, prefix="brief:", timeout=2.0):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.db = int((parsed.path or "/0").lstrip("/") or 0)
+        self.password = parsed.password
+        self.prefix = prefix
+        self.timeout = timeout
+        self._local = threading.local()
+
+    # --- Protocol ---
+    def _connect(self):
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        self._local.sock, self._local.reader = sock, sock.makefile("rb")
+        if self.password:
+            self._command("AUTH", self.password)
+        if self.db:
+            self._command("SELECT", self.db)
+
+    def _read(self):
+        line = self._local.reader.readline()
+        if not line:
+            raise ConnectionError("Redis connection closed")
+        kind, rest = line[:1], line[1:-2]
+        if kind == b"+":
+            return rest.decode()
+        if kind == b"-":
+            raise RedisError(rest.decode())
+        if kind == b":":
+            return int(rest)
+        if kind == b"$":
+            size = int(rest)
+            return None if size < 0 else self._local.reader.read(size + 2)[:-2]
+        if kind == b"*":
+            size = int(rest)
+            return None if size < 0 else [self._read() for _ in range(size)]
+        raise RedisError(f"Unexpected reply {line!r}")
+
+    def _command(self, *args):
+        parts = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode()
+            parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        self._local.sock.sendall(b"".join(parts))
+        return self._read()
+
+    def command(self, *args):
+        """
+        Sends one command on this thread's connection, reconnecting once.
+        """
+        for attempt in (1, 2):
+            try:
+                if getattr(self._local, "sock", None) is None:
+                    self._connect()
+                return self._command(*args)
+            except (OSError, ConnectionError):
+                self._local.sock = None
+                if attempt == 2:
+                    raise
+
+    # --- Cache interface ---
+    def get(self, key, default=None):
+        blob = self.command("GET", self.prefix + key)
+        return default if blob is None else unpack(blob)
+
+    def set(self, key, value, ttl=86400):
+        self.command("SET", self.prefix + key, pack(value), "PX", max(1, int(ttl * 1000)))
+
+    def delete(self, key):
+        self.command("DEL", self.prefix + key)
+
+    def acquire(self, key, ttl):
+        token = os.urandom(8).hex()
+        reply = self.command("SET", self.prefix + key, token, "NX", "PX", max(1, int(ttl * 1000)))
+        return token if reply == "OK" else None
+
+    def release(self, key, token):
+        # GET + DEL is not atomic; the lock TTL bounds the (tiny) race
+        if self.command("GET", self.prefix + key) == token.encode():
+            self.command("DEL", self.prefix + key)
+
+
+def make_backend(spec):
+    if spec == "memory":
+        return get_warm_cache()
+    if spec == "sqlite" or spec.startswith("sqlite:"):
+        return SharedCache(spec.partition(":")[2] or CACHE_PATH)
+    if spec.startswith(("redis://", "rediss://")):
+        return RedisCache(spec)
+    raise ValueError(f"Unknown cache backend '{spec}' (use memory, sqlite[:path] or redis://host:port/db)")
+
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def get_cache_backend(role="shared"):
+    """
+    Process-wide backend for a cache role, from CACHE_BACKEND[_<ROLE>].
+    "memory" is per process: its locks and data are not shared, so it gives
+    no cross-process single-flight. Use sqlite or redis for the shared role
+    whenever more than one process (scheduler, API, several app replicas)
+    runs.
+    """
+    with _backends_lock:
+        if role not in _backends:
+            spec = (os.getenv(f"CACHE_BACKEND_{role.upper()}") or os.getenv("CACHE_BACKEND")
+                    or DEFAULT_BACKENDS[role])
+            _backends[role] = make_backend(spec)
+        return _backends[role]
+
+
+# --- Single-flight ---
+def single_flight(backend, key, compute, ttl, lock_ttl=LOCK_TTL, wait=LOCK_WAIT):
+    """
+    Read-through get: on a miss only the lock holder (in any process)
+    computes the value; others poll for it and only compute themselves if
+    it does not show up within `wait` seconds. None results are not cached.
+    """
+    value = backend.get(key)
+    if value is not None:
+        return value
+    lock = f"lock:{key}"
+    token = backend.acquire(lock, lock_ttl)
+    if token is None:
+        deadline = time.monotonic() + wait
+        while time.monotonic() < deadline:
+            time.sleep(POLL_INTERVAL)
+            value = backend.get(key)
+            if value is not None:
+                return value
+            token = backend.acquire(lock, lock_ttl)  # the holder may have failed
+            if token is not None:
+                break
+    try:
+        value = backend.get(key) if token is not None else None
+        if value is None:
+            value = compute()
+            if value is not None:
+                backend.set(key, value, ttl)
+        return value
+    finally:
+        if token is not None:
+            backend.release(lock, token)
+
+
+async def asingle_flight(backend, key, compute, ttl, lock_ttl=LOCK_TTL, wait=LOCK_WAIT):
+    """
+    single_flight for the event loop: backend calls run in threads and
+    `compute` is a coroutine function.
+    """
+    value = await asyncio.to_thread(backend.get, key)
+    if value is not None:
+        return value
+    lock = f"lock:{key}"
+    token = await asyncio.to_thread(backend.acquire, lock, lock_ttl)
+    if token is None:
+        deadline = time.monotonic() + wait
+        while time.monotonic() < deadline:
+            await asyncio.sleep(POLL_INTERVAL)
+            value = await asyncio.to_thread(backend.get, key)
+            if value is not None:
+                return value
+            token = await asyncio.to_thread(backend.acquire, lock, lock_ttl)
+            if token is not None:
+                break
+    try:
+        value = await asyncio.to_thread(backend.get, key) if token is not None else None
+        if value is None:
+            value = await compute()
+            if value is not None:
+                await asyncio.to_thread(backend.set, key, value, ttl)
+        return value
+    finally:
+        if token is not None:
+            await asyncio.to_thread(backend.release, lock, token)
+
+
+GENERATION_KEY = "shared_cached:generation"
+GENERATION_TTL = 30 * 86400
+
+
+def call_key(fn, args, kwargs, generation=0):
+    ident = pack([list(args), sorted(kwargs.items())])
+    return f"{fn.__module__}.{fn.__qualname__}:{generation}:{hashlib.sha1(ident).hexdigest()}"
+
+
+def refresh_shared_cached(role="app"):
+    """
+    Starts a new generation for the role's @shared_cached results: every
+    call computes afresh once, older entries are never read again and
+    expire on their own. Processes sharing the backend see it too.
+    """
+    backend = get_cache_backend(role)
+    backend.set(GENERATION_KEY, (backend.get(GENERATION_KEY) or 0) + 1, ttl=GENERATION_TTL)
+
+
+def shared_cached(ttl, role="app"):
+    """
+    Decorator: results (except None) are kept in the role's backend for
+    `ttl` seconds, computed once across processes. Stack it under
+    @st.cache_data so the in-process copy stays the fast path;
+    refresh_shared_cached() makes them all recompute.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            backend = get_cache_backend(role)
+            key = call_key(fn, args, kwargs, backend.get(GENERATION_KEY) or 0)
+            return single_flight(backend, key, lambda: fn(*args, **kwargs), ttl)
+        return wrapper
+    return decorator
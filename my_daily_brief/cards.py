@@ -0,0 +1,268 @@
+import functools
+import html
+import re
+import time
+
+# --- HTML Cards ---
+# The dashboard's cards (briefing, fun fact, news pills, market tiles, AI
+# insight) used to be inline-styled f-strings, rebuilt on every call (once
+# per streamed token for the briefing) with unescaped LLM and API text.
+# Here:
+#   - STYLESHEET holds the app CSS plus one class per card, minified once
+#     into STYLE_TAG, so cards carry class names instead of inline styles
+#   - templates are compiled once into literal / field parts; {name} is
+#     HTML-escaped, {name|br} also keeps line breaks, {name|url} only lets
+#     http(s) links through and {name|raw} is for trusted fragments
+#   - render() memoizes output by arguments, and CardStream only pushes a
+#     streaming card when its HTML changed, at most every STREAM_INTERVAL
+
+STREAM_INTERVAL = 0.08  # seconds between placeholder updates while streaming
+RENDER_CACHE = 1024
+
+STYLESHEET = """
+@import url('https://fonts.googleapis.com/css2?family=Inter:wght@400;600;700&display=swap');
+
+/* Main Background */
+.stApp {
+    background-color: #000000; /* Deep Black */
+    color: #ffffff;
+    font-family: 'Inter', sans-serif;
+}
+
+/* Sidebar */
+[data-testid="stSidebar"] {
+    background-color: #050505;
+    border-right: 1px solid #1a1a1a;
+}
+
+/* Headers */
+h1, h2, h3 {
+    font-family: 'Inter', sans-serif;
+    font-weight: 700;
+    letter-spacing: -0.5px;
+    color: #ffffff;
+}
+
+h1 {
+    font-size: 2.5rem;
+    margin-bottom: 10px;
+}
+
+/* Cards/Containers */
+.css-1r6slb0, .stColumn, [data-testid="stVerticalBlock"] > [data-testid="stVerticalBlock"] {
+    background-color: #111111; /* Dark Grey Card */
+    border-radius: 24px;
+    padding: 20px;
+    border: 1px solid #222;
+}
+
+/* Inputs */
+.stTextInput > div > div > input, .stNumberInput > div > div > input {
+    background-color: #1a1a1a;
+    color: #ffffff;
+    border: none;
+    border-radius: 12px;
+    padding: 10px 15px;
+    font-family: 'Inter', sans-serif;
+}
+
+/* Buttons */
+.stButton > button {
+    background-color: #ccff00; /* Neon Green */
+    color: #000000;
+    border: none;
+    border-radius: 30px;
+    padding: 10px 25px;
+    font-weight: 600;
+    transition: all 0.3s ease;
+}
+
+.stButton > button:hover {
+    background-color: #b3e600;
+    transform: scale(1.02);
+}
+
+/* Metrics */
+[data-testid="stMetricValue"] {
+    font-family: 'Inter', sans-serif;
+    font-weight: 700;
+    color: #ffffff;
+}
+
+[data-testid="stMetricLabel"] {
+    color: #888888;
+    font-size: 0.9rem;
+}
+
+/* Divider */
+hr {
+    border-color: #222;
+}
+
+/* Chat */
+.stChatMessage {
+    background-color: #111111;
+    border-radius: 16px;
+    border: 1px solid #222;
+}
+
+/* Custom Classes for Accents */
+.accent-green { color: #ccff00; }
+.accent-orange { color: #ff9900; }
+
+/* Brief cards */
+.bc { background-color: #1a1a1a; padding: 15px; border-radius: 12px; border-left: 4px solid #ccff00; }
+.bc-title { font-size: 0.8rem; color: #ccff00; font-weight: 600; margin-bottom: 4px; }
+.bc-body { color: #ddd; font-size: 0.9rem; margin-bottom: 8px; }
+.bc-brief { height: 100%; }
+.bc-note { font-size: 0.85rem; color: #888; font-style: italic; }
+.bc-fact { border-left-color: #00bfff; }
+.bc-fact .bc-title { color: #00bfff; }
+.bc-fact .bc-body { font-style: italic; margin-bottom: 0; }
+.bc-pill { padding: 10px; margin-bottom: 10px; border-left-width: 5px; }
+.bc-pill.alt { border-left-color: #ff9900; }
+.bc-pill .bc-src { font-size: 0.8rem; color: #888; }
+.bc-pill a { font-weight: 600; font-size: 0.9rem; color: #fff; text-decoration: none; }
+.bc-tile { padding: 8px; border-radius: 8px; margin-bottom: 8px; border: 1px solid #333; }
+.bc-tile .bc-src { font-size: 0.75rem; color: #888; }
+.bc-tile .bc-val { font-size: 1rem; font-weight: 700; color: #fff; }
+.bc-tile .bc-chg { font-size: 0.75rem; color: #ccff00; }
+.bc-tile .bc-chg.down { color: #ff4444; }
+.bc-insight { background-color: #222; padding: 10px; border-radius: 8px; font-size: 0.85rem; border: 1px solid #444; }
+"""
+
+
+def minify_css(css):
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.S)
+    css = re.sub(r"\s+", " ", css)
+    return re.sub(r"\s*([{};:,>])\s*", r"\1", css).replace(";}", "}").strip()
+
+
+STYLE_TAG = f"<style>{minify_css(STYLESHEET)}</style>"
+
+
+# --- Template engine ---
+def _url(value):
+    value = str(value).strip()
+    return html.escape(value) if value.startswith(("https://", "http://")) else "#"
+
+
+FILTERS = {
+    "": lambda v: html.escape(str(v)),
+    "br": lambda v: html.escape(str(v)).replace("\n", "<br>"),
+    "url": _url,
+    "raw": str,
+}
+
+_FIELD = re.compile(r"\{(\w+)(?:\|(\w+))?\}")
+
+
+class Template:
+    """
+    HTML template compiled once: whitespace between tags is dropped (a
+    single line, so Markdown never sees indented code) and the source
+    becomes a positional str.format pattern plus one filter per field.
+    """
+
+    def __init__(self, source):
+        source = re.sub(r">\s+<", "><", source.strip())
+        self.fields = []
+        pattern, pos = [], 0
+        for m in _FIELD.finditer(source):
+            pattern.append(source[pos:m.start()].replace("{", "{{").replace("}", "}}"))
+            pattern.append("{%d}" % len(self.fields))
+            self.fields.append((m.group(1), FILTERS[m.group(2) or ""]))
+            pos = m.end()
+        pattern.append(source[pos:].replace("{", "{{").replace("}", "}}"))
+        self.pattern = "".join(pattern)
+
+    def render(self, **values):
+        return self.pattern.format(*[f(values[name]) for name, f in self.fields])
+
+
+TEMPLATES = {
+    "briefing": Template("""
+        <div class="bc bc-brief">
+            <div class="bc-title">DAILY BRIEFING</div>
+            <div class="bc-body">{text|br}</div>
+            <div class="bc-note">{outfit}</div>
+        </div>
+    """),
+    "fun_fact": Template("""
+        <div class="bc bc-fact">
+            <div class="bc-title">DID YOU KNOW?</div>
+            <div class="bc-body">"{fact}"</div>
+        </div>
+    """),
+    "news_pill": Template("""
+        <div class="bc bc-pill {variant|raw}">
+            <div class="bc-src">{source}</div>
+            <a href="{url|url}">{title}...</a>
+        </div>
+    """),
+    "market_tile": Template("""
+        <div class="bc bc-tile">
+            <div class="bc-src">{label}</div>
+            <div class="bc-val">{value}</div>
+            <div class="bc-chg {direction|raw}">{change}</div>
+        </div>
+    """),
+    "insight": Template("""<div class="bc-insight">{text|br}</div>"""),
+}
+
+
+@functools.lru_cache(maxsize=RENDER_CACHE)
+def render(name, **values):
+    """
+    HTML for a card; identical arguments reuse the rendered string.
+    """
+    return TEMPLATES[name].render(**values)
+
+
+# --- Card helpers (memoized on their raw inputs) ---
+@functools.lru_cache(maxsize=RENDER_CACHE)
+def _news_pill(alt, source, url, title):
+    return TEMPLATES["news_pill"].render(variant="alt" if alt else "", source=source, url=url, title=title[:60])
+
+
+def news_pill(article, index):
+    return _news_pill(index % 2, (article.get('source') or {}).get('name') or "",
+                      article.get('url') or "", article.get('title') or "")
+
+
+@functools.lru_cache(maxsize=RENDER_CACHE)
+def market_tile(label, price, change):
+    return TEMPLATES["market_tile"].render(
+        label=label, value=f"{price:,.0f}", direction="" if change >= 0 else "down",
+        change=f"{'▲' if change >= 0 else '▼'} {abs(change):.2f}%")
+
+
+class CardStream:
+    """
+    Renders a card into a Streamlit placeholder while its text streams in.
+    Unchanged HTML is never re-sent and updates are throttled to one per
+    `interval`; flush() sends the final state.
+    """
+
+    def __init__(self, placeholder, name, interval=STREAM_INTERVAL, **fixed):
+        self.placeholder = placeholder
+        self.name = name
+        self.interval = interval
+        self.fixed = fixed
+        self.sent = None
+        self.pending = None
+        self.last_sent_at = 0.0
+        self.updates = 0
+
+    def update(self, **values):
+        # Streaming text differs on every token: render directly, not via the memo
+        self.pending = TEMPLATES[self.name].render(**self.fixed, **values)
+        if time.monotonic() - self.last_sent_at >= self.interval:
+            self.flush()
+
+    def flush(self):
+        if self.pending is not None and self.pending != self.sent:
+            self.placeholder.markdown(self.pending, unsafe_allow_html=True)
+            self.sent, self.last_sent_at = self.pending, time.monotonic()
+            self.updates += 1
+        self.pending = None
@@ -0,0 +1,188 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import plotly.graph_objects as go
+
+# --- Chart Layer ---
+# Building a go.Figure (trace validation, update_layout) costs ~10 ms per
+# chart and the default "plotly" template adds ~6 KB of JSON to every spec,
+# on every rerun even when the data has not changed. Here:
+#   - THEME is one precompiled template (dark, transparent, Inter) that every
+#     chart shares instead of repeating update_layout and shipping the default
+#   - figure() memoizes charts by a hash of their data, as a FrozenFigure
+#     holding the finished dict spec: st.plotly_chart takes a figure as
+#     already validated, and to_dict() hands it the spec without the deep
+#     copy a live figure makes, so a rerun costs one JSON dump of the spec
+#   - sparkline_svg() renders tiny charts as inline SVG: a few hundred bytes
+#     and no Plotly at all
+
+ACCENT = '#ccff00'
+SECONDARY = '#ff9900'
+MUTED = '#444'
+MAX_FIGURES = 256
+SPARKLINES = os.getenv("CHART_RENDERER", "svg") == "svg"  # "plotly" for full charts everywhere
+
+THEME = go.layout.Template(layout=dict(
+    plot_bgcolor='rgba(0,0,0,0)',
+    paper_bgcolor='rgba(0,0,0,0)',
+    font=dict(color='#888', family="Inter"),
+    xaxis=dict(showgrid=False, zeroline=False),
+    yaxis=dict(showgrid=False, zeroline=False, gridcolor='#222'),
+    margin=dict(l=0, r=0, t=10, b=0),
+    showlegend=False,
+))
+
+
+def data_key(name, data):
+    blob = json.dumps([name, data], sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha1(blob.encode("utf-8")).hexdigest()
+
+
+class FrozenFigure(go.Figure):
+    """
+    A built figure reduced to its plain dict spec. Only to_dict() (and so
+    st.plotly_chart / plotly.io.to_json) sees the chart; the spec is shared
+    and must not be modified.
+    """
+
+    def __init__(self, fig):
+        super().__init__()
+        self._spec = fig.to_dict()
+
+    def to_dict(self):
+        return self._spec
+
+
+class FigureCache:
+    """
+    Thread-safe LRU of frozen figures, shared by all sessions.
+    """
+
+    def __init__(self, max_items=MAX_FIGURES):
+        self.max_items = max_items
+        self._figures = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, build):
+        with self._lock:
+            fig = self._figures.get(key)
+            if fig is not None:
+                self._figures.move_to_end(key)
+                self.hits += 1
+                return fig
+            self.misses += 1
+        fig = FrozenFigure(build())
+        with self._lock:
+            self._figures[key] = fig
+            while len(self._figures) > self.max_items:
+                self._figures.popitem(last=False)
+        return fig
+
+
+FIGURES = FigureCache()
+
+
+def figure(builder, *data):
+    """
+    builder(*data) -> go.Figure, built and frozen once per distinct data.
+    `data` must be JSON-serialisable (datetimes are hashed via str()).
+    """
+    return FIGURES.get(data_key(builder.__name__, data), lambda: builder(*data))
+
+
+# --- Figures ---
+def forecast_figure(dates, temps):
+    fig = go.Figure(go.Scatter(
+        x=dates, y=temps,
+        mode='lines',
+        line=dict(color=ACCENT, width=3, shape='spline'),
+        fill='tozeroy',
+        fillcolor='rgba(204, 255, 0, 0.1)'
+    ))
+    fig.update_layout(
+        template=THEME,
+        xaxis=dict(showticklabels=False),
+        yaxis=dict(showgrid=True),
+        height=150
+    )
+    return fig
+
+
+def forex_figure(base_currency, amount, converted_amount):
+    fig = go.Figure(go.Bar(
+        x=[base_currency, 'INR'],
+        y=[amount, converted_amount],
+        marker=dict(color=[ACCENT, SECONDARY], line=dict(width=0)),
+        text=[f"{amount:,.0f}", f"₹{converted_amount:,.0f}"],
+        textposition='auto',
+    ))
+    fig.update_layout(
+        template=THEME,
+        font=dict(color='#fff'),
+        yaxis=dict(showticklabels=False),
+        margin=dict(t=20),
+        height=200,
+        bargap=0.4
+    )
+    return fig
+
+
+def city_temps_figure(cities, temps, highlight):
+    fig = go.Figure(go.Bar(
+        x=temps, y=cities, orientation='h',
+        marker_color=[ACCENT if c == highlight else MUTED for c in cities]
+    ))
+    fig.update_layout(
+        template=THEME,
+        xaxis=dict(showgrid=True, title="°C"),
+        yaxis=dict(autorange="reversed"),
+        height=300,
+        bargap=0.3
+    )
+    return fig
+
+
+# --- Inline SVG ---
+def _smooth_path(points):
+    # Catmull-Rom through the points, as cubic Béziers (like Plotly's 'spline')
+    d = [f"M{points[0][0]:.0f},{points[0][1]:.0f}"]
+    for i in range(len(points) - 1):
+        p0, p1, p2 = points[max(i - 1, 0)], points[i], points[i + 1]
+        p3 = points[min(i + 2, len(points) - 1)]
+        c1 = (p1[0] + (p2[0] - p0[0]) / 6, p1[1] + (p2[1] - p0[1]) / 6)
+        c2 = (p2[0] - (p3[0] - p1[0]) / 6, p2[1] - (p3[1] - p1[1]) / 6)
+        d.append(f"C{c1[0]:.0f},{c1[1]:.0f} {c2[0]:.0f},{c2[1]:.0f} {p2[0]:.0f},{p2[1]:.0f}")
+    return "".join(d)
+
+
+def sparkline_svg(values, height=150, color=ACCENT, fill='rgba(204, 255, 0, 0.1)', unit="°"):
+    """
+    Smooth filled sparkline as inline <svg> that stretches to its
+    container's width, with the high and low values labelled in HTML (SVG
+    text would be stretched along with the path).
+    """
+    if len(values) < 2:
+        return ""
+    lo, hi = min(values), max(values)
+    span = (hi - lo) or 1.0
+    width, pad = 300, 8
+    step = width / (len(values) - 1)
+    points = [(i * step, pad + (hi - v) / span * (height - 2 * pad)) for i, v in enumerate(values)]
+    line = _smooth_path(points)
+    label = 'position:absolute;left:2px;font-size:0.7rem;color:#888;'
+    return (
+        f'<div style="position:relative;height:{height}px;">'
+        f'<svg viewBox="0 0 {width} {height}" width="100%" height="{height}" preserveAspectRatio="none" '
+        f'xmlns="http://www.w3.org/2000/svg">'
+        f'<path d="{line} L{width},{height} L0,{height} Z" fill="{fill}"/>'
+        f'<path d="{line}" fill="none" stroke="{color}" stroke-width="3" vector-effect="non-scaling-stroke"/>'
+        f'</svg>'
+        f'<span style="{label}top:0;">{hi:.0f}{unit}</span>'
+        f'<span style="{label}bottom:0;">{lo:.0f}{unit}</span>'
+        f'</div>'
+    )
@@ -0,0 +1,250 @@
+"""
+Offline city index built from GeoNames (cities15000 by default).
+
+    python cities.py build [path-or-url-to-cities15000.zip|.txt]
+    python cities.py search "san fran"
+"""
+import difflib
+import io
+import os
+import sys
+import threading
+import unicodedata
+import zipfile
+
+import numpy as np
+import requests
+
+from cache import DATA_DIR
+
+# --- Offline City Index ---
+# Sorted, fixed-width name keys in memory-mapped .npy files: prefix lookups are
+# two binary searches (np.searchsorted), so autocomplete and name -> ID
+# resolution take microseconds and never touch the network. GeoNames IDs are
+# the same IDs OpenWeatherMap uses, so a resolved city can be fetched by ID.
+
+CITY_INDEX_DIR = os.getenv("CITY_INDEX_DIR", os.path.join(DATA_DIR, "cities"))
+GEONAMES_URL = "https://download.geonames.org/export/dump/cities15000.zip"
+KEY_WIDTH = 40
+LABEL_WIDTH = 64
+FUZZY_CUTOFF = 0.75
+
+
+def normalize(text):
+    """
+    Lowercase ASCII form used as the lookup key: accents stripped,
+    punctuation dropped, whitespace collapsed.
+    """
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    text = "".join(ch if ch.isalnum() else " " for ch in text.lower())
+    return " ".join(text.split())
+
+
+def split_country(query):
+    """
+    'Paris, FR' -> ('Paris', 'FR'); a trailing 2-letter code narrows the match.
+    """
+    name, sep, country = query.rpartition(",")
+    country = country.strip()
+    if sep and len(country) == 2 and country.isalpha():
+        return name, country.upper()
+    return query, None
+
+
+class CityIndex:
+    """
+    Read-only city index over memory-mapped arrays:
+    keys (sorted, S40) -> key_rows -> ids / coords / population / labels / countries.
+    """
+
+    FILES = ("keys", "key_rows", "ids", "coords", "population", "labels", "countries")
+
+    def __init__(self, path=CITY_INDEX_DIR):
+        self.path = path
+        for name in self.FILES:
+            setattr(self, name, np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r"))
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def exists(cls, path=CITY_INDEX_DIR):
+        return all(os.path.exists(os.path.join(path, f"{name}.npy")) for name in cls.FILES)
+
+    # --- Lookups ---
+    def _range(self, key, prefix):
+        key = key.encode("ascii", "ignore")[:KEY_WIDTH]
+        lo = int(np.searchsorted(self.keys, key, side="left"))
+        if prefix:
+            hi = int(np.searchsorted(self.keys, key[:KEY_WIDTH - 1] + b"\xff", side="left"))
+        else:
+            hi = int(np.searchsorted(self.keys, key, side="right"))
+        return lo, hi
+
+    def _rank(self, rows, country, limit):
+        rows = np.unique(rows)
+        if country:
+            rows = rows[self.countries[rows] == country.encode()]
+        order = np.argsort(-self.population[rows], kind="stable")
+        return [int(r) for r in rows[order][:limit]]
+
+    def city(self, row):
+        lat, lon = self.coords[row]
+        return {
+            "id": int(self.ids[row]),
+            "label": self.labels[row].decode("utf-8"),
+            "country": self.countries[row].decode(),
+            "lat": round(float(lat), 4),
+            "lon": round(float(lon), 4),
+            "population": int(self.population[row]),
+        }
+
+    def resolve(self, query):
+        """
+        Exact (normalised) name match, most populous first; None if unknown.
+        """
+        name, country = split_country(query)
+        lo, hi = self._range(normalize(name), prefix=False)
+        rows = self._rank(self.key_rows[lo:hi], country, 1)
+        return self.city(rows[0]) if rows else None
+
+    def prefix(self, query, limit=8):
+        """
+        Autocomplete: cities whose name (or an alternate name) starts with `query`.
+        """
+        name, country = split_country(query)
+        key = normalize(name)
+        if not key:
+            return []
+        lo, hi = self._range(key, prefix=True)
+        return [self.city(r) for r in self._rank(self.key_rows[lo:hi], country, limit)]
+
+    def fuzzy(self, query, limit=5, cutoff=FUZZY_CUTOFF):
+        """
+        Typo-tolerant matches. Candidates share the first two letters (then
+        just the first), which keeps the comparison set small.
+        """
+        name, country = split_country(query)
+        key = normalize(name)
+        if not key:
+            return []
+        matches = []
+        for head in dict.fromkeys((key[:2], key[:1])):
+            lo, hi = self._range(head, prefix=True)
+            candidates = [k.decode("ascii") for k in self.keys[lo:hi]]
+            matches = difflib.get_close_matches(key, candidates, n=limit * 4, cutoff=cutoff)
+            if matches:
+                break
+        seen, out = set(), []
+        for match in matches:
+            m_lo, m_hi = self._range(match, prefix=False)
+            for row in self._rank(self.key_rows[m_lo:m_hi], country, limit):
+                if row not in seen:
+                    seen.add(row)
+                    out.append(self.city(row))
+        return out[:limit]
+
+    def suggest(self, query, limit=5):
+        """
+        Exact match first, then prefix completions, then fuzzy corrections.
+        """
+        results = []
+        exact = self.resolve(query)
+        if exact:
+            results.append(exact)
+        for city in self.prefix(query, limit) or self.fuzzy(query, limit):
+            if all(city["id"] != r["id"] for r in results):
+                results.append(city)
+        return results[:limit]
+
+
+# --- Builder ---
+def _read_source(source):
+    if source.startswith(("http://", "https://")):
+        response = requests.get(source, timeout=120)
+        response.raise_for_status()
+        blob = response.content
+    else:
+        with open(source, "rb") as f:
+            blob = f.read()
+    if blob[:2] == b"PK":
+        with zipfile.ZipFile(io.BytesIO(blob)) as zf:
+            blob = zf.read(next(n for n in zf.namelist() if n.endswith(".txt")))
+    return io.StringIO(blob.decode("utf-8"))
+
+
+def build_index(source=GEONAMES_URL, path=CITY_INDEX_DIR):
+    """
+    Builds the index from a GeoNames dump (tab-separated: id, name, asciiname,
+    alternatenames, lat, lon, ..., country code [8], ..., population [14]).
+    """
+    ids, coords, population, labels, countries = [], [], [], [], []
+    keys = []
+    for line in _read_source(source):
+        cols = line.rstrip("\n").split("\t")
+        if len(cols) < 15:
+            continue
+        row = len(ids)
+        ids.append(int(cols[0]))
+        coords.append((float(cols[4]), float(cols[5])))
+        population.append(int(cols[14] or 0))
+        countries.append(cols[8])
+        labels.append(f"{cols[1]}, {cols[8]}".encode("utf-8")[:LABEL_WIDTH])
+        # Official and ASCII names plus ASCII alternates (e.g. Bangalore -> Bengaluru)
+        names = {cols[1], cols[2]} | {a for a in cols[3].split(",") if a.isascii()}
+        for key in {normalize(n) for n in names}:
+            if key:
+                keys.append((key.encode("ascii", "ignore")[:KEY_WIDTH], row))
+
+    keys.sort()
+    os.makedirs(path, exist_ok=True)
+    arrays = {
+        "keys": np.array([k for k, _ in keys], dtype=f"S{KEY_WIDTH}"),
+        "key_rows": np.array([r for _, r in keys], dtype=np.int32),
+        "ids": np.array(ids, dtype=np.int32),
+        "coords": np.array(coords, dtype=np.float32).reshape(-1, 2),
+        "population": np.array(population, dtype=np.int64),
+        "labels": np.array(labels, dtype=f"S{LABEL_WIDTH}"),
+        "countries": np.array(countries, dtype="S2"),
+    }
+    for name, array in arrays.items():
+        np.save(os.path.join(path, f"{name}.npy"), array)
+    return len(ids), len(keys)
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_city_index():
+    """
+    Process-wide index, or None if it has not been built yet.
+    """
+    global _index
+    with _index_lock:
+        if _index is None and CityIndex.exists():
+            _index = CityIndex()
+        return _index
+
+
+def main(argv):
+    if len(argv) >= 1 and argv[0] == "build":
+        source = argv[1] if len(argv) > 1 else GEONAMES_URL
+        cities, keys = build_index(source)
+        print(f"Indexed {cities} cities under {keys} names in {CITY_INDEX_DIR}")
+    elif len(argv) == 2 and argv[0] == "search":
+        index = get_city_index()
+        if index is None:
+            print("No city index yet. Run: python cities.py build")
+            return 1
+        for city in index.suggest(argv[1]):
+            print(f"{city['id']:>9}  {city['label']:<40} {city['lat']:>9} {city['lon']:>10}  pop {city['population']}")
+    else:
+        print(__doc__)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,91 @@
+import functools
+import threading
+
+import numpy as np
+
+from llm import EMBED_MODEL, embed_texts
+from pools import daypart
+
+# --- Embedding Classification ---
+# Picking one of a handful of known options (a playlist, a Quick Assist
+# action) does not need text generation. Each option's description is
+# embedded once; a query costs one embedding call and a matrix-vector
+# product, and identical queries reuse their vector. The playlist context is
+# bucketed (daypart, weather, workload) so most picks hit that cache.
+
+QUERY_CACHE = 256
+
+PLAYLISTS = {
+    "Morning Chill": "Calm, gentle acoustic music for a slow, relaxed start with coffee. "
+                     "Early morning, sunrise, mist, clouds, quiet, nothing urgent yet.",
+    "Focus Flow": "Instrumental music for deep concentration and getting work done. "
+                  "Afternoon, a busy day with a long to-do list, meetings, deadlines.",
+    "Upbeat Energy": "Energetic, happy pop and dance music to lift the mood and get moving. "
+                     "Evening, sunny, clear sky, workout, party, no tasks left, celebration.",
+    "Lo-Fi Study": "Mellow lo-fi beats for reading, studying or winding down, cosy indoors. "
+                   "Night, rain, drizzle, snow, thunderstorm, a few tasks pending.",
+}
+
+QUICK_INTENTS = {
+    "draft": "Write or draft an email, message, letter, reply, note, post or announcement to someone.",
+    "ideas": "Brainstorm ideas, suggestions, options or names for a party, gift, trip, project or plan.",
+    "explain": "Explain, define or describe a concept, term or how something works, simply, like a teacher.",
+}
+
+
+def _normalise(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+class EmbeddingClassifier:
+    """
+    Nearest label by cosine similarity between a query embedding and the
+    (precomputed) embeddings of the label descriptions.
+    """
+
+    def __init__(self, labels, model=EMBED_MODEL, embed=embed_texts):
+        self.names = list(labels)
+        self.descriptions = [labels[name] for name in self.names]
+        self.model = model
+        self.embed = embed
+        self._matrix = None
+        self._lock = threading.Lock()
+        self._query_vector = functools.lru_cache(maxsize=QUERY_CACHE)(self._embed_query)
+
+    def _labels(self):
+        with self._lock:
+            if self._matrix is None:
+                self._matrix = _normalise(self.embed(self.descriptions))
+            return self._matrix
+
+    def _embed_query(self, text):
+        return _normalise(self.embed([text])[0])
+
+    def scores(self, text):
+        """
+        {label: cosine similarity} for the query text.
+        """
+        sims = self._labels() @ self._query_vector(text)
+        return dict(zip(self.names, sims.tolist()))
+
+    def classify(self, text):
+        scores = self.scores(text)
+        return max(scores, key=scores.get)
+
+
+# --- Playlist context ---
+def _workload(tasks):
+    if tasks == 0:
+        return "no tasks left"
+    return "a few tasks pending" if tasks <= 3 else "a busy day with a long to-do list"
+
+
+def playlist_context(weather_main, hour, tasks):
+    """
+    Query text for the playlist classifier. Only coarse buckets go in, so
+    the same situation always yields the same (cached) query.
+    """
+    weather = (weather_main or "unknown").lower()
+    return f"It is {daypart(hour)}, the weather is {weather}, {_workload(tasks)}."
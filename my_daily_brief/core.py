@@ -0,0 +1,285 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import yfinance as yf
+from io import BytesIO
+from gtts import gTTS
+
+import prompts
+from cities import get_city_index
+from quota import get_quota
+from resilience import UpstreamError, deadline, guarded
+
+# --- Core Data & Prompt Logic ---
+# Plain functions with no Streamlit dependency. The app wraps them with
+# st.cache_data; the scheduler and the HTTP API (api.py) call them directly.
+
+# Every upstream request goes through the quota manager (quota.py), which
+# spends the provider's shared budget, coalesces identical requests and
+# serves the last good response when the budget is tight.
+
+# Upstream base URLs (overridable, e.g. to point at the local stubs in stubs.py)
+WEATHER_BASE_URL = os.getenv("WEATHER_BASE_URL", "http://api.openweathermap.org")
+NEWS_BASE_URL = os.getenv("NEWS_BASE_URL", "https://newsapi.org")
+FOREX_BASE_URL = os.getenv("FOREX_BASE_URL", "https://open.er-api.com")
+
+MARKET_TICKERS = {
+    "BTC": "BTC-USD",
+    "S&P 500": "SPY",
+    "NIFTY 50": "^NSEI",
+    "SENSEX": "^BSESN"
+}
+
+GROUP_MAX_IDS = 20  # OpenWeatherMap's limit per /group request
+WEATHER_WORKERS = 16
+CITY_ID_TTL = 30 * 86400
+
+
+def _weather_result(data):
+    # Create simplified summary for top bar
+    temp = data['main']['temp']
+    desc = data['weather'][0]['description']
+    summary = f"{temp:.1f}°C, {desc}"
+    return {"full": data, "summary": summary}
+
+
+def city_query(city_name):
+    """
+    Query string for a city: by canonical ID when it resolves (no ambiguity,
+    no fuzzy server-side matching), else by name.
+    """
+    city_id = lookup_city_id(city_name)
+    return f"id={city_id}" if city_id is not None else f"q={city_name}"
+
+
+def _fetch_weather_data(city_name):
+    weather_api_key = os.getenv("WEATHER_API_KEY")
+    if weather_api_key and city_name:
+        try:
+            weather_url = f"{WEATHER_BASE_URL}/data/2.5/weather?{city_query(city_name)}&appid={weather_api_key}&units=metric"
+            w_response = get_quota().get("weather", weather_url)
+            if w_response.status_code == 200:
+                return _weather_result(w_response.json())
+        except Exception:
+            pass
+    return None
+
+
+def fetch_weather_data(city_name):
+    if not city_name:
+        return None
+    return get_quota().fetch("weather", f"weather:{city_key(city_name)}", lambda: _fetch_weather_data(city_name))
+
+
+# --- Multi-City Weather ---
+# City names are resolved to OpenWeatherMap IDs offline through the city
+# index (cities.py) when it is built, otherwise once from the first by-name
+# response, and remembered in-process and optionally in a shared store.
+# Known IDs are then fetched together through /data/2.5/group, and only
+# unknown names cost a request each, all concurrently, so a full grid takes
+# about as long as a single fetch.
+
+_city_ids = {}
+_city_ids_lock = threading.Lock()
+
+
+def city_key(city_name):
+    return " ".join(city_name.split()).lower()
+
+
+def lookup_city_id(city_name, store=None):
+    key = city_key(city_name)
+    with _city_ids_lock:
+        city_id = _city_ids.get(key)
+    if city_id is None and store is not None:
+        city_id = store.get(f"cityid:{key}")
+    if city_id is None and get_city_index() is not None:
+        city = get_city_index().resolve(city_name)
+        city_id = city["id"] if city else None
+    if city_id is not None:
+        with _city_ids_lock:
+            _city_ids[key] = city_id
+    return city_id
+
+
+def remember_city_id(city_name, city_id, store=None):
+    key = city_key(city_name)
+    with _city_ids_lock:
+        _city_ids[key] = city_id
+    if store is not None:
+        store.set(f"cityid:{key}", city_id, ttl=CITY_ID_TTL)
+
+
+def _fetch_weather_group(city_ids):
+    weather_api_key = os.getenv("WEATHER_API_KEY")
+    if not weather_api_key or not city_ids:
+        return None
+    try:
+        ids = ",".join(str(i) for i in city_ids)
+        group_url = f"{WEATHER_BASE_URL}/data/2.5/group?id={ids}&appid={weather_api_key}&units=metric"
+        g_response = get_quota().get("weather", group_url)
+        if g_response.status_code == 200:
+            # JSON object keys must be strings to survive the shared cache
+            return {str(item['id']): _weather_result(item) for item in g_response.json().get('list', [])}
+    except Exception:
+        pass
+    return None
+
+
+def fetch_weather_group(city_ids):
+    """
+    Current weather for up to GROUP_MAX_IDS city IDs in one request.
+    Returns {str(city_id): result}, or None if the group endpoint failed.
+    """
+    key = "weather-group:" + ",".join(str(i) for i in sorted(city_ids))
+    return get_quota().fetch("weather", key, lambda: _fetch_weather_group(city_ids))
+
+
+def fetch_multi_city_weather(city_names, store=None):
+    """
+    Returns {city_name: result or None} for all cities, in input order.
+    `store` (e.g. a SharedCache) persists the name -> ID resolution.
+    """
+    ids = {c: lookup_city_id(c, store) for c in city_names}
+    known = [c for c in city_names if ids[c] is not None]
+    unknown = [c for c in city_names if ids[c] is None]
+    batches = [known[i:i + GROUP_MAX_IDS] for i in range(0, len(known), GROUP_MAX_IDS)]
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=WEATHER_WORKERS) as pool:
+        group_jobs = [(batch, pool.submit(fetch_weather_group, [ids[c] for c in batch])) for batch in batches]
+        single_jobs = {c: pool.submit(fetch_weather_data, c) for c in unknown}
+
+        # Cities the group call could not answer fall back to by-name lookups
+        for batch, job in group_jobs:
+            by_id = job.result() or {}
+            for c in batch:
+                if str(ids[c]) in by_id:
+                    results[c] = by_id[str(ids[c])]
+                else:
+                    single_jobs[c] = pool.submit(fetch_weather_data, c)
+
+        for c, job in single_jobs.items():
+            results[c] = job.result()
+            if results[c] and 'id' in results[c]['full']:
+                remember_city_id(c, results[c]['full']['id'], store)
+
+    return {c: results.get(c) for c in city_names}
+
+
+def _fetch_forecast(city_name):
+    weather_api_key = os.getenv("WEATHER_API_KEY")
+    forecast_url = f"{WEATHER_BASE_URL}/data/2.5/forecast?{city_query(city_name)}&appid={weather_api_key}&units=metric"
+    fore_response = get_quota().get("weather", forecast_url)
+    if fore_response.status_code == 200:
+        return fore_response.json()['list']
+    return None
+
+
+def fetch_forecast(city_name):
+    """
+    Returns the 5-day / 3-hour forecast list for a city, or None.
+    """
+    return get_quota().fetch("weather", f"forecast:{city_key(city_name)}", lambda: _fetch_forecast(city_name))
+
+
+def _fetch_exchange_rates(base_currency):
+    forex_url = f"{FOREX_BASE_URL}/v6/latest/{base_currency}"
+    forex_response = get_quota().get("forex", forex_url)
+    if forex_response.status_code == 200:
+        return forex_response.json()['rates']
+    return None
+
+
+def fetch_exchange_rates(base_currency):
+    """
+    Returns {currency: rate} for one base currency, or None.
+    Using open.er-api.com (No API Key required)
+    """
+    return get_quota().fetch("forex", f"forex:{base_currency}", lambda: _fetch_exchange_rates(base_currency))
+
+
+def _fetch_news_data():
+    news_api_key = os.getenv("NEWS_API_KEY")
+    if news_api_key:
+        try:
+            news_url = f"{NEWS_BASE_URL}/v2/top-headlines?country=us&apiKey={news_api_key}&pageSize=20"
+            n_response = get_quota().get("news", news_url)
+            if n_response.status_code == 200:
+                articles = n_response.json().get('articles', [])
+                headlines = ", ".join([a['title'] for a in articles[:3]])
+                return {"articles": articles, "headlines": headlines}
+        except Exception:
+            pass
+    return None
+
+
+def fetch_news_data():
+    return get_quota().fetch("news", "news:us", _fetch_news_data)
+
+
+def _market_quote(ticker_symbol):
+    ticker = yf.Ticker(ticker_symbol)
+    history = ticker.history(period="2d", timeout=deadline("markets")[1])
+    if len(history) >= 2:
+        current_price = history['Close'].iloc[-1]
+        prev_price = history['Close'].iloc[-2]
+        change = ((current_price - prev_price) / prev_price) * 100
+        return float(current_price), float(change)
+    elif len(history) == 1: # Market might be open but only 1 data point for "2d" if yfinance is weird, try just current
+         current_price = history['Close'].iloc[-1]
+         return float(current_price), 0.0
+    return None, None
+
+
+def get_market_data(ticker_symbol):
+    try:
+        return guarded("markets", lambda: _market_quote(ticker_symbol))
+    except UpstreamError:
+        return None, None
+
+
+def fetch_market_metrics(get_quote=get_market_data):
+    """
+    Returns [(name, price, change %)] for MARKET_TICKERS.
+    `get_quote` lets callers plug in a cached version of get_market_data.
+    """
+    results = []
+    for name, symbol in MARKET_TICKERS.items():
+        price, change = get_quote(symbol)
+        results.append((name, price, change))
+    return results
+
+
+def get_outfit_recommendation(temp, weather_desc):
+    recommendation = "Dress comfortably."
+    if temp < 10:
+        recommendation = "🧥 Wear a heavy jacket, it's cold!"
+    elif 10 <= temp < 20:
+        recommendation = "🧥 Bring a light jacket or sweater."
+    elif temp >= 20:
+        recommendation = "👕 T-shirt weather! Stay cool."
+    
+    if "rain" in weather_desc.lower() or "drizzle" in weather_desc.lower():
+        recommendation += " ☔ Don't forget an umbrella!"
+    
+    return recommendation
+
+
+def build_briefing_prompt(w_summary, n_digest):
+    return prompts.render("briefing", weather=w_summary, news=n_digest)
+
+
+def build_greeting_prompt(time_text, desc, temp):
+    return prompts.render("greeting", time_text=time_text, desc=desc, temp=temp)
+
+
+def synthesize_audio(text):
+    """
+    Renders text to MP3 bytes with gTTS.
+    """
+    tts = gTTS(text, lang='en')
+    audio_buffer = BytesIO()
+    tts.write_to_fp(audio_buffer)
+    return audio_buffer.getvalue()
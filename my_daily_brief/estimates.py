@@ -0,0 +1,217 @@
+import json
+import re
+import threading
+import zlib
+from datetime import datetime
+
+import numpy as np
+
+import prompts
+
+# --- Task Time Estimates ---
+# "Estimate Time" used to send the whole task list to the LLM on every click.
+# Now each task is estimated on its own, keyed by its normalised text:
+#   - a local ridge regressor, trained on how long the user actually took
+#     (gaps between checkbox completions), answers tasks whose words it has
+#     seen once it has MIN_SAMPLES completions to learn from
+#   - otherwise a stored LLM estimate is reused
+#   - only the remaining tasks go to the LLM, all in one batched JSON prompt
+# The total is summed locally.
+
+MIN_SAMPLES = 8  # completed tasks before the local model answers
+MIN_COVERAGE = 0.6  # share of a task's words the model must have seen
+MAX_TASK_MINUTES = 240  # longer gaps between completions are not work time
+FEATURES = 512
+RIDGE = 1.0
+TRAIN_LIMIT = 2000  # most recent completions used for training
+
+
+def task_key(text):
+    """
+    Normalised task text: case, punctuation and spacing do not matter.
+    """
+    return " ".join(re.findall(r"[a-z0-9]+", text.lower()))
+
+
+def _tokens(key):
+    words = key.split()
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+def format_minutes(minutes):
+    minutes = int(round(minutes / 5) * 5) or 5
+    hours, rest = divmod(minutes, 60)
+    if not hours:
+        return f"{rest} min"
+    return f"{hours} h {rest} min" if rest else f"{hours} h"
+
+
+def work_durations(completed):
+    """
+    (task text, minutes) from completed task rows: the time since the task
+    was added or the previous completion, whichever is later. Tasks ticked
+    together share that time; gaps over MAX_TASK_MINUTES are dropped.
+    """
+    batches = {}
+    for row in completed:
+        batches.setdefault(row["completed_at"], []).append(row)
+    samples, previous = [], None
+    for done_at in sorted(batches):
+        rows = batches[done_at]
+        end = datetime.fromisoformat(done_at)
+        start = max(datetime.fromisoformat(r["created_at"]) for r in rows)
+        if previous and previous > start:
+            start = previous
+        minutes = (end - start).total_seconds() / 60 / len(rows)
+        previous = end
+        if 1 <= minutes <= MAX_TASK_MINUTES:
+            samples.extend((r["text"], minutes) for r in rows)
+    return samples
+
+
+class DurationModel:
+    """
+    Ridge regression on hashed word / bigram features, predicting log minutes.
+    """
+
+    def __init__(self):
+        self.weights = None
+        self.bias = 0.0
+        self.vocab = set()
+        self.samples = 0
+
+    @staticmethod
+    def _vector(tokens):
+        x = np.zeros(FEATURES, dtype=np.float64)
+        for tok in tokens:
+            x[zlib.crc32(tok.encode("utf-8")) % FEATURES] += 1.0
+        return x
+
+    def fit(self, samples):
+        samples = [(task_key(text), minutes) for text, minutes in samples if task_key(text)]
+        self.samples = len(samples)
+        if not samples:
+            self.weights = None
+            return self
+        X = np.stack([self._vector(_tokens(key)) for key, _ in samples])
+        y = np.log1p([minutes for _, minutes in samples])
+        self.bias = float(y.mean())
+        self.weights = np.linalg.solve(X.T @ X + RIDGE * np.eye(FEATURES), X.T @ (y - self.bias))
+        self.vocab = {tok for key, _ in samples for tok in key.split()}
+        return self
+
+    def predict(self, key):
+        """
+        Minutes for a normalised task, or None when the model is not sure.
+        """
+        words = key.split()
+        if self.weights is None or self.samples < MIN_SAMPLES or not words:
+            return None
+        if sum(w in self.vocab for w in words) / len(words) < MIN_COVERAGE:
+            return None
+        minutes = float(np.expm1(self.bias + self._vector(_tokens(key)) @ self.weights))
+        return min(max(minutes, 1.0), MAX_TASK_MINUTES)
+
+
+def parse_estimates(text, count):
+    """
+    {index: minutes} from the batch answer: a JSON object like {"1": 30},
+    or numbered "1. 30" lines if the model ignored the format.
+    """
+    found = {}
+    match = re.search(r"\{.*\}", text, re.S)
+    if match:
+        try:
+            for k, v in json.loads(match.group(0)).items():
+                found[int(k)] = float(v)
+        except (ValueError, TypeError, AttributeError):
+            found = {}
+    if not found:
+        for k, v in re.findall(r"(?m)^\s*(\d+)[.):]\s*(\d+(?:\.\d+)?)", text):
+            found[int(k)] = float(v)
+    return {i: min(max(m, 1.0), 600.0) for i, m in found.items() if 1 <= i <= count and m > 0}
+
+
+class TaskEstimator:
+    """
+    Per-task estimates from the local model, the estimate store or one
+    batched LLM call, in that order.
+    """
+
+    def __init__(self, store, generate=prompts.complete):
+        self.store = store
+        self.generate = generate
+        self.model = DurationModel()
+        self._trained_on = None
+        self._lock = threading.Lock()
+        self.metrics = {"model": 0, "cached": 0, "llm": 0, "llm_calls": 0, "unparsed": 0}
+
+    def _refresh_model(self):
+        # Retrain only when new completions have come in
+        done = self.store.done_count()
+        with self._lock:
+            if done != self._trained_on:
+                self.model = DurationModel().fit(work_durations(self.store.completed_tasks(limit=TRAIN_LIMIT)))
+                self._trained_on = done
+
+    def _known(self, texts):
+        self._refresh_model()
+        keys = {text: task_key(text) for text in texts}
+        stored = self.store.get_estimates(list(set(keys.values())))
+        known = {}
+        for text, key in keys.items():
+            minutes = self.model.predict(key)
+            if minutes is not None:
+                known[text] = (minutes, "model")
+            elif key in stored:
+                known[text] = (stored[key], "cached")
+        return known
+
+    @staticmethod
+    def _unknown(texts, known):
+        # One entry per normalised task: "Email Bob" and "email bob!" are one item
+        unique = {}
+        for text in texts:
+            if text not in known:
+                unique.setdefault(task_key(text), text)
+        return list(unique.values())
+
+    def batch_prompt(self, texts, known=None):
+        """
+        The one LLM prompt still needed for these tasks, or None.
+        """
+        known = self._known(texts) if known is None else known
+        new = self._unknown(texts, known)
+        if not new:
+            return None
+        items = "\n".join(f"{i}. {t}" for i, t in enumerate(new, 1))
+        return prompts.render("task_estimates", count=len(new), items=items)
+
+    def estimate(self, texts, answer=None):
+        """
+        {"total": minutes, "tasks": [(text, minutes, source)], "sources": counts}.
+        `answer` is an already generated reply to batch_prompt(texts).
+        """
+        known = self._known(texts)
+        prompt = self.batch_prompt(texts, known)
+        if prompt is not None:
+            new = self._unknown(texts, known)
+            if answer is None:
+                answer = self.generate(prompt)
+                self.metrics["llm_calls"] += 1
+            parsed = parse_estimates(answer, len(new))
+            self.metrics["unparsed"] += len(new) - len(parsed)
+            fresh = [(new[i - 1], minutes) for i, minutes in parsed.items()]
+            self.store.save_estimates([(task_key(t), t, m) for t, m in fresh])
+            fresh_by_key = {task_key(t): m for t, m in fresh}
+            known.update((t, (fresh_by_key[task_key(t)], "llm")) for t in texts if task_key(t) in fresh_by_key)
+
+        tasks, sources = [], {"model": 0, "cached": 0, "llm": 0}
+        for text in texts:
+            if text in known:
+                minutes, source = known[text]
+                tasks.append((text, minutes, source))
+                sources[source] += 1
+                self.metrics[source] += 1
+        return {"total": sum(m for _, m, _ in tasks), "tasks": tasks, "sources": sources,
+                "missing": len(texts) - len(tasks)}
@@ -0,0 +1,198 @@
+import asyncio
+import os
+import threading
+import weakref
+
+import httpx
+import ollama
+
+# --- Local LLM Access (Ollama) ---
+# Kept free of Streamlit so the headless scheduler and the API share it with
+# the app. Clients are pooled (one per host, keeping HTTP connections alive)
+# and failures surface as typed LLMError subclasses.
+# No API key needed for local Ollama
+
+MODEL_NAME = "llama3.2:3b"
+EMBED_MODEL = os.getenv("EMBED_MODEL", "nomic-embed-text")
+OLLAMA_HOST = os.getenv("OLLAMA_HOST", "http://localhost:11434")
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "120"))
+
+
+class LLMError(Exception):
+    """
+    Base class for generation failures.
+    """
+
+
+class LLMUnavailable(LLMError):
+    """
+    The Ollama server could not be reached.
+    """
+
+
+class LLMTimeout(LLMError):
+    """
+    The request exceeded its deadline.
+    """
+
+
+class LLMResponseError(LLMError):
+    """
+    The server answered with an error (e.g. model not pulled).
+    """
+
+
+def _translate(e, host):
+    if isinstance(e, LLMError):
+        return e
+    if isinstance(e, (ConnectionError, httpx.ConnectError)):
+        return LLMUnavailable(f"Ollama server not reachable at {host}. Run 'ollama serve'. Error: {e}")
+    if isinstance(e, (httpx.TimeoutException, asyncio.TimeoutError, TimeoutError)):
+        return LLMTimeout(f"Ollama request to {host} timed out")
+    if isinstance(e, ollama.ResponseError):
+        return LLMResponseError(f"Ollama error ({e.status_code}): {e.error}")
+    return LLMError(str(e))
+
+
+# --- Client Pools ---
+_sync_clients = {}  # (host, timeout) -> Client
+_sync_lock = threading.Lock()
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def get_client(host=None, timeout=None):
+    """
+    Shared synchronous client for a host and timeout (keeps its connection
+    pool warm). Timeouts come from the per-feature deadlines, so there are
+    only a few clients per host.
+    """
+    key = (host or OLLAMA_HOST, timeout or LLM_TIMEOUT)
+    with _sync_lock:
+        if key not in _sync_clients:
+            _sync_clients[key] = ollama.Client(host=key[0], timeout=key[1])
+        return _sync_clients[key]
+
+
+def get_async_client(host=None):
+    """
+    Shared AsyncClient for a host on the running event loop. httpx async
+    pools are bound to their loop, so there is one per (loop, host).
+    """
+    host = host or OLLAMA_HOST
+    per_loop = _async_clients.setdefault(asyncio.get_running_loop(), {})
+    if host not in per_loop:
+        limits = httpx.Limits(max_connections=32, max_keepalive_connections=32)
+        per_loop[host] = ollama.AsyncClient(host=host, timeout=LLM_TIMEOUT, limits=limits)
+    return per_loop[host]
+
+
+STAT_FIELDS = ("total_duration", "load_duration", "prompt_eval_count", "prompt_eval_duration",
+               "eval_count", "eval_duration")
+
+
+def build_messages(prompt, system=None):
+    """
+    Chat messages with the (shared, cache-friendly) system prompt first.
+    `prompt` is the user message, or a list of chat messages (earlier turns
+    of a conversation, ending with the user's new one).
+    """
+    messages = [{'role': 'system', 'content': system}] if system else []
+    if isinstance(prompt, list):
+        messages.extend(prompt)
+    else:
+        messages.append({'role': 'user', 'content': prompt})
+    return messages
+
+
+def final_stats(chunk):
+    """
+    Timing / token counters Ollama attaches to the last chunk of a stream.
+    """
+    return {k: chunk[k] for k in STAT_FIELDS if k in chunk and chunk[k] is not None}
+
+
+# --- Sync Path ---
+def generate_ollama_content(prompt, host=None, timeout=None, system=None, on_stats=None):
+    """
+    Generator that yields chunks of text from Ollama.
+    `on_stats` receives the final chunk's counters (prompt_eval_duration, ...).
+    """
+    model_name = MODEL_NAME
+    host = host or OLLAMA_HOST
+    client = get_client(host, timeout)
+
+    try:
+        response_stream = client.chat(
+            model=model_name,
+            messages=build_messages(prompt, system),
+            stream=True
+        )
+        for chunk in response_stream:
+            content = chunk['message']['content']
+            if chunk['done'] and on_stats:
+                on_stats(final_stats(chunk))
+            yield content
+
+    except Exception as e:
+        raise _translate(e, host) from e
+
+
+def generate_text(prompt, host=None, timeout=None):
+    """
+    Non-streaming convenience wrapper: returns the full response text.
+    """
+    return "".join(generate_ollama_content(prompt, host=host, timeout=timeout)).strip()
+
+
+# --- Async Path ---
+async def agenerate(prompt, host=None, timeout=None, system=None, on_stats=None):
+    """
+    Async generator of text chunks. `timeout` is a deadline (seconds) for the
+    whole generation, not per chunk. Many of these can run concurrently over
+    one pooled connection set.
+    """
+    host = host or OLLAMA_HOST
+    deadline = asyncio.get_running_loop().time() + (timeout or LLM_TIMEOUT)
+
+    def remaining():
+        left = deadline - asyncio.get_running_loop().time()
+        if left <= 0:
+            raise LLMTimeout(f"Ollama request to {host} exceeded {timeout or LLM_TIMEOUT:.0f}s")
+        return left
+
+    try:
+        stream = await asyncio.wait_for(
+            get_async_client(host).chat(
+                model=MODEL_NAME,
+                messages=build_messages(prompt, system),
+                stream=True
+            ),
+            remaining(),
+        )
+        iterator = stream.__aiter__()
+        while True:
+            try:
+                chunk = await asyncio.wait_for(iterator.__anext__(), remaining())
+            except StopAsyncIteration:
+                break
+            if chunk['done'] and on_stats:
+                on_stats(final_stats(chunk))
+            yield chunk['message']['content']
+    except Exception as e:
+        raise _translate(e, host) from e
+
+
+async def agenerate_text(prompt, host=None, timeout=None):
+    parts = [c async for c in agenerate(prompt, host=host, timeout=timeout)]
+    return "".join(parts).strip()
+
+
+def embed_texts(texts, model=EMBED_MODEL):
+    """
+    Returns one embedding vector (list of floats) per input text.
+    """
+    try:
+        response = get_client().embed(model=model, input=list(texts))
+    except Exception as e:
+        raise _translate(e, OLLAMA_HOST) from e
+    return response['embeddings']
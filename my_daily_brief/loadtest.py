@@ -0,0 +1,279 @@
+"""
+Concurrent-user load test for the Streamlit dashboard, against the local
+stubs (stubs.py). Starts `streamlit run app.py` pointed at stub upstreams and
+a stub Ollama, then drives N simulated browser sessions over Streamlit's
+websocket protocol through a realistic script: open the page, Get Weather,
+Load News, Load Markets, AI Breakdown, Reflect & Analyze.
+
+Users ramp up in stages. For each stage the report shows latency
+percentiles per interaction (click until the script run, including any
+st.rerun, has finished), the error rate, the server's CPU and memory, and
+how deep the stub Ollama queue got.
+
+Usage:
+    python loadtest.py [--stages 1,5,10,20] [--duration 30] [--ramp 5]
+                       [--ollama-parallel 1] [--token-delay 0.01]
+"""
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+import httpx
+import websockets
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+from bench import _free_port, start_stubs
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+RUN_TIMEOUT = 120  # seconds one interaction may take before it counts as an error
+SAMPLE_INTERVAL = 0.5
+WIDGETS = ("button", "text_input", "text_area")
+
+TASKS = ["Plan the quarterly review", "Clean up the garage", "Prepare for the dentist", "Write the trip itinerary"]
+JOURNAL = [
+    "Long day, but the presentation went well and I finally slept properly.",
+    "Feeling scattered, too many meetings and no time for deep work.",
+    "Went for a run in the morning and the whole day felt lighter.",
+]
+
+
+class InteractionError(Exception):
+    pass
+
+
+# --- Simulated browser session ---
+class Session:
+    """
+    One browser tab: a websocket to /_stcore/stream that sends rerun
+    requests with widget states, like the frontend does on every click.
+    """
+
+    def __init__(self, ws):
+        self.ws = ws
+        self.widgets = {}  # (kind, label) -> widget id, from the last run
+        self.values = {}  # widget id -> WidgetState kept across runs (text inputs)
+
+    async def rerun(self, triggers=()):
+        msg = BackMsg()
+        msg.rerun_script.SetInParent()
+        for state in self.values.values():
+            msg.rerun_script.widget_states.widgets.append(state)
+        for widget_id in triggers:
+            msg.rerun_script.widget_states.widgets.append(WidgetState(id=widget_id, trigger_value=True))
+        await self.ws.send(msg.SerializeToString())
+        await asyncio.wait_for(self._until_finished(), RUN_TIMEOUT)
+
+    async def _until_finished(self):
+        self.widgets, exceptions = {}, []
+        while True:
+            fwd = ForwardMsg()
+            fwd.ParseFromString(await self.ws.recv())
+            kind = fwd.WhichOneof("type")
+            if kind == "delta" and fwd.delta.WhichOneof("type") == "new_element":
+                element = fwd.delta.new_element
+                element_type = element.WhichOneof("type")
+                if element_type in WIDGETS:
+                    widget = getattr(element, element_type)
+                    self.widgets[(element_type, widget.label)] = widget.id
+                elif element_type == "exception":
+                    exceptions.append(element.exception.message)
+            elif kind == "script_finished" and fwd.script_finished != ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                if exceptions:
+                    raise InteractionError(exceptions[0])
+                return
+
+    def widget(self, kind, label):
+        try:
+            return self.widgets[(kind, label)]
+        except KeyError:
+            raise InteractionError(f"no {kind} '{label}' on the page") from None
+
+    async def click(self, label):
+        await self.rerun([self.widget("button", label)])
+
+    async def fill(self, kind, label, text):
+        widget_id = self.widget(kind, label)
+        self.values[widget_id] = WidgetState(id=widget_id, string_value=text)
+
+
+async def _ai_breakdown(session):
+    await session.fill("text_input", "New Task", random.choice(TASKS))
+    await session.click("✨ AI Breakdown")
+
+
+async def _reflect(session):
+    await session.fill("text_area", "What's on your mind?", random.choice(JOURNAL))
+    await session.click("Reflect & Analyze")
+
+
+# (name, action) in the order a user works down the page
+SCRIPT = [
+    ("Get Weather", lambda s: s.click("Get Weather")),
+    ("Load News", lambda s: s.click("📰 Load News")),
+    ("Load Markets", lambda s: s.click("📈 Load Markets")),
+    ("AI Breakdown", _ai_breakdown),
+    ("Reflect & Analyze", _reflect),
+]
+
+
+class Results:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.samples = []  # (cpu %, rss MB) of the server process
+
+    async def timed(self, name, action):
+        """
+        Runs one interaction; script exceptions, timeouts, missing widgets and
+        dropped connections count as errors. Returns False on error.
+        """
+        t0 = time.perf_counter()
+        try:
+            await action()
+            ok = True
+        except (InteractionError, asyncio.TimeoutError, OSError, websockets.WebSocketException):
+            ok = False
+        self.latencies[name].append(time.perf_counter() - t0)
+        self.errors[name] += not ok
+        return ok
+
+
+async def run_user(url, results, deadline, think_time):
+    while time.monotonic() < deadline:
+        try:
+            async with websockets.connect(url, subprotocols=["streamlit"], max_size=None,
+                                          origin=url.replace("ws://", "http://").split("/_stcore")[0]) as ws:
+                session = Session(ws)
+                if not await results.timed("Page load", session.rerun):
+                    continue
+                for name, action in SCRIPT:
+                    if time.monotonic() >= deadline:
+                        return
+                    await asyncio.sleep(random.uniform(0, think_time))
+                    if not await results.timed(name, lambda: action(session)):
+                        break
+        except (OSError, websockets.WebSocketException):
+            results.errors["Page load"] += 1
+            await asyncio.sleep(1)
+
+
+# --- Server process ---
+def start_server():
+    port = _free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", os.path.join(APP_DIR, "app.py"), "--server.headless", "true",
+         "--server.port", str(port), "--browser.gatherUsageStats", "false"],
+        cwd=APP_DIR, env=dict(os.environ), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    for _ in range(150):
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/_stcore/health").status_code == 200:
+                return server, f"ws://127.0.0.1:{port}/_stcore/stream"
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError("Streamlit server did not come up")
+
+
+def process_usage(pid):
+    """
+    (CPU seconds, RSS MB) of a process: /proc on Linux, `ps` elsewhere.
+    """
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        with open(f"/proc/{pid}/statm") as f:
+            rss_pages = int(f.read().split()[1])
+        cpu = (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+        return cpu, rss_pages * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        out = subprocess.run(["ps", "-o", "rss=,cputime=", "-p", str(pid)], capture_output=True, text=True).stdout
+        rss_kb, cputime = out.split()
+        seconds = 0.0
+        for part in cputime.replace("-", ":").split(":"):
+            seconds = seconds * 60 + float(part)
+        return seconds, int(rss_kb) / 1024
+
+
+async def sample(pid, results, stop):
+    last_cpu, last_wall = process_usage(pid)[0], time.perf_counter()
+    while not stop.is_set():
+        await asyncio.sleep(SAMPLE_INTERVAL)
+        cpu, rss = await asyncio.to_thread(process_usage, pid)
+        wall = time.perf_counter()
+        results.samples.append((100 * (cpu - last_cpu) / (wall - last_wall), rss))
+        last_cpu, last_wall = cpu, wall
+
+
+# --- Reporting ---
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else float("nan")
+
+
+def print_stage(users, results, elapsed, ollama):
+    total = sum(len(v) for v in results.latencies.values())
+    errors = sum(results.errors.values())
+    cpu = [c for c, _ in results.samples] or [0.0]
+    rss = [r for _, r in results.samples] or [0.0]
+    print(f"\n== {users} users, {elapsed:.0f}s: {total} interactions ({total / elapsed:.1f}/s), "
+          f"errors {errors} ({100 * errors / max(total, 1):.1f}%)")
+    print(f"   server CPU avg {sum(cpu) / len(cpu):.0f}% peak {max(cpu):.0f}%   "
+          f"RSS peak {max(rss):.0f} MB   Ollama queue peak {ollama.max_queued}")
+    print(f"   {'interaction':<20} {'n':>5} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for name in ["Page load"] + [n for n, _ in SCRIPT]:
+        lat = results.latencies.get(name, [])
+        p = lambda q: percentile(lat, q) * 1000
+        print(f"   {name:<20} {len(lat):>5} {p(0.50):>9.0f} {p(0.95):>9.0f} {p(0.99):>9.0f} "
+              f"{results.errors.get(name, 0):>7}")
+
+
+async def run_stage(users, args, url, server, ollama):
+    results, stop = Results(), asyncio.Event()
+    ollama.max_queued = 0
+    sampler = asyncio.create_task(sample(server.pid, results, stop))
+    started = time.monotonic()
+    deadline = started + args.duration
+    tasks = []
+    for _ in range(users):
+        tasks.append(asyncio.create_task(run_user(url, results, deadline, args.think_time)))
+        await asyncio.sleep(args.ramp / users)  # spread session starts over the ramp
+    await asyncio.gather(*tasks)
+    stop.set()
+    await sampler
+    print_stage(users, results, time.monotonic() - started, ollama)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stages", default="1,5,10,20", help="Comma-separated concurrent user counts")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds per stage (including ramp)")
+    parser.add_argument("--ramp", type=float, default=5, help="Seconds over which a stage's users start")
+    parser.add_argument("--think-time", type=float, default=1.0, help="Max random pause between interactions")
+    parser.add_argument("--ollama-parallel", type=int, default=1, help="Concurrent generations (OLLAMA_NUM_PARALLEL)")
+    parser.add_argument("--token-delay", type=float, default=0.01, help="Stub Ollama seconds per token")
+    args = parser.parse_args()
+
+    upstream, ollama = start_stubs(parallel=args.ollama_parallel, token_delay=args.token_delay)
+    server, url = start_server()
+    print(f"server pid {server.pid}, stub Ollama parallel {args.ollama_parallel}, "
+          f"data dir {os.environ['BRIEF_DATA_DIR']}")
+    try:
+        for users in [int(n) for n in args.stages.split(",")]:
+            asyncio.run(run_stage(users, args, url, server, ollama))
+    finally:
+        server.terminate()
+        server.wait()
+    print(f"\nupstream requests {upstream.requests}, Ollama requests {ollama.requests}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,64 @@
+import time
+
+import plotly.graph_objects as go
+import streamlit as st
+
+import cards
+import charts
+import telemetry
+
+# --- LLM Telemetry Dashboard ---
+# Reads the per-call counters recorded by telemetry.py: latency percentiles,
+# tokens/sec and model-load stalls per feature and model, for sizing hardware
+# from real usage.
+
+st.set_page_config(page_title="LLM Telemetry", layout="wide", page_icon="▣")
+
+st.markdown(cards.STYLE_TAG, unsafe_allow_html=True)
+
+WINDOWS = {"Last hour": 3600, "Last 24 hours": 86400, "Last 7 days": 7 * 86400, "Last 30 days": 30 * 86400}
+
+
+@st.cache_resource
+def get_telemetry():
+    return telemetry.get_telemetry()
+
+
+st.title("LLM Telemetry")
+window = st.radio("Window", list(WINDOWS), index=1, horizontal=True, label_visibility="collapsed")
+calls = get_telemetry().calls(since=time.time() - WINDOWS[window])
+
+if calls.empty:
+    st.info("No LLM calls recorded in this window yet.")
+    st.stop()
+
+ok = calls[calls['ok'] == 1]
+eval_s = ok['eval_ms'].sum() / 1000
+stalls = int((calls['load_ms'].fillna(0) > telemetry.LOAD_STALL_MS).sum())
+
+c1, c2, c3, c4, c5 = st.columns(5)
+c1.metric("Calls", len(calls), f"{int((calls['ok'] == 0).sum())} errors", delta_color="off")
+c2.metric("p50 latency", f"{ok['wall_ms'].quantile(0.5):.0f} ms")
+c3.metric("p95 latency", f"{ok['wall_ms'].quantile(0.95):.0f} ms")
+c4.metric("Generation", f"{ok['eval_tokens'].sum() / eval_s:.1f} tok/s" if eval_s else "n/a")
+c5.metric("Load stalls", stalls, f"> {telemetry.LOAD_STALL_MS:.0f} ms", delta_color="off")
+
+st.subheader("Per feature")
+st.dataframe(telemetry.summarize(calls, by=("feature",)), hide_index=True, use_container_width=True)
+
+st.subheader("Per model")
+st.dataframe(telemetry.summarize(calls, by=("model", "backend")), hide_index=True, use_container_width=True)
+
+st.subheader("Latency over time")
+fig = go.Figure()
+for feature, rows in ok.groupby('feature'):
+    fig.add_trace(go.Scatter(x=rows.index, y=rows['wall_ms'], mode='markers', name=feature, marker=dict(size=6)))
+fig.update_layout(
+    template=charts.THEME,
+    yaxis=dict(showgrid=True, title="ms"),
+    showlegend=True,
+    legend=dict(orientation='h', y=1.15),
+    margin=dict(t=30),
+    height=300
+)
+st.plotly_chart(fig, use_container_width=True)
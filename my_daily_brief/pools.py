@@ -0,0 +1,296 @@
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+
+import prompts
+from backends import get_router
+from cache import DATA_DIR
+from cachebackends import get_cache_backend
+
+# --- AI Micro-Content Pools ---
+# Greetings, fun facts and wisdom quotes are decoration: generating one per
+# session cost a full LLM round trip on page load. Instead they come from
+# pools that a background thread keeps topped up:
+#   - one prompt returns a batch of BATCH_SIZE items (numbered lines)
+#   - near-duplicates (word-shingle Jaccard >= DUPLICATE_SIMILARITY against
+#     the pool) are dropped
+#   - pools live in SQLite, so restarts and other processes share them; a
+#     lock in the shared cache backend keeps processes from refilling the
+#     same pool twice
+#   - a refill only starts while no other generation is in flight
+#   - draw() is a random pick from an in-memory list: O(1), no I/O, no LLM
+# Pools are topped up to their target size, then get one fresh batch (oldest
+# items retired) whenever their newest item is older than REFRESH_AFTER.
+
+POOL_PATH = os.getenv("BRIEF_POOL_PATH", os.path.join(DATA_DIR, "content_pool.db"))
+BATCH_SIZE = int(os.getenv("POOL_BATCH_SIZE", "10"))
+REFILL_INTERVAL = float(os.getenv("POOL_REFILL_INTERVAL", "60"))  # seconds between replenisher passes
+REFRESH_AFTER = 86400  # seconds before a full pool still gets one new batch
+DUPLICATE_SIMILARITY = 0.6
+IDLE_WAIT = 30.0  # max seconds a refill waits for in-flight generations to finish
+LOCK_TTL = 120.0
+
+# kind -> (items kept per pool, what the batch prompt asks for)
+KINDS = {
+    "fun_fact": (60, "surprising, true fun facts, one sentence each"),
+    "wisdom": (40, "short motivational quotes or pieces of everyday wisdom, max 15 words each, no attribution"),
+    "greeting": (12, "short, stimulating greetings for the user, max 8 words each, for a {daypart} with {condition} weather"),
+}
+
+# OpenWeatherMap 'main' condition -> greeting pool condition
+CONDITIONS = {
+    "Clear": "clear", "Clouds": "cloudy", "Rain": "rainy", "Drizzle": "rainy", "Thunderstorm": "stormy",
+    "Snow": "snowy", "Mist": "foggy", "Fog": "foggy", "Haze": "foggy", "Smoke": "foggy", "Dust": "foggy",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS content_pool (
+    id         INTEGER PRIMARY KEY AUTOINCREMENT,
+    pool       TEXT NOT NULL,
+    text       TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_content_pool ON content_pool (pool, created_at);
+"""
+
+
+def daypart(hour):
+    if 5 <= hour < 12:
+        return "morning"
+    if 12 <= hour < 18:
+        return "afternoon"
+    if 18 <= hour < 22:
+        return "evening"
+    return "night"
+
+
+def greeting_pool(hour, weather_main):
+    """
+    Pool name for greetings matching a time of day and an OpenWeatherMap
+    condition, e.g. "greeting:morning:rainy".
+    """
+    return f"greeting:{daypart(hour)}:{CONDITIONS.get(weather_main, 'mild')}"
+
+
+def shingles(text):
+    words = re.findall(r"[a-z0-9']+", text.lower())
+    return {" ".join(words[i:i + 2]) for i in range(max(1, len(words) - 1))}
+
+
+def similarity(a, b):
+    return len(a & b) / len(a | b) if a and b else 0.0
+
+
+def parse_batch(text):
+    """
+    Items from a numbered-lines answer, cleaned of quotes and bullets.
+    """
+    items = []
+    for line in text.splitlines():
+        match = re.match(r"\s*\d+[.)]\s*(.+)", line)
+        if match:
+            item = match.group(1).strip().strip('"“”').strip()
+            if 3 <= len(item) <= 300:
+                items.append(item)
+    return items
+
+
+class ContentPools:
+    """
+    Persistent pools of short AI-written texts with a background replenisher.
+    """
+
+    def __init__(self, path=POOL_PATH, generate=prompts.complete, lock_backend=None, start=True):
+        self.path = path
+        self.generate = generate
+        self.locks = lock_backend or get_cache_backend("shared")
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._local = threading.local()
+        self._conn().executescript(SCHEMA)
+        self._lock = threading.Lock()
+        self._items = {}  # pool -> [text]
+        self._shingles = {}  # pool -> [shingle set], aligned with _items
+        self._newest = {}  # pool -> created_at of the newest item
+        self._wanted = set(p for p in KINDS if p != "greeting")
+        self._wake = threading.Event()
+        self.metrics = {"draws": 0, "empty_draws": 0, "batches": 0, "added": 0, "duplicates": 0,
+                        "failed": 0, "dropped_busy": 0}
+        self.reload()
+        if start:
+            threading.Thread(target=self._replenish_loop, name="content-pools", daemon=True).start()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def reload(self):
+        """
+        Re-reads every pool from disk (picks up other processes' refills).
+        """
+        items, newest = {}, {}
+        for pool, text, created_at in self._conn().execute(
+                "SELECT pool, text, created_at FROM content_pool ORDER BY created_at"):
+            items.setdefault(pool, []).append(text)
+            newest[pool] = created_at
+        with self._lock:
+            self._items = items
+            self._shingles = {pool: [shingles(t) for t in texts] for pool, texts in items.items()}
+            self._newest = newest
+            self._wanted.update(items)
+
+    # --- Drawing ---
+    def want(self, pool):
+        """
+        Keeps the pool replenished from now on.
+        """
+        if pool not in self._wanted:
+            self._wanted.add(pool)
+            self._wake.set()
+
+    def draw(self, pool):
+        """
+        A random item from the pool, or None if it is still empty (the pool
+        is then queued for a refill).
+        """
+        with self._lock:
+            self.metrics["draws"] += 1
+            items = self._items.get(pool)
+            self.want(pool)
+            if not items:
+                self.metrics["empty_draws"] += 1
+                self._wake.set()
+                return None
+            return random.choice(items)
+
+    def sizes(self):
+        with self._lock:
+            return {pool: len(self._items.get(pool, ())) for pool in sorted(self._wanted)}
+
+    # --- Replenishing ---
+    @staticmethod
+    def target(pool):
+        return KINDS[pool.split(":")[0]][0]
+
+    def needs_batch(self, pool, now=None):
+        now = now or time.time()
+        with self._lock:
+            size = len(self._items.get(pool, ()))
+            newest = self._newest.get(pool, 0)
+        return size < self.target(pool) or now - newest > REFRESH_AFTER
+
+    def _batch_prompt(self, pool):
+        kind, *bucket = pool.split(":")
+        what = KINDS[kind][1]
+        if kind == "greeting":
+            what = what.format(daypart=bucket[0], condition=bucket[1])
+        with self._lock:
+            recent = self._items.get(pool, [])[-5:]
+        avoid = "\n".join(f"- {t}" for t in recent) or "- (nothing yet)"
+        return prompts.render("content_batch", count=BATCH_SIZE, what=what, avoid=avoid)
+
+    def add(self, pool, candidates):
+        """
+        Stores the candidates that are not near-duplicates of the pool (or of
+        each other), then retires the oldest items beyond the pool's target.
+        Returns the number added.
+        """
+        now = time.time()
+        fresh = []
+        with self._lock:
+            known = list(self._shingles.get(pool, []))
+        for text in candidates:
+            sh = shingles(text)
+            if any(similarity(sh, other) >= DUPLICATE_SIMILARITY for other in known):
+                self.metrics["duplicates"] += 1
+                continue
+            known.append(sh)
+            fresh.append(text)
+        if not fresh:
+            return 0
+        with self._conn() as conn:
+            conn.executemany("INSERT INTO content_pool (pool, text, created_at) VALUES (?, ?, ?)",
+                             [(pool, text, now) for text in fresh])
+            conn.execute(
+                "DELETE FROM content_pool WHERE pool = ? AND id NOT IN "
+                "(SELECT id FROM content_pool WHERE pool = ? ORDER BY created_at DESC, id DESC LIMIT ?)",
+                (pool, pool, self.target(pool)))
+        with self._lock:
+            texts = (self._items.get(pool, []) + fresh)[-self.target(pool):]
+            self._items[pool] = texts
+            self._shingles[pool] = [shingles(t) for t in texts]
+            self._newest[pool] = now
+            self.metrics["added"] += len(fresh)
+        return len(fresh)
+
+    def _wait_idle(self):
+        # Yield to interactive work: wait until no generation is in flight
+        router, waited = get_router(), 0.0
+        while router.inflight > 0:
+            if waited >= IDLE_WAIT:
+                return False
+            time.sleep(0.2)
+            waited += 0.2
+        return True
+
+    def refill(self, pool):
+        """
+        Generates one batch for the pool unless another process is on it.
+        Returns the number of items added.
+        """
+        lock = f"lock:pool:{pool}"
+        token = self.locks.acquire(lock, LOCK_TTL)
+        if token is None:
+            return 0
+        try:
+            if not self._wait_idle():
+                self.metrics["dropped_busy"] += 1
+                return 0
+            try:
+                text = self.generate(self._batch_prompt(pool))
+            except Exception:
+                self.metrics["failed"] += 1
+                return 0
+            self.metrics["batches"] += 1
+            return self.add(pool, parse_batch(text))
+        finally:
+            self.locks.release(lock, token)
+
+    def replenish_once(self):
+        """
+        One pass over the wanted pools, emptiest first.
+        """
+        self.reload()
+        with self._lock:
+            wanted = sorted(self._wanted, key=lambda p: len(self._items.get(p, ())))
+        return sum(self.refill(pool) for pool in wanted if self.needs_batch(pool))
+
+    def _replenish_loop(self):
+        while True:
+            self._wake.wait(REFILL_INTERVAL)
+            self._wake.clear()
+            try:
+                self.replenish_once()
+            except Exception:
+                pass  # try again next pass
+
+
+_pools = None
+_pools_lock = threading.Lock()
+
+
+def get_content_pools():
+    """
+    Process-wide content pools (starts the replenisher on first use).
+    """
+    global _pools
+    with _pools_lock:
+        if _pools is None:
+            _pools = ContentPools()
+        return _pools
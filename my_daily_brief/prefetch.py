@@ -0,0 +1,129 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+import prompts
+from backends import get_router
+
+# --- Speculative Prefetch of AI Panels ---
+# Once a panel's inputs are known (weather, markets, tasks) its prompt is
+# generated in the background at low priority, so the click can show the
+# answer instantly. Speculation is budgeted so it never competes with
+# interactive requests:
+#   - at most PREFETCH_CONCURRENCY speculative generations at a time
+#   - at most PREFETCH_BUDGET_PER_HOUR speculative generations per hour
+#   - a job only starts while no other generation is in flight, and is
+#     dropped if the backends stay busy for PREFETCH_MAX_WAIT seconds
+
+PREFETCH_CONCURRENCY = int(os.getenv("PREFETCH_CONCURRENCY", "1"))
+PREFETCH_BUDGET_PER_HOUR = int(os.getenv("PREFETCH_BUDGET_PER_HOUR", "60"))
+PREFETCH_MAX_WAIT = float(os.getenv("PREFETCH_MAX_WAIT", "30"))
+RESULT_TTL = 600
+MAX_RESULTS = 64
+
+
+def prompt_key(prompt):
+    return hashlib.sha1(str(prompt).encode("utf-8")).hexdigest()
+
+
+class Speculator:
+    """
+    Process-wide speculative generator with hit-rate accounting.
+    """
+
+    def __init__(self, generate=prompts.complete, concurrency=PREFETCH_CONCURRENCY,
+                 budget_per_hour=PREFETCH_BUDGET_PER_HOUR, max_wait=PREFETCH_MAX_WAIT):
+        self.generate = generate
+        self.budget_per_hour = budget_per_hour
+        self.max_wait = max_wait
+        self._pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="prefetch")
+        self._lock = threading.Lock()
+        self._jobs = OrderedDict()  # key -> (submitted_at, future)
+        self._started = deque()  # start times inside the budget window
+        self.metrics = {"submitted": 0, "over_budget": 0, "dropped_busy": 0, "failed": 0,
+                        "hits": 0, "partial_hits": 0, "misses": 0}
+
+    # --- Budget ---
+    def _within_budget(self, now):
+        while self._started and now - self._started[0] > 3600:
+            self._started.popleft()
+        return len(self._started) < self.budget_per_hour
+
+    def _run(self, prompt):
+        # Yield to interactive work: wait until no generation is in flight
+        waited = 0.0
+        router = get_router()
+        while router.inflight > 0:
+            if waited >= self.max_wait:
+                with self._lock:
+                    self.metrics["dropped_busy"] += 1
+                return None
+            time.sleep(0.2)
+            waited += 0.2
+        try:
+            return self.generate(prompt)
+        except Exception:
+            with self._lock:
+                self.metrics["failed"] += 1
+            return None
+
+    # --- Public API ---
+    def speculate(self, prompt):
+        """
+        Starts a background generation for `prompt` unless one is already
+        cached / running or the budget is spent. Returns True if submitted.
+        """
+        key = prompt_key(prompt)
+        now = time.time()
+        with self._lock:
+            job = self._jobs.get(key)
+            if job and now - job[0] < RESULT_TTL:
+                return False
+            if not self._within_budget(now):
+                self.metrics["over_budget"] += 1
+                return False
+            self._started.append(now)
+            self.metrics["submitted"] += 1
+            self._jobs[key] = (now, self._pool.submit(self._run, prompt))
+            while len(self._jobs) > MAX_RESULTS:
+                self._jobs.popitem(last=False)
+        return True
+
+    def take(self, prompt, wait=0.0):
+        """
+        Returns the speculated text for `prompt` if it is ready (optionally
+        waiting up to `wait` seconds for a running job), else None.
+        """
+        key = prompt_key(prompt)
+        with self._lock:
+            job = self._jobs.get(key)
+        if job is None or time.time() - job[0] >= RESULT_TTL:
+            with self._lock:
+                self.metrics["misses"] += 1
+            return None
+
+        future = job[1]
+        instant = future.done()
+        if not instant and wait > 0:
+            try:
+                future.result(timeout=wait)
+            except Exception:
+                pass
+        result = future.result() if future.done() else None
+
+        with self._lock:
+            if result is None:
+                self.metrics["misses"] += 1
+            elif instant:
+                self.metrics["hits"] += 1
+            else:
+                self.metrics["partial_hits"] += 1
+        return result
+
+    def hit_rate(self):
+        m = self.metrics
+        lookups = m["hits"] + m["partial_hits"] + m["misses"]
+        return (m["hits"] + m["partial_hits"]) / lookups if lookups else None
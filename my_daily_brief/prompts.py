@@ -0,0 +1,199 @@
+import threading
+from collections import namedtuple
+
+import telemetry
+from backends import agenerate_content, generate_content
+
+# --- Prompt Templates ---
+# Every prompt is laid out as: one shared system message, then the template's
+# fixed instructions, then the variable data LAST. Requests that share a
+# prefix let Ollama reuse the already-evaluated KV cache for it, so only the
+# data tail has to be evaluated. Per-template prompt-eval stats (from
+# Ollama's final chunk) measure how much that saves.
+
+SHARED_SYSTEM = (
+    "You are My Daily Brief, a concise, upbeat personal assistant inside a daily dashboard. "
+    "Follow the task instructions exactly. Never add an intro or closing remarks unless asked."
+)
+
+Template = namedtuple("Template", ["name", "instruction", "data"])
+
+
+class Prompt(namedtuple("Prompt", ["template", "system", "user"])):
+    """
+    A rendered prompt: fixed system + instruction prefix, data tail.
+    `user` may also be a list of chat messages (a conversation).
+    """
+
+    def __str__(self):
+        user = self.user if isinstance(self.user, str) else "\n\n".join(m["content"] for m in self.user)
+        return f"{self.system}\n\n{user}"
+
+
+TEMPLATES = {}
+
+
+def register(name, instruction, data=""):
+    TEMPLATES[name] = Template(name, instruction.strip(), data.strip())
+
+
+register("greeting",
+         "Generate a short, stimulating greeting (max 8 words) for the user, matching the time and weather below. No quotes.",
+         "Time: {time_text}\nWeather: {desc}, {temp}C")
+register("briefing",
+         "Generate a witty, 3-sentence executive summary of the day based on the weather and news below. "
+         "Keep it professional yet engaging, like a personal assistant.",
+         "Weather: {weather}\nNews:\n{news}")
+register("news_summary",
+         "Summarise each news item below in ONE short sentence. "
+         "Answer with exactly one numbered line per item, in the same order, like \"1. summary\". No intro.",
+         "Items: {count}\n{items}")
+register("content_batch",
+         "Write new items of the kind below, different from each other and from the ones to avoid. "
+         "Answer with exactly one numbered line per item, like \"1. item\". No intro, no quotes.",
+         "Items: {count}\nKind: {what}\nAvoid:\n{avoid}")
+register("assist_digest",
+         "Update the running summary of a conversation between the user and their assistant with the new turns below. "
+         "Keep names, facts, decisions, preferences and open questions; drop small talk. "
+         "Max 100 words, plain text, no intro.",
+         "Summary so far: {digest}\nNew turns:\n{turns}")
+register("weather_insight",
+         "Analyze the weather below. Provide 3 short bullet points: 1) Outfit 2) Best Activity 3) Health Note. No intro.",
+         "Weather: '{desc}', Temp {temp}C, Humidity {humidity}%, Wind {wind}m/s")
+register("market_vibe",
+         "Given the 24h market changes below, give a witty, 1-sentence 'Market Vibe' summary. No quotes.",
+         "Changes: {changes}")
+register("task_breakdown",
+         "Break down the task below into 3-4 actionable, single-line sub-tasks, in the given tone. Output ONLY the lines.",
+         "Tone: {tone}\nTask: {task}")
+register("task_estimates",
+         "Estimate how many minutes each task below takes one person. "
+         "Answer ONLY with a JSON object mapping each task number to minutes, like {\"1\": 30, \"2\": 90}.",
+         "Tasks: {count}\n{items}")
+register("quick_draft",
+         "Draft a professional email/message about the topic below.",
+         "Topic: {text}")
+register("quick_ideas",
+         "Brainstorm creative ideas for the topic below.",
+         "Topic: {text}")
+register("quick_explain",
+         "Explain the concept below simply.",
+         "Concept: {text}")
+register("playlist_pick",
+         "Select the best playlist for the user's context from the options below. Return ONLY the exact playlist name.",
+         "Options: {options}\nWeather={weather}, Time={hour}:00, PendingTasks={tasks}")
+register("journal_reflection",
+         "You are a mindful therapeutic AI.\n"
+         "1. First, estimate a Mood Score (1-10) based on the journal entry below. Format it EXACTLY like this: \"Mood Score: 7/10\".\n"
+         "2. Then, provide a warm, empathetic, and insightful reflection on their entry. Offer 1-2 actionable tips for their day.\n"
+         "Start directly with the Mood Score.",
+         "{past}User's Journal Entry: \"{entry}\"")
+
+
+def render(name, **data):
+    """
+    Renders a registered template into a Prompt (instructions first, data last).
+    """
+    template = TEMPLATES[name]
+    user = template.instruction
+    if template.data:
+        user += "\n\n" + template.data.format(**data)
+    return Prompt(name, SHARED_SYSTEM, user)
+
+
+# --- Prompt-eval accounting ---
+class TemplateStats:
+    """
+    Per-template prompt-eval counters. Ollama's prompt_eval_count only counts
+    tokens it actually evaluated, so tokens served from the cached prefix show
+    up as the gap between the prompt's full size and the evaluated count.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rows = {}
+
+    def record(self, template, prompt, stats):
+        if not stats.get("ok", True):
+            return
+        count = stats.get("prompt_eval_count")
+        duration = stats.get("prompt_eval_duration")
+        if not count or duration is None:
+            return
+        chars = len(str(prompt))
+        with self._lock:
+            row = self._rows.setdefault(template, {
+                "calls": 0, "eval_tokens": 0, "eval_ns": 0, "chars": 0, "max_tokens_per_char": 0.0,
+            })
+            row["calls"] += 1
+            row["eval_tokens"] += count
+            row["eval_ns"] += duration
+            row["chars"] += chars
+            # The least-cached call seen gives the best estimate of full prompt size
+            row["max_tokens_per_char"] = max(row["max_tokens_per_char"], count / max(chars, 1))
+
+    def report(self):
+        """
+        Rows of {template, calls, avg eval ms, est. tokens / ms saved}.
+        """
+        rows = []
+        with self._lock:
+            for name, r in sorted(self._rows.items()):
+                full_tokens = r["chars"] * r["max_tokens_per_char"]
+                saved_tokens = max(0.0, full_tokens - r["eval_tokens"])
+                ns_per_token = r["eval_ns"] / max(r["eval_tokens"], 1)
+                rows.append({
+                    "template": name,
+                    "calls": r["calls"],
+                    "avg_prompt_eval_ms": round(r["eval_ns"] / r["calls"] / 1e6, 1),
+                    "tokens_saved": int(saved_tokens),
+                    "est_ms_saved": round(saved_tokens * ns_per_token / 1e6, 1),
+                })
+        return rows
+
+
+STATS = TemplateStats()
+
+
+# --- Generation helpers ---
+def _split(prompt):
+    if isinstance(prompt, Prompt):
+        return prompt.template, prompt.system, prompt.user
+    return None, None, prompt
+
+
+def _stats_recorder(template, prompt, then=None):
+    def on_stats(stats):
+        if template:
+            STATS.record(template, prompt, stats)
+        telemetry.get_telemetry().record(template or "raw", stats)
+        if then:
+            then(stats)
+    return on_stats
+
+
+def stream(prompt, timeout=None, on_stats=None):
+    """
+    Streams a Prompt (or plain string) through the backends, recording
+    prompt-eval stats and telemetry under its template name. `on_stats`
+    also receives each attempt's counters.
+    """
+    template, system, user = _split(prompt)
+    on_stats = _stats_recorder(template, prompt, on_stats)
+    yield from generate_content(user, timeout=timeout, system=system, on_stats=on_stats)
+
+
+def complete(prompt, timeout=None):
+    return "".join(stream(prompt, timeout=timeout)).strip()
+
+
+async def astream(prompt, timeout=None):
+    template, system, user = _split(prompt)
+    on_stats = _stats_recorder(template, prompt)
+    async for chunk in agenerate_content(user, timeout=timeout, system=system, on_stats=on_stats):
+        yield chunk
+
+
+async def acomplete(prompt, timeout=None):
+    parts = [c async for c in astream(prompt, timeout=timeout)]
+    return "".join(parts).strip()
@@ -0,0 +1,292 @@
+import os
+import sqlite3
+import threading
+import time
+from datetime import date
+
+from cache import DATA_DIR
+from cachebackends import LOCK_TTL, LOCK_WAIT, POLL_INTERVAL, get_cache_backend
+from resilience import UpstreamError, guarded_get
+
+# --- Upstream Quota Manager ---
+# Free tiers of NewsAPI / OpenWeatherMap have hard request quotas, so every
+# upstream call goes through one token bucket per provider. Buckets live in
+# SQLite, so all Streamlit sessions, the scheduler and the API draw from the
+# same budget. On top of the buckets:
+#   - identical concurrent requests are coalesced into one upstream call, in
+#     this process (threads) and across replicas (a lock in the cache backend)
+#   - fresh responses are reused for the provider's freshness window, unless
+#     invalidate() was called since (the dashboard's Refresh button)
+#   - when the budget runs low, a 429 comes back or the source is down (see
+#     resilience.py) the last good response is served stale
+# Spend, throttling and stale serves are counted per provider per day.
+
+QUOTA_PATH = os.getenv("BRIEF_QUOTA_PATH", os.path.join(DATA_DIR, "quota.db"))
+
+# provider -> (bucket capacity, seconds to refill it completely)
+DEFAULT_LIMITS = {
+    "weather": (60, 60),  # OpenWeatherMap free: 60 calls / minute
+    "news": (100, 86400),  # NewsAPI developer: 100 requests / day
+    "forex": (60, 3600),  # open.er-api.com updates hourly; stay polite
+}
+FRESH_FOR = {"weather": 600, "news": 900, "forex": 3600}  # seconds a response counts as fresh
+STALE_FOR = 86400  # seconds the last good response is kept for stale serving
+RESERVE = float(os.getenv("QUOTA_RESERVE", "0.2"))  # below this fraction left, prefer stale data
+DEFAULT_RETRY_AFTER = 60
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS buckets (
+    provider      TEXT PRIMARY KEY,
+    tokens        REAL NOT NULL,
+    updated_at    REAL NOT NULL,
+    blocked_until REAL NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS usage (
+    provider  TEXT NOT NULL,
+    day       TEXT NOT NULL,
+    spent     INTEGER NOT NULL DEFAULT 0,
+    throttled INTEGER NOT NULL DEFAULT 0,
+    rejected  INTEGER NOT NULL DEFAULT 0,
+    stale     INTEGER NOT NULL DEFAULT 0,
+    coalesced INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (provider, day)
+);
+"""
+
+USAGE_FIELDS = ("spent", "throttled", "rejected", "stale", "coalesced")
+
+
+class QuotaExceeded(UpstreamError):
+    """
+    No budget left for a provider (local bucket empty or upstream 429).
+    """
+
+    def __init__(self, provider, retry_after=None):
+        super().__init__(f"{provider} quota exhausted")
+        self.provider = provider
+        self.retry_after = retry_after
+
+
+def load_limits():
+    """
+    DEFAULT_LIMITS, overridable per provider, e.g. QUOTA_NEWS=100/86400.
+    """
+    limits = dict(DEFAULT_LIMITS)
+    for provider in limits:
+        spec = os.getenv(f"QUOTA_{provider.upper()}")
+        if spec:
+            capacity, _, period = spec.partition("/")
+            limits[provider] = (int(capacity), float(period or 60))
+    return limits
+
+
+class QuotaManager:
+    """
+    Shared per-provider token buckets plus a coalescing, stale-tolerant
+    response cache.
+    """
+
+    def __init__(self, path=QUOTA_PATH, limits=None, cache=None):
+        self.path = path
+        self.limits = limits or load_limits()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._local = threading.local()
+        self._conn().executescript(SCHEMA)
+        self.cache = cache or get_cache_backend("shared")
+        self._flights = {}
+        self._flights_lock = threading.Lock()
+        self._stale_before = {}  # provider -> responses fetched before this are not fresh
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    # --- Buckets ---
+    def _refilled(self, provider, row, now):
+        capacity, period = self.limits[provider]
+        if row is None:
+            return float(capacity), 0.0
+        tokens, updated_at, blocked_until = row
+        return min(capacity, tokens + (now - updated_at) * capacity / period), blocked_until
+
+    def try_acquire(self, provider):
+        """
+        Takes one token from the provider's bucket. Atomic across processes.
+        """
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tokens, updated_at, blocked_until FROM buckets WHERE provider = ?",
+                               (provider,)).fetchone()
+            tokens, blocked_until = self._refilled(provider, row, now)
+            granted = tokens >= 1 and now >= blocked_until
+            if granted:
+                tokens -= 1
+            conn.execute("INSERT OR REPLACE INTO buckets (provider, tokens, updated_at, blocked_until) "
+                         "VALUES (?, ?, ?, ?)", (provider, tokens, now, blocked_until))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        self._count(provider, "spent" if granted else "rejected")
+        return granted
+
+    def block(self, provider, retry_after):
+        """
+        Upstream said 429: empty the bucket and hold off for `retry_after` seconds.
+        """
+        now = time.time()
+        with self._conn() as conn:
+            conn.execute("INSERT OR REPLACE INTO buckets (provider, tokens, updated_at, blocked_until) "
+                         "VALUES (?, 0, ?, ?)", (provider, now, now + retry_after))
+        self._count(provider, "throttled")
+
+    def remaining(self, provider):
+        row = self._conn().execute("SELECT tokens, updated_at, blocked_until FROM buckets WHERE provider = ?",
+                                   (provider,)).fetchone()
+        now = time.time()
+        tokens, blocked_until = self._refilled(provider, row, now)
+        return 0.0 if now < blocked_until else tokens
+
+    def is_tight(self, provider):
+        return self.remaining(provider) < max(1.0, self.limits[provider][0] * RESERVE)
+
+    def _count(self, provider, field):
+        with self._conn() as conn:
+            conn.execute(
+                f"INSERT INTO usage (provider, day, {field}) VALUES (?, ?, 1) "
+                f"ON CONFLICT (provider, day) DO UPDATE SET {field} = {field} + 1",
+                (provider, date.today().isoformat()),
+            )
+
+    # --- Upstream calls ---
+    def invalidate(self, provider=None):
+        """
+        Treats every response fetched so far (for one provider or all) as no
+        longer fresh: the next fetch() goes upstream, budget permitting. The
+        responses stay available for stale serving.
+        """
+        now = time.time()
+        for name in ([provider] if provider else self.limits):
+            self._stale_before[name] = now
+
+    def get(self, provider, url, **kwargs):
+        """
+        GET under the provider's deadline and circuit breaker that spends one
+        token and turns a 429 into QuotaExceeded. No token is spent while
+        the circuit is open.
+        """
+        def spend():
+            if not self.try_acquire(provider):
+                raise QuotaExceeded(provider)
+
+        response = guarded_get(provider, url, before=spend, **kwargs)
+        if response.status_code == 429:
+            retry_after = response.headers.get("Retry-After", "")
+            retry_after = float(retry_after) if retry_after.isdigit() else DEFAULT_RETRY_AFTER
+            self.block(provider, retry_after)
+            raise QuotaExceeded(provider, retry_after)
+        return response
+
+    def fetch(self, provider, key, fn, fresh_for=None):
+        """
+        Returns fn()'s result for `key`, spending quota only when needed:
+        fresh cached value -> coalesced in-flight call -> stale value while the
+        budget is tight -> upstream call -> stale (last known good) value on
+        UpstreamError (quota, timeout, open circuit).
+        None results are not cached.
+        """
+        fresh_for = FRESH_FOR.get(provider, 600) if fresh_for is None else fresh_for
+        cache_key = f"upstream:{key}"
+        entry = self.cache.get(cache_key)
+        if (entry and time.time() - entry["fetched_at"] < fresh_for
+                and entry["fetched_at"] > self._stale_before.get(provider, 0)):
+            return entry["value"]
+
+        with self._flights_lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = {"done": threading.Event(), "value": None}
+        if not leader:
+            self._count(provider, "coalesced")
+            flight["done"].wait()
+            return flight["value"]
+
+        try:
+            if entry and self.is_tight(provider):
+                self._count(provider, "stale")
+                value = entry["value"]
+            else:
+                value = self._refresh(provider, cache_key, entry, fn)
+            flight["value"] = value
+            return value
+        finally:
+            with self._flights_lock:
+                self._flights.pop(key, None)
+            flight["done"].set()
+
+    def _refresh(self, provider, cache_key, entry, fn):
+        """
+        Calls fn() once across processes: if another replica holds the
+        refresh lock, waits for it and uses its result instead of spending quota.
+        """
+        lock = f"lock:{cache_key}"
+        deadline = time.monotonic() + LOCK_WAIT
+        token = self.cache.acquire(lock, LOCK_TTL)
+        while token is None and time.monotonic() < deadline:
+            time.sleep(POLL_INTERVAL)
+            token = self.cache.acquire(lock, LOCK_TTL)
+        try:
+            latest = self.cache.get(cache_key)
+            if latest and latest["fetched_at"] > (entry["fetched_at"] if entry else 0):
+                self._count(provider, "coalesced")  # refreshed by another process meanwhile
+                return latest["value"]
+            try:
+                value = fn()
+            except UpstreamError:
+                value = None
+            if value is not None:
+                self.cache.set(cache_key, {"fetched_at": time.time(), "value": value}, ttl=STALE_FOR)
+            elif entry:
+                self._count(provider, "stale")
+                value = entry["value"]
+            return value
+        finally:
+            if token is not None:
+                self.cache.release(lock, token)
+
+    # --- Reporting ---
+    def report(self, day=None):
+        """
+        Per provider: capacity, tokens left now, and today's counters.
+        """
+        day = day or date.today().isoformat()
+        rows = {r[0]: r[1:] for r in self._conn().execute(
+            f"SELECT provider, {', '.join(USAGE_FIELDS)} FROM usage WHERE day = ?", (day,))}
+        out = []
+        for provider, (capacity, period) in self.limits.items():
+            counters = dict(zip(USAGE_FIELDS, rows.get(provider, (0,) * len(USAGE_FIELDS))))
+            out.append({"provider": provider, "capacity": capacity, "period_s": period,
+                        "remaining": int(self.remaining(provider)), **counters})
+        return out
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_quota():
+    """
+    Process-wide quota manager.
+    """
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = QuotaManager()
+        return _manager
@@ -0,0 +1,172 @@
+import os
+import threading
+import time
+
+import requests
+
+# --- Upstream Resilience ---
+# Every upstream source gets a deadline and a circuit breaker:
+#   closed    - calls go through; BREAKER_FAILURES consecutive failures open it
+#   open      - calls fail fast with CircuitOpen (no network) for the cooldown,
+#               which doubles on every failed probe up to BREAKER_MAX_COOLDOWN
+#   half-open - after the cooldown exactly one probe call is let through;
+#               success closes the circuit, failure re-opens it
+# Callers (quota.QuotaManager.fetch) answer UpstreamError with the last known
+# good response, so a dead API costs nothing on reruns and users keep seeing data.
+
+BREAKER_FAILURES = int(os.getenv("BREAKER_FAILURES", "3"))
+BREAKER_COOLDOWN = float(os.getenv("BREAKER_COOLDOWN", "30"))
+BREAKER_MAX_COOLDOWN = float(os.getenv("BREAKER_MAX_COOLDOWN", "300"))
+CONNECT_TIMEOUT = 3.05
+
+# Seconds each source may take to answer (read timeout; connect is CONNECT_TIMEOUT)
+DEADLINES = {
+    "weather": float(os.getenv("WEATHER_TIMEOUT", "5")),
+    "news": float(os.getenv("NEWS_TIMEOUT", "8")),
+    "forex": float(os.getenv("FOREX_TIMEOUT", "5")),
+    "markets": float(os.getenv("MARKETS_TIMEOUT", "10")),
+    "ollama": 2.0,
+}
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half-open"
+
+
+class UpstreamError(Exception):
+    """
+    An upstream source failed, timed out or is not being called right now.
+    """
+
+
+class CircuitOpen(UpstreamError):
+    """
+    The source's circuit is open; the call was not attempted.
+    """
+
+
+class CircuitBreaker:
+    def __init__(self, name, failures=None, cooldown=None, max_cooldown=None):
+        self.name = name
+        self.failure_threshold = failures or BREAKER_FAILURES
+        self.base_cooldown = cooldown or BREAKER_COOLDOWN
+        self.max_cooldown = max_cooldown or BREAKER_MAX_COOLDOWN
+        self.state = CLOSED
+        self.failures = 0
+        self.cooldown = self.base_cooldown
+        self.opened_at = 0.0
+        self.probing = False
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """
+        True if a call may go out now. In half-open state only one caller
+        (the probe) gets True until it reports back.
+        """
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.cooldown:
+                self.state = HALF_OPEN
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and not self.probing:
+                self.probing = True
+                return True
+            self.rejected += 1
+            return False
+
+    def release(self):
+        """
+        The allowed call never happened (e.g. no quota); free the probe slot.
+        """
+        with self._lock:
+            self.probing = False
+
+    def record_success(self):
+        with self._lock:
+            self.state = CLOSED
+            self.failures = 0
+            self.cooldown = self.base_cooldown
+            self.probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN:
+                self.cooldown = min(self.cooldown * 2, self.max_cooldown)
+                self._open()
+            elif self.failures >= self.failure_threshold:
+                self._open()
+
+    def _open(self):
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+        self.probing = False
+
+    def as_dict(self):
+        with self._lock:
+            retry_in = max(0.0, self.cooldown - (time.monotonic() - self.opened_at)) if self.state == OPEN else 0.0
+            return {"state": self.state, "failures": self.failures, "rejected": self.rejected,
+                    "retry_in_s": round(retry_in, 1)}
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(source):
+    with _breakers_lock:
+        if source not in _breakers:
+            _breakers[source] = CircuitBreaker(source)
+        return _breakers[source]
+
+
+def breaker_states():
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {b.name: b.as_dict() for b in breakers}
+
+
+def deadline(source):
+    return (CONNECT_TIMEOUT, DEADLINES.get(source, 5.0))
+
+
+def guarded(source, fn, before=None):
+    """
+    Runs fn() under the source's circuit breaker. `before` runs once the
+    breaker has allowed the call (e.g. to spend quota); if it raises, the
+    call is abandoned without counting as a failure.
+    Exceptions from fn count as failures and surface as UpstreamError.
+    """
+    breaker = get_breaker(source)
+    if not breaker.allow():
+        raise CircuitOpen(f"{source} circuit open")
+    if before:
+        try:
+            before()
+        except Exception:
+            breaker.release()
+            raise
+    try:
+        result = fn()
+    except UpstreamError:
+        breaker.record_failure()
+        raise
+    except Exception as e:
+        breaker.record_failure()
+        raise UpstreamError(f"{source}: {e}") from e
+    breaker.record_success()
+    return result
+
+
+def guarded_get(source, url, before=None, **kwargs):
+    """
+    requests.get() with the source's deadline and circuit breaker.
+    Connection errors, timeouts and 5xx answers count as failures;
+    4xx answers (bad city, 429) are returned to the caller.
+    """
+    def call():
+        response = requests.get(url, timeout=deadline(source), **kwargs)
+        if response.status_code >= 500:
+            raise UpstreamError(f"{source} answered {response.status_code}")
+        return response
+
+    return guarded(source, call, before=before)
@@ -0,0 +1,117 @@
+import threading
+import numpy as np
+
+from llm import EMBED_MODEL, embed_texts
+
+# --- Journal Retrieval (RAG) ---
+# Past entries are embedded once and kept as a normalised float32 matrix
+# (persisted in the journal_vectors table). Each reflection only gets the
+# top-k most similar snippets, trimmed to a fixed token budget, so prompt
+# size stays constant however long the history grows.
+
+CHARS_PER_TOKEN = 4  # rough estimate, good enough for budgeting
+
+
+def estimate_tokens(text):
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def _normalise(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+class JournalIndex:
+    """
+    In-memory cosine-similarity index over journal entry embeddings.
+    """
+
+    def __init__(self, store, model=EMBED_MODEL, embed=embed_texts):
+        self.store = store
+        self.model = model
+        self.embed = embed
+        self._lock = threading.Lock()
+        self._ids = np.empty(0, dtype=np.int64)
+        self._matrix = None
+        self._loaded = False
+
+    def _load(self):
+        rows = self.store.load_vectors(self.model)
+        if rows:
+            self._ids = np.array([r[0] for r in rows], dtype=np.int64)
+            self._matrix = np.vstack([np.frombuffer(r[1], dtype=np.float32) for r in rows])
+        self._loaded = True
+
+    def _append(self, ids, vectors):
+        vectors = _normalise(vectors)
+        self.store.save_vectors(self.model, [(int(i), v.tobytes()) for i, v in zip(ids, vectors)])
+        self._ids = np.concatenate([self._ids, np.asarray(ids, dtype=np.int64)])
+        self._matrix = vectors if self._matrix is None else np.vstack([self._matrix, vectors])
+
+    def sync(self, batch_size=32, max_batches=4):
+        """
+        Embeds entries that have no vector yet, in batches (one call each).
+        """
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            for _ in range(max_batches):
+                missing = self.store.entries_without_vectors(self.model, limit=batch_size)
+                if not missing:
+                    break
+                vectors = self.embed([m['entry'] for m in missing])
+                self._append([m['id'] for m in missing], vectors)
+
+    def add(self, journal_id, vector):
+        """
+        Indexes a freshly saved entry, reusing the vector computed for its query.
+        """
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            self._append([journal_id], [vector])
+
+    def search(self, query_vector, k=3, min_score=0.3):
+        """
+        Returns [(journal_id, score)] of the k most similar entries.
+        """
+        if self._matrix is None or len(self._ids) == 0:
+            return []
+        query = _normalise(query_vector)
+        scores = self._matrix @ query
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(self._ids[i]), float(scores[i])) for i in top if scores[i] >= min_score]
+
+    def build_context(self, query_text, k=3, token_budget=300):
+        """
+        Returns (context block for the prompt, query vector). The block lists the
+        most relevant past snippets and never exceeds `token_budget` tokens.
+        """
+        self.sync()
+        query_vector = self.embed([query_text])[0]
+
+        hits = self.search(query_vector, k=k)
+        entries = {e['id']: e for e in self.store.journal_by_ids([h[0] for h in hits])}
+
+        lines = []
+        remaining = token_budget
+        for journal_id, _ in hits:
+            entry = entries.get(journal_id)
+            if not entry:
+                continue
+            mood = f", mood {entry['score']}/10" if entry['score'] is not None else ""
+            prefix = f"- ({entry['entry_date']}{mood}) "
+            room = (remaining - estimate_tokens(prefix)) * CHARS_PER_TOKEN
+            if room < 40:
+                break
+            snippet = " ".join(entry['entry'].split())
+            if len(snippet) > room:
+                snippet = snippet[:room - 3].rsplit(" ", 1)[0] + "..."
+            line = prefix + snippet
+            lines.append(line)
+            remaining -= estimate_tokens(line)
+
+        return "\n".join(lines), query_vector
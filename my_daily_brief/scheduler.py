@@ -0,0 +1,142 @@
+"""
+Headless pre-generation of the morning brief (no Streamlit needed).
+
+For every configured city it fetches weather and news, then generates the
+briefing text, the dynamic greeting and the gTTS audio ahead of the wake-up
+time, and stores them in the shared cache. The app then only reads the cache
+on page open. Afterwards it tops up the AI content pools (fun facts, wisdom,
+greetings for each city's wake-up weather) while the model is idle.
+
+Usage:
+    python scheduler.py          # run forever, once a day before BRIEF_WAKE_TIME
+    python scheduler.py --once   # build today's briefs now and exit
+
+Configuration (.env):
+    BRIEF_CITIES=Bengaluru,London
+    BRIEF_WAKE_TIME=07:00
+    BRIEF_LEAD_MINUTES=30
+"""
+import argparse
+import os
+import time
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+
+import core
+import prompts
+from cache import brief_key
+from cachebackends import get_cache_backend
+from pools import ContentPools, greeting_pool
+from summarizer import SummaryCache, build_news_digest
+
+load_dotenv(override=True)
+
+BRIEF_TTL = 24 * 3600
+
+
+def get_config():
+    cities = [c.strip() for c in os.getenv("BRIEF_CITIES", "Bengaluru").split(",") if c.strip()]
+    wake_h, wake_m = (int(x) for x in os.getenv("BRIEF_WAKE_TIME", "07:00").split(":"))
+    lead = int(os.getenv("BRIEF_LEAD_MINUTES", "30"))
+    return cities, wake_h, wake_m, lead
+
+
+def build_brief(city, wake_time, news_data, summary_cache, pools):
+    """
+    Builds the brief for one city. Returns (entry dict, audio bytes or None).
+    The greeting comes from the content pools; the LLM only writes one when
+    the matching pool is still empty.
+    """
+    weather_data = core.fetch_weather_data(city)
+    if not weather_data or not news_data:
+        raise RuntimeError(f"Missing weather or news data for {city}")
+
+    n_digest = build_news_digest(news_data['articles'], prompts.stream, summary_cache)
+    briefing = prompts.complete(core.build_briefing_prompt(weather_data['summary'], n_digest))
+
+    greeting = pools.draw(greeting_pool(wake_time.hour, weather_data['full']['weather'][0]['main']))
+    if not greeting:
+        temp = weather_data['full']['main']['temp']
+        desc = weather_data['full']['weather'][0]['description']
+        time_text = wake_time.strftime("%B %d, %Y | %I:%M %p")
+        greeting = prompts.complete(core.build_greeting_prompt(time_text, desc, temp))
+
+    try:
+        audio = core.synthesize_audio(briefing)
+    except Exception:
+        # gTTS needs network; the brief is still useful without audio
+        audio = None
+
+    entry = {
+        "city": city,
+        "generated_at": datetime.now().isoformat(timespec="seconds"),
+        "weather": weather_data,
+        "news": news_data,
+        "briefing": briefing,
+        "greeting": greeting,
+    }
+    return entry, audio
+
+
+def run_once(cache, cities, wake_time):
+    date_str = wake_time.strftime("%Y-%m-%d")
+    news_data = core.fetch_news_data()
+    summary_cache = SummaryCache()
+    pools = ContentPools(start=False)
+
+    for city in cities:
+        key = brief_key(city, date_str)
+        try:
+            entry, audio = build_brief(city, wake_time, news_data, summary_cache, pools)
+        except Exception as e:
+            print(f"[{datetime.now():%H:%M:%S}] {city}: brief failed ({e})")
+            continue
+        if audio:
+            cache.set(key + ":audio", audio, ttl=BRIEF_TTL)
+        cache.set(key, entry, ttl=BRIEF_TTL)
+        print(f"[{datetime.now():%H:%M:%S}] {city}: brief ready ({key})")
+
+    added = pools.replenish_once()
+    print(f"[{datetime.now():%H:%M:%S}] content pools: {added} new items {pools.sizes()}")
+
+    if hasattr(cache, "purge_expired"):  # Redis and the memory backend expire keys themselves
+        cache.purge_expired()
+
+
+def next_run(now, wake_h, wake_m, lead):
+    """
+    Returns (run_at, wake_time) for the next scheduled generation. Started
+    after the lead time but before the wake time, today's brief is still
+    due and run_at is `now`; only from the wake time on it is tomorrow's.
+    """
+    wake = now.replace(hour=wake_h, minute=wake_m, second=0, microsecond=0)
+    if now >= wake:
+        wake += timedelta(days=1)
+    return max(wake - timedelta(minutes=lead), now), wake
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-generate the morning brief.")
+    parser.add_argument("--once", action="store_true", help="Build today's briefs now and exit")
+    args = parser.parse_args()
+
+    cities, wake_h, wake_m, lead = get_config()
+    cache = get_cache_backend("shared")
+
+    if args.once:
+        wake = datetime.now().replace(hour=wake_h, minute=wake_m, second=0, microsecond=0)
+        run_once(cache, cities, wake)
+        return
+
+    built_for = datetime.min
+    while True:
+        # Once a wake time's brief is built, schedule from that wake time on
+        run_at, wake = next_run(max(datetime.now(), built_for), wake_h, wake_m, lead)
+        print(f"Next brief for {', '.join(cities)} at {run_at:%Y-%m-%d %H:%M}")
+        time.sleep(max(0, (run_at - datetime.now()).total_seconds()))
+        run_once(cache, cities, wake)
+        built_for = wake
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+from cache import DATA_DIR
+
+# --- Persistent Storage (Tasks & Journal) ---
+# SQLite in WAL mode: readers never block the writer, and every task / journal
+# query is served by an index on date or status.
+
+DB_PATH = os.getenv("BRIEF_DB_PATH", os.path.join(DATA_DIR, "brief.db"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id           INTEGER PRIMARY KEY AUTOINCREMENT,
+    text         TEXT NOT NULL,
+    status       TEXT NOT NULL DEFAULT 'pending',
+    created_at   TEXT NOT NULL,
+    completed_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_status_created ON tasks (status, created_at);
+CREATE INDEX IF NOT EXISTS idx_tasks_completed ON tasks (completed_at);
+
+CREATE TABLE IF NOT EXISTS journal (
+    id         INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at TEXT NOT NULL,
+    entry_date TEXT NOT NULL,
+    entry      TEXT NOT NULL,
+    score      INTEGER,
+    advice     TEXT,
+    full_text  TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_journal_date ON journal (entry_date, created_at);
+
+-- Daily mood rollup, maintained on every journal insert so charts never
+-- have to scan the full journal history.
+CREATE TABLE IF NOT EXISTS mood_daily (
+    entry_date   TEXT PRIMARY KEY,
+    entries      INTEGER NOT NULL DEFAULT 0,
+    scored       INTEGER NOT NULL DEFAULT 0,
+    score_sum    REAL NOT NULL DEFAULT 0,
+    score_min    INTEGER,
+    score_max    INTEGER,
+    temp_sum     REAL NOT NULL DEFAULT 0,
+    temp_n       INTEGER NOT NULL DEFAULT 0,
+    humidity_sum REAL NOT NULL DEFAULT 0,
+    weather_main TEXT
+);
+
+-- LLM time estimates per task, keyed by normalised task text
+CREATE TABLE IF NOT EXISTS task_estimates (
+    task_key   TEXT PRIMARY KEY,
+    text       TEXT NOT NULL,
+    minutes    REAL NOT NULL,
+    created_at TEXT NOT NULL
+);
+
+-- Embedding vectors of journal entries (float32 blobs), one per model
+CREATE TABLE IF NOT EXISTS journal_vectors (
+    journal_id INTEGER NOT NULL,
+    model      TEXT NOT NULL,
+    vector     BLOB NOT NULL,
+    PRIMARY KEY (journal_id, model)
+);
+"""
+
+
+# Columns added after the first release; created on open for older databases
+MIGRATIONS = {
+    "journal": [("weather_main", "TEXT"), ("temp", "REAL"), ("humidity", "REAL")],
+}
+
+
+def _now():
+    return datetime.now().isoformat(timespec="seconds")
+
+
+class BriefStore:
+    """
+    Thread-safe access to the tasks and journal tables.
+    """
+
+    def __init__(self, path=DB_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._local = threading.local()
+        self._conn().executescript(SCHEMA)
+        self._migrate()
+
+    def _conn(self):
+        # One connection per thread; sqlite3 connections are not thread-safe
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _migrate(self):
+        conn = self._conn()
+        for table, columns in MIGRATIONS.items():
+            existing = {r["name"] for r in conn.execute(f"PRAGMA table_info({table})")}
+            for name, col_type in columns:
+                if name not in existing:
+                    conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {col_type}")
+        conn.commit()
+
+    # --- Tasks ---
+    def add_tasks(self, texts):
+        """
+        Inserts several tasks in one transaction. Returns the new task dicts.
+        """
+        now = _now()
+        added = []
+        with self._conn() as conn:
+            for text in texts:
+                cur = conn.execute(
+                    "INSERT INTO tasks (text, status, created_at) VALUES (?, 'pending', ?)", (text, now)
+                )
+                added.append({"id": cur.lastrowid, "text": text, "created_at": now})
+        return added
+
+    def complete_tasks(self, task_ids):
+        """
+        Marks several tasks done in one transaction.
+        """
+        now = _now()
+        with self._conn() as conn:
+            conn.executemany(
+                "UPDATE tasks SET status = 'done', completed_at = ? WHERE id = ? AND status = 'pending'",
+                [(now, task_id) for task_id in task_ids],
+            )
+
+    def pending_tasks(self):
+        rows = self._conn().execute(
+            "SELECT id, text, created_at FROM tasks WHERE status = 'pending' ORDER BY created_at, id"
+        ).fetchall()
+        return [dict(r) for r in rows]
+
+    def completed_tasks(self, since=None, limit=1000):
+        rows = self._conn().execute(
+            "SELECT id, text, created_at, completed_at FROM tasks"
+            " WHERE status = 'done' AND completed_at >= ? ORDER BY completed_at DESC LIMIT ?",
+            (since or "", limit),
+        ).fetchall()
+        return [dict(r) for r in rows]
+
+    def done_count(self):
+        return self._conn().execute("SELECT COUNT(*) FROM tasks WHERE status = 'done'").fetchone()[0]
+
+    # --- Task Estimates ---
+    def get_estimates(self, keys):
+        """
+        {task_key: minutes} for the keys that have a stored estimate.
+        """
+        if not keys:
+            return {}
+        marks = ",".join("?" * len(keys))
+        rows = self._conn().execute(
+            f"SELECT task_key, minutes FROM task_estimates WHERE task_key IN ({marks})", list(keys)
+        ).fetchall()
+        return {r["task_key"]: r["minutes"] for r in rows}
+
+    def save_estimates(self, items):
+        """
+        Stores (task_key, text, minutes) triples in one transaction.
+        """
+        now = _now()
+        with self._conn() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO task_estimates (task_key, text, minutes, created_at) VALUES (?, ?, ?, ?)",
+                [(key, text, minutes, now) for key, text, minutes in items],
+            )
+
+    # --- Journal ---
+    def add_journal_entry(self, entry, score, advice, full_text, weather=None):
+        """
+        Saves a reflection and folds it into the daily mood rollup.
+        `weather` is the optional fetch_weather_data() result at entry time.
+        """
+        now = datetime.now()
+        entry_date = now.strftime("%Y-%m-%d")
+        weather_main, temp, humidity = None, None, None
+        if weather:
+            weather_main = weather['full']['weather'][0]['main']
+            temp = weather['full']['main']['temp']
+            humidity = weather['full']['main']['humidity']
+
+        with self._conn() as conn:
+            cur = conn.execute(
+                "INSERT INTO journal (created_at, entry_date, entry, score, advice, full_text, weather_main, temp, humidity)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (now.isoformat(timespec="seconds"), entry_date, entry, score, advice, full_text, weather_main, temp, humidity),
+            )
+            conn.execute(
+                """
+                INSERT INTO mood_daily (entry_date, entries, scored, score_sum, score_min, score_max,
+                                        temp_sum, temp_n, humidity_sum, weather_main)
+                VALUES (:d, 1, :scored, :score, :score_v, :score_v, :temp, :temp_n, :hum, :wm)
+                ON CONFLICT(entry_date) DO UPDATE SET
+                    entries      = entries + 1,
+                    scored       = scored + excluded.scored,
+                    score_sum    = score_sum + excluded.score_sum,
+                    score_min    = MIN(COALESCE(score_min, excluded.score_min), COALESCE(excluded.score_min, score_min)),
+                    score_max    = MAX(COALESCE(score_max, excluded.score_max), COALESCE(excluded.score_max, score_max)),
+                    temp_sum     = temp_sum + excluded.temp_sum,
+                    temp_n       = temp_n + excluded.temp_n,
+                    humidity_sum = humidity_sum + excluded.humidity_sum,
+                    weather_main = COALESCE(excluded.weather_main, weather_main)
+                """,
+                {
+                    "d": entry_date,
+                    "scored": 1 if score is not None else 0,
+                    "score": score or 0,
+                    "score_v": score,
+                    "temp": temp or 0,
+                    "temp_n": 1 if temp is not None else 0,
+                    "hum": humidity or 0,
+                    "wm": weather_main,
+                },
+            )
+        return cur.lastrowid
+
+    def journal_by_ids(self, ids):
+        if not ids:
+            return []
+        marks = ",".join("?" * len(ids))
+        rows = self._conn().execute(f"SELECT * FROM journal WHERE id IN ({marks})", list(ids)).fetchall()
+        return [dict(r) for r in rows]
+
+    # --- Journal Vectors ---
+    def save_vectors(self, model, items):
+        """
+        Stores (journal_id, float32 bytes) pairs in one transaction.
+        """
+        with self._conn() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO journal_vectors (journal_id, model, vector) VALUES (?, ?, ?)",
+                [(journal_id, model, blob) for journal_id, blob in items],
+            )
+
+    def load_vectors(self, model):
+        return self._conn().execute(
+            "SELECT journal_id, vector FROM journal_vectors WHERE model = ? ORDER BY journal_id", (model,)
+        ).fetchall()
+
+    def entries_without_vectors(self, model, limit=64):
+        rows = self._conn().execute(
+            "SELECT j.id, j.entry FROM journal j"
+            " LEFT JOIN journal_vectors v ON v.journal_id = j.id AND v.model = ?"
+            " WHERE v.journal_id IS NULL ORDER BY j.id LIMIT ?",
+            (model, limit),
+        ).fetchall()
+        return [dict(r) for r in rows]
+
+    def mood_rollup(self, start_date=None):
+        """
+        Daily mood rows from the rollup table, oldest first.
+        """
+        rows = self._conn().execute(
+            "SELECT * FROM mood_daily WHERE entry_date >= ? ORDER BY entry_date",
+            (start_date or "",),
+        ).fetchall()
+        return [dict(r) for r in rows]
+
+    def latest_journal_entry(self):
+        row = self._conn().execute(
+            "SELECT * FROM journal ORDER BY entry_date DESC, created_at DESC LIMIT 1"
+        ).fetchone()
+        return dict(row) if row else None
@@ -0,0 +1,148 @@
+import asyncio
+import json
+import threading
+
+# --- Token Fan-Out for Streaming Endpoints ---
+# Identical concurrent requests (same key) share ONE upstream generation.
+# Each subscriber has a bounded queue and the relay never waits on it: a
+# client that falls QUEUE_SIZE tokens behind is dropped (its queue is
+# cleared and ends with a StreamError) so it cannot stall everyone else.
+# One slot beyond QUEUE_SIZE is held back for the end-of-stream marker, so a
+# client that received every token is never dropped at the finish line.
+
+QUEUE_SIZE = 256
+
+_DONE = object()
+
+
+class StreamError(Exception):
+    pass
+
+
+def _iterate_in_thread(iterable, queue, loop):
+    """
+    Pumps a blocking iterator into an asyncio queue from a worker thread.
+    put() blocks while the queue is full, which throttles the generator.
+    """
+    def pump():
+        try:
+            for item in iterable:
+                asyncio.run_coroutine_threadsafe(queue.put(item), loop).result()
+            asyncio.run_coroutine_threadsafe(queue.put(_DONE), loop).result()
+        except Exception as e:
+            asyncio.run_coroutine_threadsafe(queue.put(StreamError(str(e))), loop).result()
+
+    threading.Thread(target=pump, daemon=True).start()
+
+
+class Broadcast:
+    """
+    One upstream token stream relayed to many subscribers. Late joiners get
+    the tokens produced so far replayed before the live tail.
+    """
+
+    def __init__(self, key, token_factory, on_complete=None):
+        self.key = key
+        self.tokens = []
+        self.error = None
+        self.done = False
+        self.subscribers = set()
+        self._factory = token_factory
+        self._on_complete = on_complete
+
+    def subscribe(self):
+        queue = asyncio.Queue(maxsize=QUEUE_SIZE + 1)
+        self.subscribers.add(queue)
+        return queue
+
+    def _deliver(self, queue, item):
+        if queue.qsize() >= QUEUE_SIZE:
+            self._drop(queue)
+        else:
+            queue.put_nowait(item)
+
+    def _drop(self, queue):
+        # Too slow: end its stream now instead of leaving its reader waiting
+        self.subscribers.discard(queue)
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(StreamError("client too slow, stream dropped"))
+
+    def _publish(self, item):
+        self.tokens.append(item)
+        for queue in list(self.subscribers):
+            self._deliver(queue, item)
+
+    async def run(self):
+        source = self._factory()
+        if hasattr(source, "__aiter__"):
+            try:
+                async for item in source:
+                    self._publish(item)
+            except Exception as e:
+                self.error = StreamError(str(e))
+        else:
+            upstream = asyncio.Queue(maxsize=QUEUE_SIZE)
+            _iterate_in_thread(source, upstream, asyncio.get_running_loop())
+            while True:
+                item = await upstream.get()
+                if item is _DONE:
+                    break
+                if isinstance(item, StreamError):
+                    self.error = item
+                    break
+                self._publish(item)
+
+        self.done = True
+        final = self.error or _DONE
+        for queue in list(self.subscribers):
+            # Fits in the reserved slot however far behind the reader is
+            queue.put_nowait(final)
+        if self._on_complete and not self.error:
+            self._on_complete("".join(self.tokens))
+
+
+class StreamHub:
+    """
+    Registry of in-flight broadcasts keyed by request identity.
+    """
+
+    def __init__(self):
+        self._active = {}
+        self.upstream_started = 0
+
+    async def stream(self, key, token_factory, on_complete=None):
+        """
+        Async iterator of tokens for `key`, joining an in-flight generation
+        when there is one. `token_factory` returns a sync or async iterator.
+        """
+        broadcast = self._active.get(key)
+        if broadcast is None or broadcast.done:
+            broadcast = Broadcast(key, token_factory, on_complete)
+            self._active[key] = broadcast
+            self.upstream_started += 1
+            task = asyncio.create_task(broadcast.run())
+            task.add_done_callback(lambda _t, b=broadcast: self._active.get(key) is b and self._active.pop(key, None))
+
+        # Subscribe and snapshot in the same step so no token is missed or duplicated
+        replay = list(broadcast.tokens)
+        queue = broadcast.subscribe()
+        try:
+            for token in replay:
+                yield token
+            while True:
+                item = await queue.get()
+                if item is _DONE:
+                    return
+                if isinstance(item, StreamError):
+                    raise item
+                yield item
+        finally:
+            broadcast.subscribers.discard(queue)
+
+
+def sse_event(event, data):
+    """
+    Formats one Server-Sent Event.
+    """
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
@@ -0,0 +1,521 @@
+"""
+Local stand-ins for the upstream services, used by the benchmarks and the
+load tests so they never touch real APIs or quotas.
+
+    StubOllama    - /api/chat, /api/generate (NDJSON streaming), /api/embed
+    StubOpenAI    - OpenAI-compatible /v1/chat/completions (SSE), like llama.cpp
+    StubUpstream  - OpenWeatherMap, NewsAPI and open.er-api.com endpoints
+    StubRedis     - the few Redis commands the redis:// cache backend uses
+
+Usage:
+    python stubs.py    # serve both on fixed ports and print the .env lines
+"""
+import hashlib
+import json
+import math
+import os
+import re
+import socketserver
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+CITIES = {
+    "bengaluru": (1277333, 12.97, 77.59, 24.0),
+    "mumbai": (1275339, 19.07, 72.88, 29.0),
+    "delhi": (1273294, 28.65, 77.23, 27.0),
+    "new york": (5128581, 40.71, -74.01, 12.0),
+    "london": (2643743, 51.51, -0.13, 9.0),
+    "tokyo": (1850147, 35.69, 139.69, 15.0),
+    "singapore": (1880252, 1.29, 103.85, 30.0),
+    "dubai": (292223, 25.26, 55.30, 33.0),
+    "paris": (2988507, 48.85, 2.35, 11.0),
+    "berlin": (2950159, 52.52, 13.41, 8.0),
+}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True  # headers and body go out as separate writes
+
+    def log_message(self, *args):
+        pass
+
+    def _send_json(self, payload, status=200, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+
+class _HTTPServer(ThreadingHTTPServer):
+    # The default backlog of 5 makes bursts of concurrent connects stall on SYN retries
+    request_queue_size = 256
+
+
+class _StubServer:
+    handler = _Handler
+
+    def __init__(self, port=0):
+        handler = type(self.handler.__name__, (self.handler,), {"stub": self})
+        self.httpd = _HTTPServer(("127.0.0.1", port), handler)
+        self.httpd.daemon_threads = True
+        self.requests = 0
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+# --- Stub Ollama ---
+class _OllamaHandler(_Handler):
+    def do_GET(self):
+        self.stub.requests += 1
+        if self.path.startswith("/api/tags"):
+            self._send_json({"models": [{"name": self.stub.model}]})
+            return
+        body = b"Ollama is running"
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        self.stub.requests += 1
+        req = self._read_json()
+        path = urlparse(self.path).path
+        if self.stub.fail:
+            self._send_json({"error": "stub failure"}, status=500)
+        elif path == "/api/embed":
+            inputs = req.get("input")
+            inputs = [inputs] if isinstance(inputs, str) else inputs
+            time.sleep(self.stub.embed_delay)
+            self._send_json({"model": req.get("model"), "embeddings": [self.stub.embed(t) for t in inputs]})
+        elif path in ("/api/chat", "/api/generate"):
+            self._stream(req, chat=path == "/api/chat")
+        else:
+            self._send_json({"error": "not found"}, status=404)
+
+    def _stream(self, req, chat):
+        stub = self.stub
+        if chat:
+            prompt = " ".join(m.get("content", "") for m in req.get("messages", []))
+        else:
+            prompt = req.get("prompt", "")
+        if stub.slots is None:
+            self._generate(req, chat, prompt)
+            return
+        with stub.queue_lock:
+            stub.queued += 1
+            stub.max_queued = max(stub.max_queued, stub.queued)
+        with stub.slots:
+            with stub.queue_lock:
+                stub.queued -= 1
+            self._generate(req, chat, prompt)
+
+    def _generate(self, req, chat, prompt):
+        stub = self.stub
+        tokens = stub.reply_for(prompt)
+        prompt_tokens = max(1, len(prompt) // 4)
+        if not chat and req.get("context"):
+            # A passed-in context means the prefix is already evaluated
+            prompt_tokens = max(1, prompt_tokens - len(req["context"]))
+        if chat:
+            # Like Ollama's KV cache: the prefix shared with the previous
+            # conversation (its prompt plus reply) is not evaluated again
+            cached = len(os.path.commonprefix([prompt, stub.kv_prefix]))
+            prompt_tokens = max(1, (len(prompt) - cached) // 4)
+            stub.kv_prefix = prompt + " " + "".join(tokens).strip()
+
+        time.sleep(stub.prompt_delay)
+        stream = req.get("stream", True)
+        started = time.perf_counter()
+
+        def piece(text, done, **extra):
+            base = {"model": req.get("model"), "created_at": "1970-01-01T00:00:00Z", "done": done}
+            if chat:
+                base["message"] = {"role": "assistant", "content": text}
+            else:
+                base["response"] = text
+            base.update(extra)
+            return base
+
+        final_stats = lambda: dict(
+            done_reason="stop",
+            total_duration=int((time.perf_counter() - started + stub.prompt_delay) * 1e9),
+            load_duration=0,
+            prompt_eval_count=prompt_tokens,
+            prompt_eval_duration=int(stub.prompt_delay * 1e9),
+            eval_count=len(tokens),
+            eval_duration=int(len(tokens) * stub.token_delay * 1e9),
+            **({} if chat else {"context": list(range(prompt_tokens + len(tokens)))}),
+        )
+
+        if not stream:
+            time.sleep(stub.token_delay * len(tokens))
+            self._send_json(piece("".join(tokens), True, **final_stats()))
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for tok in tokens:
+                time.sleep(stub.token_delay)
+                self._chunk(json.dumps(piece(tok, False)) + "\n")
+            self._chunk(json.dumps(piece("", True, **final_stats())) + "\n")
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def _chunk(self, text):
+        data = text.encode("utf-8")
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+
+class StubOllama(_StubServer):
+    """
+    Minimal Ollama-compatible server with configurable latency.
+    With `parallel` set, only that many generations run at once and the rest
+    wait in a queue, like Ollama with OLLAMA_NUM_PARALLEL.
+    """
+    handler = _OllamaHandler
+
+    def __init__(self, port=0, reply="This is a stub reply from the local model.", token_delay=0.01,
+                 prompt_delay=0.05, model="llama3.2:3b", dim=64, parallel=None, embed_delay=0.0):
+        super().__init__(port)
+        self.reply = reply
+        self.token_delay = token_delay
+        self.prompt_delay = prompt_delay
+        self.model = model
+        self.dim = dim
+        self.embed_delay = embed_delay  # seconds per /api/embed request
+        self.kv_prefix = ""  # last chat prompt + reply, for prefix-cache accounting
+        self.fail = False  # set True to answer every generation with HTTP 500
+        self.slots = threading.Semaphore(parallel) if parallel else None
+        self.queued = 0
+        self.max_queued = 0
+        self.queue_lock = threading.Lock()
+
+    def reply_for(self, prompt):
+        text = self.reply(prompt) if callable(self.reply) else self.reply
+        return [w + " " for w in text.split(" ")]
+
+    def embed(self, text):
+        # Deterministic bag-of-words hashing so similar texts get similar vectors
+        vec = [0.0] * self.dim
+        for word in re.findall(r"\w+", text.lower()):
+            vec[int(hashlib.md5(word.encode()).hexdigest(), 16) % self.dim] += 1.0
+        norm = math.sqrt(sum(v * v for v in vec)) or 1.0
+        return [v / norm for v in vec]
+
+
+# --- Stub OpenAI-compatible server (llama.cpp style) ---
+class _OpenAIHandler(_Handler):
+    def do_POST(self):
+        self.stub.requests += 1
+        req = self._read_json()
+        if self.stub.fail:
+            self._send_json({"error": {"message": "stub failure"}}, status=500)
+            return
+        if urlparse(self.path).path != "/v1/chat/completions":
+            self._send_json({"error": {"message": "not found"}}, status=404)
+            return
+
+        time.sleep(self.stub.prompt_delay)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for tok in self.stub.reply_for(""):
+                time.sleep(self.stub.token_delay)
+                event = {"object": "chat.completion.chunk", "model": req.get("model"),
+                         "choices": [{"index": 0, "delta": {"content": tok}}]}
+                self._chunk(f"data: {json.dumps(event)}\n\n")
+            self._chunk("data: [DONE]\n\n")
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    _chunk = _OllamaHandler._chunk
+
+
+class StubOpenAI(StubOllama):
+    """
+    OpenAI-compatible chat completions server; base URL is `url + "/v1"`.
+    """
+    handler = _OpenAIHandler
+
+
+# --- Stub Upstream APIs ---
+class _UpstreamHandler(_Handler):
+    def do_GET(self):
+        self.stub.requests += 1
+        url = urlparse(self.path)
+        self.stub.paths[url.path] += 1
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        time.sleep(self.stub.latency)
+        if self.stub.fault == "hang":
+            time.sleep(self.stub.hang_for)
+            return
+        if self.stub.fault == "reset":
+            self.close_connection = True
+            return  # close the connection without answering
+        if self.stub.fault == "error":
+            self._send_json({"message": "injected failure"}, status=503)
+            return
+        if self.stub.over_limit():
+            self.send_response(429)
+            self.send_header("Retry-After", str(self.stub.retry_after))
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        if url.path == "/data/2.5/weather":
+            city = self.stub.find_city(query)
+            if city is None:
+                self._send_json({"cod": "404", "message": "city not found"}, status=404)
+            else:
+                self._send_json(self.stub.weather(city))
+        elif url.path == "/data/2.5/forecast":
+            city = self.stub.find_city(query)
+            if city is None:
+                self._send_json({"cod": "404", "message": "city not found"}, status=404)
+            else:
+                now = int(time.time())
+                items = [{"dt": now + i * 10800, "main": {"temp": CITIES[city][3] + math.sin(i) * 3}} for i in range(40)]
+                self._send_json({"cod": "200", "list": items, "city": {"id": CITIES[city][0], "name": city.title()}})
+        elif url.path == "/data/2.5/group":
+            ids = {int(i) for i in query.get("id", "").split(",") if i}
+            found = [self.stub.weather(c) for c, v in CITIES.items() if v[0] in ids]
+            self._send_json({"cnt": len(found), "list": found})
+        elif url.path == "/v2/top-headlines":
+            size = int(query.get("pageSize", 20))
+            self._send_json({"status": "ok", "articles": self.stub.articles[:size]})
+        elif url.path.startswith("/v6/latest/"):
+            self._send_json({"result": "success", "base_code": url.path.rsplit("/", 1)[-1],
+                             "rates": {"INR": 83.2, "USD": 1.0, "EUR": 0.92}})
+        else:
+            self._send_json({"message": "not found"}, status=404)
+
+
+class StubUpstream(_StubServer):
+    """
+    Fake OpenWeatherMap / NewsAPI / ExchangeRate-API with canned data.
+    With `rate_limit` set, requests beyond that many per `rate_window`
+    seconds get a 429 with Retry-After, like the real free tiers.
+    `fault` injects failures: "hang" (no answer for `hang_for` seconds),
+    "reset" (connection closed without a response) or "error" (503).
+    """
+    handler = _UpstreamHandler
+
+    def __init__(self, port=0, latency=0.0, articles=20, rate_limit=None, rate_window=60.0, retry_after=30):
+        super().__init__(port)
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.rate_window = rate_window
+        self.retry_after = retry_after
+        self.throttled = 0
+        self.paths = Counter()  # requests per URL path
+        self.fault = None
+        self.hang_for = 30.0
+        self._window = []
+        self._window_lock = threading.Lock()
+        self.articles = [
+            {
+                "source": {"name": f"Stub Wire {i % 3}"},
+                "title": f"Stub headline number {i} about local events",
+                "description": f"Short description of stub story {i}.",
+                "url": f"https://example.com/story/{i}",
+            }
+            for i in range(articles)
+        ]
+
+    def over_limit(self):
+        if self.rate_limit is None:
+            return False
+        now = time.monotonic()
+        with self._window_lock:
+            self._window = [t for t in self._window if now - t < self.rate_window]
+            if len(self._window) >= self.rate_limit:
+                self.throttled += 1
+                return True
+            self._window.append(now)
+            return False
+
+    @staticmethod
+    def find_city(query):
+        if "id" in query:
+            return next((c for c, v in CITIES.items() if str(v[0]) == query["id"]), None)
+        if "lat" in query and "lon" in query:
+            lat, lon = float(query["lat"]), float(query["lon"])
+            return min(CITIES, key=lambda c: (CITIES[c][1] - lat) ** 2 + (CITIES[c][2] - lon) ** 2)
+        name = query.get("q", "").split(",")[0].strip().lower()
+        return name if name in CITIES else None
+
+    @staticmethod
+    def weather(city):
+        city_id, lat, lon, temp = CITIES[city]
+        return {
+            "id": city_id,
+            "name": city.title(),
+            "coord": {"lat": lat, "lon": lon},
+            "main": {"temp": temp, "humidity": 60},
+            "weather": [{"main": "Clouds", "description": "scattered clouds"}],
+            "wind": {"speed": 3.5},
+        }
+
+
+# --- Stub Redis ---
+class _RedisHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        while True:
+            try:
+                args = self._read_command()
+            except (OSError, ValueError):
+                return
+            if args is None:
+                return
+            self.wfile.write(self.stub.execute(args))
+
+    def _read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        args = []
+        for _ in range(int(line[1:])):
+            size = int(self.rfile.readline()[1:])
+            args.append(self.rfile.read(size + 2)[:-2])
+        return args
+
+
+class _TCPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = 256
+
+
+class StubRedis:
+    """
+    In-memory Redis speaking RESP2: PING, GET, SET [NX] [PX|EX], DEL,
+    SELECT and AUTH (both accepted), with key expiry. Counts commands.
+    """
+
+    def __init__(self, port=0):
+        handler = type("_RedisHandler", (_RedisHandler,), {"stub": self})
+        self.server = _TCPServer(("127.0.0.1", port), handler)
+        self.data = {}  # key -> (value, expires_at or None)
+        self.commands = 0
+        self._lock = threading.Lock()
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"redis://{host}:{port}/0"
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _live(self, key, now):
+        entry = self.data.get(key)
+        if entry and entry[1] is not None and entry[1] <= now:
+            del self.data[key]
+            return None
+        return entry
+
+    def execute(self, args):
+        name = args[0].decode().upper()
+        now = time.monotonic()
+        with self._lock:
+            self.commands += 1
+            if name == "PING":
+                return b"+PONG\r\n"
+            if name in ("SELECT", "AUTH"):
+                return b"+OK\r\n"
+            if name == "GET":
+                entry = self._live(args[1], now)
+                if entry is None:
+                    return b"$-1\r\n"
+                return b"$%d\r\n%s\r\n" % (len(entry[0]), entry[0])
+            if name == "DEL":
+                removed = sum(self.data.pop(k, None) is not None for k in args[1:])
+                return b":%d\r\n" % removed
+            if name == "SET":
+                options = [a.decode().upper() for a in args[3:]]
+                if "NX" in options and self._live(args[1], now) is not None:
+                    return b"$-1\r\n"
+                expires_at = None
+                for unit, scale in (("PX", 0.001), ("EX", 1.0)):
+                    if unit in options:
+                        expires_at = now + int(options[options.index(unit) + 1]) * scale
+                self.data[args[1]] = (args[2], expires_at)
+                return b"+OK\r\n"
+        return b"-ERR unknown command '%s'\r\n" % name.encode()
+
+
+def stub_env(upstream, ollama):
+    """
+    Environment variables that point the app at the given stubs.
+    """
+    return {
+        "WEATHER_API_KEY": "stub",
+        "NEWS_API_KEY": "stub",
+        "WEATHER_BASE_URL": upstream.url,
+        "NEWS_BASE_URL": upstream.url,
+        "FOREX_BASE_URL": upstream.url,
+        "OLLAMA_HOST": ollama.url,
+    }
+
+
+if __name__ == "__main__":
+    upstream = StubUpstream(port=8801).start()
+    ollama = StubOllama(port=8802).start()
+    print("Stubs running. Add these to your environment:")
+    for k, v in stub_env(upstream, ollama).items():
+        print(f"{k}={v}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,130 @@
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import prompts
+
+# --- Batched News Summarisation (Map-Reduce) ---
+# Map: article descriptions are chunked and each chunk is summarised by one
+# LLM call, chunks running concurrently. Reduce: the cached per-article
+# summaries are merged into one digest that feeds the daily briefing prompt.
+
+CHUNK_SIZE = 5
+MAX_WORKERS = 3
+MAX_DESCRIPTION_CHARS = 300
+
+
+def article_key(article):
+    """
+    Stable cache key for an article, based on its URL (falls back to title).
+    """
+    ident = article.get('url') or article.get('title') or ""
+    return hashlib.sha1(ident.encode("utf-8")).hexdigest()
+
+
+SUMMARY_TTL = 7 * 86400
+
+
+class SummaryCache:
+    """
+    Thread-safe LRU of per-article summaries keyed by URL hash, optionally
+    backed by a persistent `store` (get / set(key, value, ttl)) so summaries
+    survive restarts.
+    """
+
+    def __init__(self, max_items=500, store=None):
+        self.max_items = max_items
+        self.store = store
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                return self._items[key]
+        if self.store is not None:
+            summary = self.store.get(f"summary:{key}")
+            if summary is not None:
+                self._remember(key, summary)
+            return summary
+        return None
+
+    def _remember(self, key, summary):
+        with self._lock:
+            self._items[key] = summary
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+
+    def set(self, key, summary):
+        self._remember(key, summary)
+        if self.store is not None:
+            self.store.set(f"summary:{key}", summary, ttl=SUMMARY_TTL)
+
+    def __len__(self):
+        return len(self._items)
+
+
+def _chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def _article_text(article):
+    title = (article.get('title') or "").strip()
+    desc = (article.get('description') or "").strip()[:MAX_DESCRIPTION_CHARS]
+    return f"{title} - {desc}" if desc else title
+
+
+def _summarize_chunk(chunk, generate):
+    """
+    Summarises one chunk of articles with a single LLM call.
+    Returns a list of summaries aligned with the chunk, None where the
+    answer had no line for an article.
+    """
+    numbered = "\n".join(f"{i}. {_article_text(a)}" for i, a in enumerate(chunk, 1))
+    prompt = prompts.render("news_summary", count=len(chunk), items=numbered)
+    text = "".join(generate(prompt))
+
+    parsed = {}
+    for line in text.splitlines():
+        match = re.match(r"\s*(\d+)[.)]\s*(.+)", line)
+        if match:
+            parsed[int(match.group(1))] = match.group(2).strip()
+
+    return [parsed.get(i) for i in range(1, len(chunk) + 1)]
+
+
+def summarize_articles(articles, generate, cache):
+    """
+    Map step: returns one summary per article. Only articles missing from the
+    cache are sent to the LLM, in concurrent chunks of CHUNK_SIZE.
+    """
+    pending = [a for a in articles if cache.get(article_key(a)) is None]
+
+    if pending:
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+            jobs = [(chunk, pool.submit(_summarize_chunk, chunk, generate)) for chunk in _chunks(pending, CHUNK_SIZE)]
+            for chunk, job in jobs:
+                try:
+                    summaries = job.result()
+                except Exception:
+                    # Leave failed chunks uncached so the next refresh retries them
+                    continue
+                for article, summary in zip(chunk, summaries):
+                    if summary:  # parse misses stay uncached and fall back to the title below
+                        cache.set(article_key(article), summary)
+
+    return [cache.get(article_key(a)) or (a.get('title') or "").strip() for a in articles]
+
+
+def build_news_digest(articles, generate, cache, max_items=10):
+    """
+    Reduce step: merges per-article summaries into a compact digest string
+    suitable for the briefing prompt.
+    """
+    summaries = summarize_articles(articles[:max_items], generate, cache)
+    return "\n".join(f"- {s}" for s in summaries if s)
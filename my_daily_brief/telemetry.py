@@ -0,0 +1,188 @@
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+import pandas as pd
+
+from cache import DATA_DIR
+
+# --- LLM Telemetry ---
+# Every generation's final counters (eval_count, eval_duration,
+# prompt_eval_count, load_duration, total_duration) are written to a local
+# SQLite time series, tagged with the feature (prompt template), backend and
+# model. Writes go through a background thread so recording never blocks a
+# stream or the API's event loop. Durations are stored in milliseconds.
+
+TELEMETRY_PATH = os.getenv("BRIEF_TELEMETRY_PATH", os.path.join(DATA_DIR, "telemetry.db"))
+RETENTION_DAYS = int(os.getenv("TELEMETRY_RETENTION_DAYS", "30"))
+LOAD_STALL_MS = float(os.getenv("LOAD_STALL_MS", "500"))  # model load longer than this counts as a stall
+FLUSH_BATCH = 100
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_calls (
+    id            INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts            REAL NOT NULL,
+    feature       TEXT NOT NULL,
+    backend       TEXT,
+    model         TEXT,
+    ok            INTEGER NOT NULL,
+    wall_ms       REAL,
+    ttft_ms       REAL,
+    total_ms      REAL,
+    load_ms       REAL,
+    prompt_tokens INTEGER,
+    prompt_ms     REAL,
+    eval_tokens   INTEGER,
+    eval_ms       REAL
+);
+CREATE INDEX IF NOT EXISTS idx_llm_calls_ts ON llm_calls (ts);
+"""
+
+COLUMNS = ["ts", "feature", "backend", "model", "ok", "wall_ms", "ttft_ms", "total_ms", "load_ms",
+           "prompt_tokens", "prompt_ms", "eval_tokens", "eval_ms"]
+
+
+def _ms(ns):
+    return ns / 1e6 if ns is not None else None
+
+
+def to_row(feature, stats, ts=None):
+    """
+    Maps a stats dict (Ollama's nanosecond counters plus the router's
+    backend / model / wall_ms / ttft_ms) to an llm_calls row.
+    """
+    return (
+        ts or time.time(), feature, stats.get("backend"), stats.get("model"), int(stats.get("ok", True)),
+        stats.get("wall_ms"), stats.get("ttft_ms"),
+        _ms(stats.get("total_duration")), _ms(stats.get("load_duration")),
+        stats.get("prompt_eval_count"), _ms(stats.get("prompt_eval_duration")),
+        stats.get("eval_count"), _ms(stats.get("eval_duration")),
+    )
+
+
+class TelemetryStore:
+    """
+    Append-only store of per-call LLM counters with a background writer.
+    """
+
+    def __init__(self, path=TELEMETRY_PATH, retention_days=RETENTION_DAYS):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._local = threading.local()
+        self._conn().executescript(SCHEMA)
+        self.purge(retention_days)
+        self._queue = queue.Queue()
+        self._writer = threading.Thread(target=self._write_loop, name="telemetry-writer", daemon=True)
+        self._writer.start()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    # --- Writes ---
+    def record(self, feature, stats):
+        """
+        Queues one call's counters; never blocks on disk.
+        """
+        self._queue.put(to_row(feature or "raw", stats))
+
+    def _write_loop(self):
+        while True:
+            # Drain whatever else is queued so bursts become one transaction
+            items = [self._queue.get()]
+            while len(items) < FLUSH_BATCH:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            rows = [i for i in items if isinstance(i, tuple)]
+            if rows:
+                try:
+                    with self._conn() as conn:
+                        conn.executemany(
+                            f"INSERT INTO llm_calls ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})",
+                            rows,
+                        )
+                except sqlite3.Error:
+                    pass  # telemetry must never break generation
+            for item in items:
+                if isinstance(item, threading.Event):
+                    item.set()
+
+    def flush(self, timeout=5.0):
+        """
+        Blocks until everything queued so far is on disk.
+        """
+        event = threading.Event()
+        self._queue.put(event)
+        return event.wait(timeout)
+
+    def purge(self, retention_days=RETENTION_DAYS):
+        with self._conn() as conn:
+            conn.execute("DELETE FROM llm_calls WHERE ts < ?", (time.time() - retention_days * 86400,))
+
+    # --- Reads ---
+    def calls(self, since=None):
+        """
+        Calls newer than `since` (epoch seconds) as a DataFrame indexed by time.
+        """
+        df = pd.read_sql_query(
+            f"SELECT {', '.join(COLUMNS)} FROM llm_calls WHERE ts >= ? ORDER BY ts",
+            self._conn(), params=(since or 0,),
+        )
+        df.index = pd.to_datetime(df['ts'], unit='s')
+        return df
+
+
+def summarize(df, by=("feature", "model")):
+    """
+    Per-group latency percentiles, throughput and load stalls:
+    calls, errors, p50/p95 wall and TTFT (ms), generation and prompt tok/s,
+    load stalls (load_ms > LOAD_STALL_MS) and total tokens.
+    """
+    by = list(by)
+    if df.empty:
+        return pd.DataFrame(columns=by + ["calls", "errors", "p50_ms", "p95_ms", "ttft_p50_ms",
+                                          "gen_tok_s", "prompt_tok_s", "load_stalls", "tokens"])
+
+    df = df.assign(
+        model=df['model'].fillna("?"),
+        stall=(df['load_ms'].fillna(0) > LOAD_STALL_MS).astype(int),
+        err=1 - df['ok'],
+    )
+    grouped = df.groupby(by)
+    out = pd.DataFrame({
+        "calls": grouped.size(),
+        "errors": grouped['err'].sum(),
+        "p50_ms": grouped['wall_ms'].quantile(0.5),
+        "p95_ms": grouped['wall_ms'].quantile(0.95),
+        "ttft_p50_ms": grouped['ttft_ms'].quantile(0.5),
+        # Ratio of sums, so long generations weigh in proportionally
+        "gen_tok_s": grouped['eval_tokens'].sum() / (grouped['eval_ms'].sum() / 1000),
+        "prompt_tok_s": grouped['prompt_tokens'].sum() / (grouped['prompt_ms'].sum() / 1000),
+        "load_stalls": grouped['stall'].sum(),
+        "tokens": grouped['prompt_tokens'].sum() + grouped['eval_tokens'].sum(),
+    })
+    out = out.replace([float("inf"), float("-inf")], float("nan")).round(1)
+    return out.reset_index().sort_values("calls", ascending=False)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_telemetry():
+    """
+    Process-wide telemetry store.
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = TelemetryStore()
+        return _store
@@ -0,0 +1,25 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# The app modules import each other flat (import core) and read their data
+# directory and upstream URLs at import time, so point them at a scratch
+# location and at local stubs before any test module imports them.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("BRIEF_DATA_DIR", tempfile.mkdtemp(prefix="brief_tests_"))
+
+from stubs import StubOllama, StubUpstream, stub_env  # noqa: E402
+
+UPSTREAM = StubUpstream().start()
+OLLAMA = StubOllama(token_delay=0.0, prompt_delay=0.0).start()
+os.environ.update(stub_env(UPSTREAM, OLLAMA))
+
+
+@pytest.fixture
+def stub_upstream():
+    """
+    The stub OpenWeatherMap / NewsAPI / forex server the app talks to.
+    """
+    return UPSTREAM
@@ -0,0 +1,14 @@
+import pytest
+
+from backends import Backend, OllamaBackend, OpenAICompatBackend
+
+
+def test_backend_without_astream_cannot_be_built():
+    class SyncOnly(Backend):
+        def stream(self, prompt, timeout=None, system=None, on_stats=None):
+            yield prompt
+
+    with pytest.raises(TypeError):
+        SyncOnly("http://localhost", "model")
+    OllamaBackend("http://localhost")
+    OpenAICompatBackend("http://localhost/v1#model")
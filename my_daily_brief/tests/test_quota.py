@@ -0,0 +1,95 @@
+import threading
+import time
+
+import pytest
+
+import quota
+from cache import SharedCache
+from stubs import StubUpstream
+
+LIMITS = {"weather": (60, 60), "news": (100, 86400), "forex": (60, 3600)}
+
+
+@pytest.fixture
+def manager(tmp_path):
+    return quota.QuotaManager(path=str(tmp_path / "quota.db"), limits=dict(LIMITS),
+                              cache=SharedCache(str(tmp_path / "cache.db")))
+
+
+@pytest.fixture
+def upstream():
+    stub = StubUpstream().start()
+    yield stub
+    stub.stop()
+
+
+def usage(manager, provider):
+    return next(row for row in manager.report() if row["provider"] == provider)
+
+
+def test_concurrent_identical_fetches_make_one_call(manager):
+    calls = []
+    started = threading.Event()
+
+    def slow():
+        calls.append(1)
+        started.set()
+        time.sleep(0.3)
+        return {"temp": 9}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(manager.fetch("weather", "weather:london", slow)))
+               for _ in range(8)]
+    threads[0].start()
+    started.wait(5)
+    for t in threads[1:]:
+        t.start()
+    for t in threads:
+        t.join(10)
+
+    assert len(calls) == 1
+    assert results == [{"temp": 9}] * 8
+    assert usage(manager, "weather")["coalesced"] == 7
+
+
+def test_fresh_value_is_reused_until_invalidated(manager):
+    calls = []
+    fetch = lambda: manager.fetch("weather", "weather:london", lambda: calls.append(1) or len(calls))
+
+    assert fetch() == 1
+    assert fetch() == 1
+    manager.invalidate("weather")
+    assert fetch() == 2
+    assert manager.fetch("weather", "weather:london", lambda: 3, fresh_for=0) == 3
+
+
+def test_tight_budget_serves_stale_without_calling(manager):
+    manager.fetch("weather", "weather:london", lambda: "old")
+    while manager.try_acquire("weather"):
+        pass  # spend the whole bucket
+
+    called = []
+    value = manager.fetch("weather", "weather:london", lambda: called.append(1) or "new", fresh_for=0)
+
+    assert value == "old"
+    assert not called
+    assert usage(manager, "weather")["stale"] == 1
+
+
+def test_upstream_429_backs_off_and_serves_stale(manager, upstream):
+    url = f"{upstream.url}/data/2.5/weather?q=London&appid=stub&units=metric"
+    call = lambda: manager.get("weather", url).json()["name"]
+    assert manager.fetch("weather", "weather:london", call) == "London"
+
+    upstream.rate_limit, upstream.retry_after = 0, 30
+    requests_before = upstream.requests
+    assert manager.fetch("weather", "weather:london", call, fresh_for=0) == "London"
+    assert upstream.throttled == 1
+    assert manager.remaining("weather") == 0
+
+    # Inside Retry-After nothing goes upstream, the stale value still answers
+    assert manager.fetch("weather", "weather:london", call, fresh_for=0) == "London"
+    assert upstream.requests == requests_before + 1
+    row = usage(manager, "weather")
+    assert row["throttled"] == 1
+    assert row["stale"] == 2
@@ -0,0 +1,58 @@
+import os
+import sys
+
+import pytest
+
+st_testing = pytest.importorskip("streamlit.testing.v1")
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+WEATHER = "/data/2.5/weather"
+
+
+@pytest.fixture
+def app_test(monkeypatch):
+    # AppTest installs the script as __main__; restore it afterwards, or
+    # spawned processes in later tests would re-run the app on start-up
+    monkeypatch.setitem(sys.modules, "__main__", sys.modules["__main__"])
+    return st_testing.AppTest.from_file(APP, default_timeout=60)
+
+
+def click(at, label):
+    next(b for b in at.button if b.label == label).click().run()
+
+
+def test_refresh_data_refetches_weather(app_test, stub_upstream):
+    at = app_test
+    at.run()
+    click(at, "Get Weather")
+    assert at.session_state["weather_data"]
+
+    before = stub_upstream.paths[WEATHER]
+    click(at, "Get Weather")
+    assert stub_upstream.paths[WEATHER] == before  # still cached in every layer
+
+    click(at, "🔄 Refresh Data")
+    click(at, "Get Weather")
+    assert stub_upstream.paths[WEATHER] == before + 1
+    assert not at.exception
+
+
+def test_refresh_spends_quota_through_the_manager(app_test, stub_upstream):
+    from quota import get_quota
+
+    def spent():
+        return next(r["spent"] for r in get_quota().report() if r["provider"] == "weather")
+
+    def weather_requests():
+        return sum(n for path, n in stub_upstream.paths.items() if path.startswith("/data/2.5/"))
+
+    at = app_test
+    at.run()
+    click(at, "Get Weather")
+    before_spent, before_requests = spent(), weather_requests()
+
+    click(at, "🔄 Refresh Data")
+    click(at, "Get Weather")
+    # Refetched past the quota's freshness window, and every call was budgeted
+    assert weather_requests() > before_requests
+    assert spent() - before_spent == weather_requests() - before_requests
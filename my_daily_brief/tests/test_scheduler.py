@@ -0,0 +1,24 @@
+from datetime import datetime
+
+from scheduler import next_run
+
+WAKE = (7, 0)
+LEAD = 30
+
+
+def at(day, hour, minute):
+    return datetime(2026, 10, day, hour, minute)
+
+
+def test_before_lead_time_runs_at_lead_time():
+    assert next_run(at(19, 5, 0), *WAKE, LEAD) == (at(19, 6, 30), at(19, 7, 0))
+
+
+def test_between_lead_and_wake_runs_now_for_today():
+    now = at(19, 6, 45)
+    assert next_run(now, *WAKE, LEAD) == (now, at(19, 7, 0))
+
+
+def test_from_wake_time_on_schedules_tomorrow():
+    assert next_run(at(19, 7, 0), *WAKE, LEAD) == (at(20, 6, 30), at(20, 7, 0))
+    assert next_run(at(19, 22, 0), *WAKE, LEAD) == (at(20, 6, 30), at(20, 7, 0))
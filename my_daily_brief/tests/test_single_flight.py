@@ -0,0 +1,79 @@
+import multiprocessing
+
+import pytest
+
+from stubs import StubOllama, StubRedis, StubUpstream, stub_env
+
+PROCESSES = 4
+LATENCY = 0.2  # long enough for every process to miss before the first answer lands
+
+
+def fetch_worker(barrier, results):
+    # Runs in a spawned process, configured through the environment. Goes
+    # through the quota manager like core.fetch_weather_data, without
+    # importing core and its heavy dependencies in every process.
+    import os
+
+    from cachebackends import get_cache_backend
+    from quota import get_quota
+
+    url = f"{os.environ['WEATHER_BASE_URL']}/data/2.5/weather?q=London&appid=stub&units=metric"
+    get_cache_backend("shared").get("warmup")  # connect / open before the race
+    barrier.wait()
+    value = get_quota().fetch("weather", "weather:london", lambda: get_quota().get("weather", url).json())
+    results.put(value is not None)
+
+
+@pytest.fixture(scope="module")
+def upstream():
+    stub = StubUpstream(latency=LATENCY).start()
+    yield stub
+    stub.stop()
+
+
+@pytest.fixture(scope="module")
+def ollama():
+    stub = StubOllama().start()  # only its URL is needed
+    yield stub
+    stub.stop()
+
+
+@pytest.fixture(scope="module")
+def redis():
+    with StubRedis() as stub:
+        yield stub
+
+
+def race(upstream, ollama, monkeypatch, tmp_path, spec):
+    """
+    PROCESSES fresh processes fetch the same cold key at once; returns the
+    number of upstream requests they made between them.
+    """
+    for name, value in stub_env(upstream, ollama).items():
+        monkeypatch.setenv(name, value)
+    monkeypatch.setenv("BRIEF_DATA_DIR", str(tmp_path))
+    monkeypatch.setenv("CACHE_BACKEND_SHARED", spec)
+    monkeypatch.setenv("QUOTA_WEATHER", "1000/60")
+
+    ctx = multiprocessing.get_context("spawn")
+    barrier, results = ctx.Barrier(PROCESSES), ctx.Queue()
+    workers = [ctx.Process(target=fetch_worker, args=(barrier, results)) for _ in range(PROCESSES)]
+    before = upstream.requests
+    for w in workers:
+        w.start()
+    answered = [results.get(timeout=60) for _ in workers]
+    for w in workers:
+        w.join(10)
+    assert all(answered)
+    return upstream.requests - before
+
+
+@pytest.mark.parametrize("backend", ["sqlite", "redis"])
+def test_shared_backends_fetch_once_across_processes(upstream, ollama, redis, monkeypatch, tmp_path, backend):
+    spec = redis.url if backend == "redis" else backend
+    assert race(upstream, ollama, monkeypatch, tmp_path, spec) == 1
+
+
+def test_memory_backend_does_not_coordinate_processes(upstream, ollama, monkeypatch, tmp_path):
+    # Locks are in-process only: every process makes its own call
+    assert race(upstream, ollama, monkeypatch, tmp_path, "memory") == PROCESSES
@@ -0,0 +1,29 @@
+import asyncio
+
+import pytest
+
+from streaming import QUEUE_SIZE, StreamError, StreamHub
+
+
+async def collect_after_upstream_finishes(count):
+    # The reader takes nothing until the whole generation has been relayed
+    async def tokens():
+        for i in range(count):
+            yield str(i)
+            await asyncio.sleep(0)
+
+    hub = StreamHub()
+    stream = hub.stream("k", tokens)
+    first = await stream.__anext__()
+    await asyncio.sleep(0.05)
+    return [first] + [token async for token in stream]
+
+
+def test_reader_with_a_full_queue_still_gets_the_end_of_stream():
+    tokens = asyncio.run(collect_after_upstream_finishes(QUEUE_SIZE + 1))
+    assert tokens == [str(i) for i in range(QUEUE_SIZE + 1)]
+
+
+def test_reader_further_behind_than_the_queue_is_dropped():
+    with pytest.raises(StreamError):
+        asyncio.run(collect_after_upstream_finishes(QUEUE_SIZE + 2))
@@ -0,0 +1,17 @@
+from summarizer import SummaryCache, article_key, summarize_articles
+
+ARTICLES = [{"title": f"Headline {i}", "description": f"Story {i}.", "url": f"https://example.com/{i}"}
+            for i in range(1, 4)]
+
+
+def test_unparsed_items_fall_back_to_title_without_caching():
+    cache = SummaryCache()
+    answer = lambda prompt: iter(["1. First summary\n3. Third summary"])  # item 2 missing
+
+    assert summarize_articles(ARTICLES, answer, cache) == ["First summary", "Headline 2", "Third summary"]
+    assert cache.get(article_key(ARTICLES[1])) is None
+
+    prompts_seen = []
+    retry = lambda prompt: prompts_seen.append(str(prompt)) or iter(["1. Second summary"])
+    assert summarize_articles(ARTICLES, retry, cache)[1] == "Second summary"
+    assert len(prompts_seen) == 1 and "Headline 2" in prompts_seen[0] and "Headline 1" not in prompts_seen[0]
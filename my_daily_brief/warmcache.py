@@ -0,0 +1,198 @@
+import atexit
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+import msgpack
+
+from cache import DATA_DIR
+
+# --- Warm Cache Snapshot ---
+# st.cache_data / st.cache_resource die with the Streamlit process, so after a
+# restart the first users paid full latency for data, LLM output and TTS.
+# WarmCache keeps data and AI results in memory as msgpack-packed entries with
+# an expiry each, and snapshots them to one compact file in the background.
+# On startup the snapshot is read on a background thread: boot is not slowed
+# and lookups only wait (briefly) if they arrive before it has loaded.
+# Memory is bounded: past MAX_ENTRIES entries or MAX_BYTES of packed values,
+# expired entries go first, then the least recently used.
+
+WARM_CACHE_PATH = os.getenv("BRIEF_WARM_CACHE_PATH", os.path.join(DATA_DIR, "warm_cache.msgpack"))
+SNAPSHOT_INTERVAL = float(os.getenv("WARM_SNAPSHOT_INTERVAL", "30"))
+LOAD_WAIT = 1.0  # max seconds a lookup waits for the snapshot to finish loading
+MAX_ENTRIES = 5000
+MAX_BYTES = int(float(os.getenv("WARM_CACHE_MAX_MB", "128")) * 1024 * 1024)
+SNAPSHOT_VERSION = 1
+
+
+def pack(value):
+    return msgpack.packb(value, use_bin_type=True)
+
+
+def unpack(blob):
+    return msgpack.unpackb(blob, raw=False, strict_map_key=False)
+
+
+class WarmCache:
+    """
+    Process-wide TTL cache persisted as a msgpack snapshot. Values must be
+    msgpack-serialisable (dicts, lists, str, numbers, bytes); tuples come
+    back as lists.
+    """
+
+    def __init__(self, path=WARM_CACHE_PATH, snapshot_interval=SNAPSHOT_INTERVAL,
+                 max_entries=MAX_ENTRIES, max_bytes=MAX_BYTES):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (expires_at, packed value), least recently used first
+        self._bytes = 0
+        self._locks = {}  # lock name -> (expires_at, token)
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._loaded = threading.Event()
+        self.stats = {"loaded": 0, "hits": 0, "misses": 0, "snapshots": 0, "evicted": 0}
+        threading.Thread(target=self._load, name="warm-cache-load", daemon=True).start()
+        if snapshot_interval:
+            threading.Thread(target=self._snapshot_loop, args=(snapshot_interval,),
+                             name="warm-cache-snapshot", daemon=True).start()
+        atexit.register(self.snapshot)
+
+    # --- Persistence ---
+    def _load(self):
+        try:
+            with open(self.path, "rb") as f:
+                snapshot = unpack(f.read())
+            if snapshot.get("version") == SNAPSHOT_VERSION:
+                now = time.time()
+                with self._lock:
+                    # Most recently used last; entries written since startup stay newer
+                    for key, expires_at, blob in reversed(snapshot["entries"]):
+                        if expires_at > now and key not in self._entries:
+                            self._put(key, expires_at, blob)
+                            self._entries.move_to_end(key, last=False)
+                            self.stats["loaded"] += 1
+                    self._evict(now)
+        except (OSError, ValueError, KeyError, msgpack.UnpackException):
+            pass  # no snapshot yet, or unreadable: start cold
+        finally:
+            self._loaded.set()
+
+    def snapshot(self):
+        """
+        Writes unexpired entries to disk atomically (tmp file + rename).
+        """
+        if not self._loaded.is_set():
+            return  # never overwrite a snapshot we have not read yet
+        now = time.time()
+        with self._lock:
+            self._evict(now, expired=True)
+            live = [(k, e, b) for k, (e, b) in self._entries.items()]
+            self._dirty = False
+        blob = pack({"version": SNAPSHOT_VERSION, "written_at": now, "entries": live})
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(blob)
+        os.replace(tmp, self.path)
+        self.stats["snapshots"] += 1
+
+    def _snapshot_loop(self, interval):
+        while True:
+            time.sleep(interval)
+            if self._dirty:
+                try:
+                    self.snapshot()
+                except OSError:
+                    pass
+
+    # --- Bounds (call with self._lock held) ---
+    def _put(self, key, expires_at, blob):
+        self._pop(key)
+        self._entries[key] = (expires_at, blob)
+        self._bytes += len(blob)
+
+    def _pop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= len(entry[1])
+        return entry
+
+    def _over(self):
+        return len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+
+    def _evict(self, now, expired=False):
+        """
+        Drops expired entries (always, or only once over the bounds), then
+        least recently used ones until within MAX_ENTRIES and MAX_BYTES.
+        """
+        if expired or self._over():
+            for key in [k for k, (e, _) in self._entries.items() if e <= now]:
+                self._pop(key)
+        while self._over():
+            self._pop(next(iter(self._entries)))
+            self.stats["evicted"] += 1
+
+    # --- Access ---
+    def get(self, key, default=None):
+        self._loaded.wait(LOAD_WAIT)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= time.time():
+                self._pop(key)
+                entry = None
+            elif entry is not None:
+                self._entries.move_to_end(key)
+            self.stats["hits" if entry else "misses"] += 1
+        return unpack(entry[1]) if entry else default
+
+    def set(self, key, value, ttl):
+        blob = pack(value)
+        now = time.time()
+        with self._lock:
+            if len(blob) > self.max_bytes:
+                self._pop(key)  # would evict everything else; leave it uncached
+                return
+            self._put(key, now + ttl, blob)
+            self._evict(now)
+            self._dirty = True
+
+    def delete(self, key):
+        with self._lock:
+            self._dirty = self._pop(key) is not None or self._dirty
+
+    # --- Locks (in-process only) ---
+    def acquire(self, key, ttl):
+        token, now = uuid.uuid4().hex, time.time()
+        with self._lock:
+            held = self._locks.get(key)
+            if held and held[0] > now:
+                return None
+            self._locks[key] = (now + ttl, token)
+        return token
+
+    def release(self, key, token):
+        with self._lock:
+            if self._locks.get(key, (0, None))[1] == token:
+                del self._locks[key]
+
+    def __len__(self):
+        return len(self._entries)
+
+
+_warm = None
+_warm_lock = threading.Lock()
+
+
+def get_warm_cache():
+    """
+    Process-wide warm cache (starts loading the snapshot on first use).
+    """
+    global _warm
+    with _warm_lock:
+        if _warm is None:
+            _warm = WarmCache()
+        return _warm
+